@@ -0,0 +1,186 @@
+import glob
+import json
+import os
+import queue
+import struct
+import threading
+
+import pygame
+
+
+def image_size(path):
+    """Размер картинки без декодирования: для PNG читается заголовок IHDR"""
+    with open(path, "rb") as f:
+        header = f.read(24)
+    if header[:8] == b"\x89PNG\r\n\x1a\n" and header[12:16] == b"IHDR":
+        return struct.unpack(">II", header[16:24])
+    return pygame.image.load(path).get_size()
+
+
+class AssetManager:
+    """Загружает каждую картинку один раз и хранит ее масштабированные копии
+
+    Декодирование PNG можно увести в фоновый поток (preload), а convert_alpha
+    делается только в основном потоке - в poll() или при первом обращении.
+    Если загружен манифест asset_pipeline, пути подменяются собранными файлами,
+    а готовые масштабированные варианты читаются с диска вместо transform.scale.
+    Для scaled() оригинал в памяти не остается: хранится только вариант нужного размера.
+    """
+
+    def __init__(self, base_dir=""):
+        self.base_dir = base_dir
+        self.images = {}
+        self.scaled_images = {}
+        self.decoded = queue.Queue()
+        self.pending = set()
+        self.failed = {}
+        self.total = 0
+        self.thread = None
+        self.files = {}
+        self.variants = {}
+        self.sizes = {}
+
+    def key(self, path):
+        return os.path.normpath(os.path.join(self.base_dir, path))
+
+    def source(self, key):
+        """Файл, из которого на самом деле читается картинка"""
+        return self.files.get(key, key)
+
+    def load_manifest(self, path):
+        """Читает манифест сборки; без манифеста все грузится из исходников"""
+        if not os.path.exists(path):
+            return False
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        for logical, built in manifest.get("files", {}).items():
+            self.files[self.key(logical)] = self.key(built)
+        for logical, info in manifest.get("sources", {}).items():
+            self.sizes[self.key(logical)] = tuple(info["size"])
+        for logical, variants in manifest.get("scaled", {}).items():
+            for size, built in variants.items():
+                self.variants[(self.key(logical), tuple(int(value) for value in size.split("x")))] = self.key(built)
+        return True
+
+    def size(self, key):
+        """Размер оригинала: из манифеста, из загруженной картинки или из заголовка файла"""
+        size = self.sizes.get(key)
+        if size is None:
+            image = self.images.get(key)
+            size = image.get_size() if image is not None else tuple(image_size(self.source(key)))
+            self.sizes[key] = size
+        return size
+
+    def scaled_size(self, path, scale, window_scale=1):
+        """Размер варианта (считается как в apply_scale)"""
+        width, height = self.size(self.key(path))
+        return int(width * scale * window_scale), int(height * scale * window_scale)
+
+    def image(self, path):
+        """Оригинал с convert_alpha; если фоновая загрузка еще не дошла до него - грузим сразу"""
+        key = self.key(path)
+        image = self.images.get(key)
+        if image is None:
+            self.poll()
+            image = self.images.get(key)
+        if image is None:
+            image = pygame.image.load(self.source(key)).convert_alpha()
+            self.images[key] = image
+            self.pending.discard(key)
+        return image
+
+    def scaled(self, path, scale, window_scale=1):
+        """Картинка в масштабе scale * window_scale; сам оригинал при этом не кэшируется"""
+        key = (self.key(path), self.scaled_size(path, scale, window_scale))
+        scaled = self.scaled_images.get(key)
+        if scaled is None:
+            self.poll()
+            scaled = self.scaled_images.get(key)
+        if scaled is None:
+            scaled = self.decode_scaled(*key).convert_alpha()
+            self.scaled_images[key] = scaled
+            self.pending.discard(key)
+        return scaled
+
+    def decode_scaled(self, key, size):
+        """Вариант нужного размера без convert_alpha (можно вызывать из фонового потока)"""
+        variant = self.variants.get((key, size))
+        if variant is not None:
+            return pygame.image.load(variant)
+        image = self.images.get(key)
+        if image is None:
+            image = pygame.image.load(self.source(key))
+        if image.get_size() == size:
+            return image
+        return pygame.transform.scale(image, size)
+
+    def clear_scaled(self):
+        """Сбрасывает масштабированные копии (например, после смены window_scale)"""
+        self.scaled_images.clear()
+
+    def preload(self, paths):
+        """Запускает декодирование оригиналов в фоновом потоке"""
+        self.start([self.key(path) for path in paths])
+
+    def preload_scaled(self, requests):
+        """Запускает в фоне декодирование и масштабирование вариантов: [(путь, scale, window_scale)]"""
+        self.start([(self.key(path), self.scaled_size(path, scale, window_scale))
+                    for path, scale, window_scale in requests])
+
+    def preload_dir(self, directory, pattern="*.png"):
+        self.preload(sorted(glob.glob(os.path.join(self.base_dir, directory, "**", pattern), recursive=True)))
+
+    def start(self, keys):
+        keys = [key for key in dict.fromkeys(keys)
+                if key not in self.images and key not in self.scaled_images and key not in self.pending]
+        if not keys:
+            return
+        self.pending.update(keys)
+        self.total += len(keys)
+        self.thread = threading.Thread(target=self.decode, args=(keys,), daemon=True)
+        self.thread.start()
+
+    def decode(self, keys):
+        for key in keys:
+            try:
+                if isinstance(key, tuple):
+                    surface = self.decode_scaled(*key)
+                else:
+                    surface = pygame.image.load(self.source(key))
+                self.decoded.put((key, surface, None))
+            except (pygame.error, OSError) as error:
+                self.decoded.put((key, None, error))
+
+    def poll(self, limit=None):
+        """Переносит декодированные картинки в кэш (основной поток); возвращает число перенесенных"""
+        count = 0
+        while limit is None or count < limit:
+            try:
+                key, surface, error = self.decoded.get_nowait()
+            except queue.Empty:
+                break
+            self.pending.discard(key)
+            cache = self.scaled_images if isinstance(key, tuple) else self.images
+            if error is not None:
+                self.failed[key] = error
+            elif key not in cache:
+                cache[key] = surface.convert_alpha()
+            count += 1
+        return count
+
+    def progress(self):
+        """Доля загруженных картинок из поставленных в preload"""
+        if not self.total:
+            return 1.0
+        return 1 - len(self.pending) / self.total
+
+    def done(self):
+        return not self.pending
+
+    def resident_bytes(self):
+        """Сколько памяти занимают закэшированные поверхности"""
+        return sum(surface.get_width() * surface.get_height() * surface.get_bytesize()
+                   for cache in (self.images, self.scaled_images) for surface in cache.values())
+
+
+assets = AssetManager()
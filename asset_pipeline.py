@@ -0,0 +1,213 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pygame
+
+from atlas import MORTY_FRAMES, MORTY_SPRITES_DIR, build_atlas
+
+
+# Версия сборки: при изменении правил все выходы пересобираются
+PIPELINE_VERSION = 1
+
+BUILD_DIR = "build/assets"
+MANIFEST = "build/assets/manifest.json"
+
+# Размеры окна, под которые заранее масштабируются картинки меню (как в main.py)
+LOGICAL_SIZE = (1920, 1080)
+WINDOW_SIZES = [(1200, 675)]
+
+# Верхние границы пульсации кнопок и фонов меню (PULSE_TOP в main.py)
+BUTTON_PULSE_TOP = 1.5
+BACKGROUND_PULSE_TOP = 1.02
+
+SPLASH_IMAGE = "assets/images/Loading/Logo.png"
+SPLASH_SCALE = 1.5
+
+# Варианты картинок меню под окно; main.py подгружает эти же варианты.
+# У пульсирующих объектов это масштаб на верхней границе пульсации
+MENU_VARIANTS = [
+    ("assets/images/menu/blueSpiral.png", 1.8 * BACKGROUND_PULSE_TOP),
+    ("assets/images/menu/portal.png", 1.5 * BACKGROUND_PULSE_TOP),
+    ("assets/images/menu/mortyPose.png", 2),
+    ("assets/images/menu/playBtnUp.png", 1.2 * BUTTON_PULSE_TOP),
+    ("assets/images/menu/settingBtnUp.png", 1.5),
+    ("assets/images/menu/logo.png", 1.5),
+]
+
+# Картинка -> масштабы, под которые собираются варианты
+SCALED_IMAGES = {}
+for _path, _scale in MENU_VARIANTS + [(SPLASH_IMAGE, SPLASH_SCALE)]:
+    SCALED_IMAGES.setdefault(_path, []).append(_scale)
+
+
+def window_scale(window_size, logical_size=LOGICAL_SIZE):
+    return min(window_size[0] / logical_size[0], window_size[1] / logical_size[1])
+
+
+def file_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def job_key(job, hashes):
+    """Ключ задачи: хэши исходников + параметры; совпал с прошлым - выход не пересобирается"""
+    text = json.dumps([PIPELINE_VERSION, job["kind"], job["params"], [hashes[path] for path in job["sources"]]])
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+def out_path(build_dir, path):
+    return os.path.join(build_dir, os.path.relpath(path, "assets"))
+
+
+def plan_jobs(build_dir=BUILD_DIR):
+    """Список задач сборки: зеркалирование, масштабирование, атлас"""
+    jobs = []
+
+    # right_* получаются зеркалом side_* (раньше это делал assets/images/morty/py.py)
+    for name, (file_name, mirrored) in sorted(MORTY_FRAMES.items()):
+        if mirrored:
+            source = os.path.join(MORTY_SPRITES_DIR, file_name)
+            target = os.path.join(MORTY_SPRITES_DIR, name + ".png")
+            jobs.append({"kind": "mirror", "sources": [source], "params": {},
+                         "logical": target, "outputs": [out_path(build_dir, target)]})
+
+    for path, scales in sorted(SCALED_IMAGES.items()):
+        for window_size in WINDOW_SIZES:
+            for scale in scales:
+                base, ext = os.path.splitext(out_path(build_dir, path))
+                jobs.append({"kind": "scale", "sources": [path],
+                             "params": {"scale": scale, "window_scale": window_scale(window_size)},
+                             "logical": path, "outputs": [f"{base}@{scale:g}x{window_size[0]}x{window_size[1]}{ext}"]})
+
+    atlas_sources = sorted({os.path.join(MORTY_SPRITES_DIR, file_name) for file_name, _ in MORTY_FRAMES.values()})
+    atlas_index = out_path(build_dir, os.path.join(MORTY_SPRITES_DIR, "atlas.json"))
+    jobs.append({"kind": "atlas", "sources": atlas_sources, "params": {},
+                 "logical": os.path.join(MORTY_SPRITES_DIR, "atlas.json"),
+                 "outputs": [atlas_index, os.path.splitext(atlas_index)[0] + ".png"]})
+    return jobs
+
+
+def optimize_png(path):
+    """Пересжимает PNG, если установлен Pillow; иначе оставляет файл как есть"""
+    try:
+        from PIL import Image
+    except ImportError:
+        return False
+    with Image.open(path) as image:
+        image.load()
+    image.save(path, optimize=True)
+    return True
+
+
+def run_job(job):
+    """Выполняет одну задачу (в процессе пула), возвращает (первый выход, размер картинки, оптимизирован ли)"""
+    for output in job["outputs"]:
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+
+    kind = job["kind"]
+    if kind == "mirror":
+        image = pygame.transform.flip(pygame.image.load(job["sources"][0]), True, False)
+        pygame.image.save(image, job["outputs"][0])
+    elif kind == "scale":
+        image = pygame.image.load(job["sources"][0])
+        params = job["params"]
+        # размер как в AssetManager.scaled, чтобы ключи вариантов совпадали
+        image = pygame.transform.scale(image, (int(image.get_width() * params["scale"] * params["window_scale"]),
+                                               int(image.get_height() * params["scale"] * params["window_scale"])))
+        pygame.image.save(image, job["outputs"][0])
+    elif kind == "atlas":
+        build_atlas(MORTY_SPRITES_DIR, job["outputs"][0])
+        image = pygame.image.load(job["outputs"][1])
+    else:
+        raise ValueError(f"неизвестная задача сборки: {kind}")
+
+    optimized = all([optimize_png(output) for output in job["outputs"] if output.endswith(".png")])
+    return job["outputs"][0], list(image.get_size()), optimized
+
+
+def load_manifest(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def build(build_dir=BUILD_DIR, manifest_path=MANIFEST, workers=None, force=False):
+    """Пересобирает изменившиеся выходы и пишет манифест; возвращает (манифест, число собранных задач)"""
+    old = load_manifest(manifest_path)
+    old_jobs = {} if force else old.get("jobs", {})
+
+    jobs = plan_jobs(build_dir)
+    sources = sorted({path for job in jobs for path in job["sources"]} | set(SCALED_IMAGES))
+    hashes = {path: file_hash(path) for path in sources}
+
+    stale = []
+    results = {}
+    for job in jobs:
+        job["key"] = job_key(job, hashes)
+        previous = old_jobs.get(job["outputs"][0])
+        if previous and previous["key"] == job["key"] and all(os.path.exists(path) for path in job["outputs"]):
+            results[job["outputs"][0]] = previous
+        else:
+            stale.append(job)
+
+    if stale:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for job, (output, size, optimized) in zip(stale, pool.map(run_job, stale)):
+                results[output] = {"kind": job["kind"], "key": job["key"], "logical": job["logical"],
+                                   "params": job["params"], "size": size, "optimized": optimized}
+
+    manifest = {"version": PIPELINE_VERSION, "sources": {}, "files": {}, "scaled": {}, "jobs": results}
+    for path in sources:
+        # размер исходника берется из прошлого манифеста, если файл не менялся
+        previous = old.get("sources", {}).get(path)
+        if previous and previous["hash"] == hashes[path]:
+            size = previous["size"]
+        else:
+            size = list(pygame.image.load(path).get_size())
+        manifest["sources"][path] = {"hash": hashes[path], "size": size}
+    for job in jobs:
+        output = job["outputs"][0]
+        entry = results[output]
+        if job["kind"] == "scale":
+            size = "x".join(str(value) for value in entry["size"])
+            manifest["scaled"].setdefault(job["logical"], {})[size] = output
+        elif job["kind"] == "atlas":
+            manifest["files"][job["logical"]] = output
+            manifest["files"][os.path.splitext(job["logical"])[0] + ".png"] = job["outputs"][1]
+        else:
+            manifest["files"][job["logical"]] = output
+
+    os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    return manifest, len(stale)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Инкрементальная сборка ассетов игры")
+    parser.add_argument("--out", default=BUILD_DIR)
+    parser.add_argument("--manifest", default=None, help=f"по умолчанию {MANIFEST}")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--force", action="store_true", help="пересобрать все, не глядя на хэши")
+    parser.add_argument("--clean", action="store_true", help="удалить каталог сборки перед сборкой")
+    args = parser.parse_args()
+    manifest_path = args.manifest or os.path.join(args.out, "manifest.json")
+
+    if args.clean and os.path.isdir(args.out):
+        shutil.rmtree(args.out)
+
+    start = time.perf_counter()
+    manifest, built = build(args.out, manifest_path, args.workers, args.force)
+    elapsed = time.perf_counter() - start
+    print(f"Собрано: {built}, без изменений: {len(manifest['jobs']) - built}, время: {elapsed:.2f} с")
+    print(manifest_path)
+
+
+if __name__ == "__main__":
+    main()
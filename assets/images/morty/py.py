@@ -1,19 +1,12 @@
-from PIL import Image
+# Зеркальные right_* теперь собирает asset_pipeline.py (вместе с атласом и масштабированием).
+# Оставлено для старой привычки запускать из этой папки: python py.py
 import os
+import sys
 
-# Папки
-input_dir = "./"
-output_dir = "./"
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
 
-# Создаем зеркальные right текстуры
-for i in range(1, 5):
-    input_path = f"{input_dir}side_{i}.png"
-    output_path = f"{output_dir}right_{i}.png"
-    
-    if os.path.exists(input_path):
-        # Открываем и зеркалим
-        img = Image.open(input_path)
-        mirrored = img.transpose(Image.FLIP_LEFT_RIGHT)
-        mirrored.save(output_path)
-    else:
+import asset_pipeline
 
+asset_pipeline.main()
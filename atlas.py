@@ -0,0 +1,135 @@
+import argparse
+import hashlib
+import json
+import os
+
+import pygame
+
+
+MORTY_SPRITES_DIR = "assets/images/morty"
+MORTY_ATLAS = "assets/images/morty/atlas.json"
+
+# Кадры ходьбы: имя кадра -> (файл, отразить по горизонтали)
+# right_* не читаются из файлов, а получаются зеркалом side_* (как делал py.py)
+MORTY_FRAMES = {}
+for _direction in ("down", "up", "side"):
+    for _i in range(1, 5):
+        MORTY_FRAMES[f"{_direction}_{_i}"] = (f"{_direction}_{_i}.png", False)
+for _i in range(1, 5):
+    MORTY_FRAMES[f"right_{_i}"] = (f"side_{_i}.png", True)
+
+
+def load_frames(source_dir, frames):
+    """Читает кадры с диска, отражает нужные; каждый файл открывается один раз"""
+    files = {}
+    images = {}
+    for name, (file_name, mirrored) in frames.items():
+        image = files.get(file_name)
+        if image is None:
+            image = pygame.image.load(os.path.join(source_dir, file_name))
+            files[file_name] = image
+        images[name] = pygame.transform.flip(image, True, False) if mirrored else image
+    return images
+
+
+def pack(sizes, max_width=512, padding=1):
+    """Раскладка прямоугольников по полкам: {имя: (w, h)} -> ({имя: (x, y)}, (ширина, высота))"""
+    positions = {}
+    x = y = shelf_height = width = 0
+    for name in sorted(sizes, key=lambda name: (-sizes[name][1], name)):
+        w, h = sizes[name]
+        if x and x + w > max_width:
+            x = 0
+            y += shelf_height + padding
+            shelf_height = 0
+        positions[name] = (x, y)
+        x += w + padding
+        shelf_height = max(shelf_height, h)
+        width = max(width, x - padding)
+    return positions, (width, y + shelf_height)
+
+
+def build_atlas(source_dir=MORTY_SPRITES_DIR, out_path=MORTY_ATLAS, frames=MORTY_FRAMES, max_width=512, padding=1):
+    """Собирает все кадры в один лист и пишет рядом индекс с прямоугольниками кадров"""
+    images = load_frames(source_dir, frames)
+
+    # одинаковые кадры (down_1 и down_3 и т.п.) занимают в листе одно место
+    unique = {}
+    aliases = {}
+    for name in sorted(images):
+        image = images[name]
+        digest = hashlib.sha1(pygame.image.tobytes(image, "RGBA")).hexdigest() + str(image.get_size())
+        aliases[name] = unique.setdefault(digest, name)
+
+    sizes = {name: images[name].get_size() for name in set(aliases.values())}
+    positions, size = pack(sizes, max_width, padding)
+
+    sheet = pygame.Surface(size, pygame.SRCALPHA)
+    for name, position in positions.items():
+        sheet.blit(images[name], position)
+
+    base = os.path.splitext(out_path)[0]
+    image_path = base + ".png"
+    pygame.image.save(sheet, image_path)
+
+    index = {
+        "image": os.path.basename(image_path),
+        "size": list(size),
+        "frames": {name: list(positions[aliases[name]]) + list(sizes[aliases[name]]) for name in sorted(aliases)},
+    }
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(index, f)
+    return index
+
+
+class Atlas:
+    """Лист кадров в памяти: одна картинка, кадры - subsurface без копирования пикселей"""
+
+    def __init__(self, image, frames):
+        self.image = image
+        self.rects = {name: pygame.Rect(rect) for name, rect in frames.items()}
+        self.frames = {}
+
+    @classmethod
+    def load(cls, index_path=MORTY_ATLAS, assets=None):
+        """Читает индекс и лист (через AssetManager, если он передан)"""
+        with open(index_path, encoding="utf-8") as f:
+            index = json.load(f)
+        image_path = os.path.join(os.path.dirname(index_path), index["image"])
+        if assets is not None:
+            image = assets.image(image_path)
+        else:
+            image = pygame.image.load(image_path).convert_alpha()
+        return cls(image, index["frames"])
+
+    def frame(self, name):
+        frame = self.frames.get(name)
+        if frame is None:
+            frame = self.image.subsurface(self.rects[name])
+            self.frames[name] = frame
+        return frame
+
+    def animation(self, prefix):
+        """Кадры анимации по префиксу: animation("down") -> [down_1, down_2, ...]"""
+        names = sorted((name for name in self.rects if name.rsplit("_", 1)[0] == prefix),
+                       key=lambda name: int(name.rsplit("_", 1)[1]))
+        return [self.frame(name) for name in names]
+
+    def __contains__(self, name):
+        return name in self.rects
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сборка атласа кадров Морти")
+    parser.add_argument("--source", default=MORTY_SPRITES_DIR)
+    parser.add_argument("--out", default=MORTY_ATLAS)
+    parser.add_argument("--max-width", type=int, default=512)
+    parser.add_argument("--padding", type=int, default=1)
+    args = parser.parse_args()
+
+    index = build_atlas(args.source, args.out, MORTY_FRAMES, args.max_width, args.padding)
+    print(f"{args.out}: {len(index['frames'])} кадров, лист {index['size'][0]}x{index['size'][1]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+import argparse
+import time
+
+import numpy as np
+
+from battle_engine import (ATTACKS, DEFENSE_MULTIPLIER, ENEMY_CHOICES, ENEMY_WEIGHTS, MORTY_TYPES,
+                           RPS_LOSE_MULTIPLIER, RPS_WIN_MULTIPLIER, SPECIAL_ACTIONS)
+from battle_tables import get_tables
+
+
+# Коды типов действий
+ATTACK, HEAL, SPECIAL_ATTACK, DEFENSE = range(4)
+KIND_CODES = {"attack": ATTACK, "heal": HEAL, "special_attack": SPECIAL_ATTACK, "defense": DEFENSE}
+
+
+class BalanceRules:
+    """Правила боя, разложенные в массивы NumPy по кодам типов и действий"""
+
+    def __init__(self, attacks=None, morty_types=None):
+        attacks = attacks if attacks is not None else ATTACKS
+        morty_types = morty_types if morty_types is not None else MORTY_TYPES
+
+        self.actions = list(attacks.keys())
+        self.types = list(morty_types.keys())
+        action_index = {action: i for i, action in enumerate(self.actions)}
+
+        n_actions = len(self.actions)
+        self.kind = np.array([KIND_CODES[attacks[a]["type"]] for a in self.actions])
+        low = []
+        high = []
+        for a in self.actions:
+            spread = attacks[a].get("damage") or attacks[a].get("heal_amount") or (0, 0)
+            low.append(spread[0])
+            high.append(spread[1])
+        self.low = np.array(low)
+        self.high = np.array(high)
+
+        # индексы слотов кулдауна для специальных действий (-1 - без кулдауна)
+        self.cooldown_slot = np.full(n_actions, -1)
+        self.cooldown_value = np.zeros(len(SPECIAL_ACTIONS), dtype=np.int8)
+        for slot, a in enumerate(SPECIAL_ACTIONS):
+            self.cooldown_slot[action_index[a]] = slot
+            self.cooldown_value[slot] = attacks[a].get("cooldown", 2)
+
+        # таблицы урона движка: damage[тип игрока, тип врага, действие игрока, действие врага, защита, бросок]
+        tables = get_tables(attacks, morty_types, RPS_WIN_MULTIPLIER, RPS_LOSE_MULTIPLIER, DEFENSE_MULTIPLIER)
+        shape = (len(self.types), len(self.types), n_actions, n_actions, 2, tables.max_roll + 1)
+        self.player_damage = np.array(tables.player_damage, dtype=np.int32).reshape(shape)
+        self.enemy_damage = np.array(tables.enemy_damage, dtype=np.int32).reshape(shape)
+
+        self.enemy_weights = np.zeros(n_actions)
+        for choice, weight in zip(ENEMY_CHOICES, ENEMY_WEIGHTS):
+            self.enemy_weights[action_index[choice]] = weight
+        self.basic_attacks = self.kind == ATTACK
+
+
+class BalanceSimulator:
+    """Пакетная симуляция N боев одновременно на массивах NumPy"""
+
+    def __init__(self, rules=None, seed=None, player_weights=None, max_rounds=200):
+        self.rules = rules if rules is not None else BalanceRules()
+        self.rng = np.random.default_rng(seed)
+        # веса действий игрока, по умолчанию - равновероятно из доступных
+        self.player_weights = (np.asarray(player_weights, dtype=float) if player_weights is not None
+                               else np.ones(len(self.rules.actions)))
+        self.max_rounds = max_rounds
+
+    def sample_actions(self, weights, cooldowns):
+        """Выбирает действие для каждого боя по весам с учетом кулдаунов"""
+        rules = self.rules
+        available = np.ones((cooldowns.shape[0], len(rules.actions)), dtype=bool)
+        special = rules.cooldown_slot >= 0
+        available[:, special] = cooldowns[:, rules.cooldown_slot[special]] <= 0
+
+        w = available * weights
+        total = w.sum(axis=1)
+        # если все на кулдауне - равновероятно из основных атак
+        empty = total <= 0
+        if empty.any():
+            w[empty] = rules.basic_attacks
+            total[empty] = w[empty].sum(axis=1)
+
+        cumulative = np.cumsum(w, axis=1) / total[:, None]
+        u = self.rng.random(len(total))
+        return np.minimum((u[:, None] >= cumulative).sum(axis=1), len(rules.actions) - 1)
+
+    def roll(self, actions):
+        rules = self.rules
+        return self.rng.integers(rules.low[actions], rules.high[actions] + 1)
+
+    def set_cooldowns(self, cooldowns, actions):
+        slot = self.rules.cooldown_slot[actions]
+        has = slot >= 0
+        rows = np.nonzero(has)[0]
+        cooldowns[rows, slot[has]] = self.rules.cooldown_value[slot[has]]
+
+    def run(self, n, player_types=None, enemy_types=None, enemy_levels=1):
+        """Играет n боев до конца и возвращает BalanceReport"""
+        rules = self.rules
+        n_types = len(rules.types)
+        n_actions = len(rules.actions)
+
+        if player_types is None:
+            player_types = self.rng.integers(0, n_types, n)
+        if enemy_types is None:
+            enemy_types = self.rng.integers(0, n_types, n)
+        levels = np.broadcast_to(np.asarray(enemy_levels), (n,)).astype(np.int32)
+
+        state = {
+            "id": np.arange(n),
+            "player_type": np.asarray(player_types),
+            "enemy_type": np.asarray(enemy_types),
+            "player_hp": np.full(n, 100, dtype=np.int32),
+            "player_max": np.full(n, 100, dtype=np.int32),
+            "enemy_hp": (80 * (1 + (levels - 1) * 0.3)).astype(np.int32),
+            "player_cd": np.zeros((n, len(SPECIAL_ACTIONS)), dtype=np.int8),
+            "enemy_cd": np.zeros((n, len(SPECIAL_ACTIONS)), dtype=np.int8),
+            "player_defending": np.zeros(n, dtype=bool),
+            "enemy_defending": np.zeros(n, dtype=bool),
+        }
+        state["enemy_max"] = state["enemy_hp"].copy()
+
+        winner = np.zeros(n, dtype=np.int8)  # 1 - игрок, -1 - враг, 0 - не закончен
+        rounds = np.zeros(n, dtype=np.int32)
+        used = np.zeros((n, n_actions), dtype=bool)
+        action_uses = np.zeros(n_actions, dtype=np.int64)
+        action_dealt = np.zeros(n_actions, dtype=np.int64)
+        action_taken = np.zeros(n_actions, dtype=np.int64)
+
+        for _ in range(self.max_rounds):
+            if len(state["id"]) == 0:
+                break
+            player_damage, enemy_damage, pa = self.play_round(state)
+
+            ids = state["id"]
+            rounds[ids] += 1
+            used[ids, pa] = True
+            action_uses += np.bincount(pa, minlength=n_actions)
+            action_dealt += np.bincount(pa, weights=player_damage, minlength=n_actions).astype(np.int64)
+            action_taken += np.bincount(pa, weights=enemy_damage, minlength=n_actions).astype(np.int64)
+
+            # враг проверяется первым, как в apply_damage
+            enemy_defeated = state["enemy_hp"] <= 0
+            player_defeated = (state["player_hp"] <= 0) & ~enemy_defeated
+            winner[ids[enemy_defeated]] = 1
+            winner[ids[player_defeated]] = -1
+
+            alive = ~(enemy_defeated | player_defeated)
+            if not alive.all():
+                state = {key: value[alive] for key, value in state.items()}
+
+        return BalanceReport(rules, np.asarray(player_types), np.asarray(enemy_types), winner, rounds,
+                             used, action_uses, action_dealt, action_taken)
+
+    def play_round(self, state):
+        """Один раунд для всех активных боев, повторяет BattleEngine.calculate_round_results"""
+        rules = self.rules
+        pt = state["player_type"]
+        et = state["enemy_type"]
+
+        pa = self.sample_actions(self.player_weights, state["player_cd"])
+        ea = self.sample_actions(rules.enemy_weights, state["enemy_cd"])
+        self.set_cooldowns(state["player_cd"], pa)
+        self.set_cooldowns(state["enemy_cd"], ea)
+
+        p_kind = rules.kind[pa]
+        e_kind = rules.kind[ea]
+        p_roll = self.roll(pa)
+        e_roll = self.roll(ea)
+
+        # ход игрока
+        p_heal = p_kind == HEAL
+        state["player_hp"] = np.where(p_heal, np.minimum(state["player_max"], state["player_hp"] + p_roll),
+                                      state["player_hp"])
+        player_damage = rules.player_damage[pt, et, pa, ea, state["enemy_defending"].astype(np.int8),
+                                            np.where(p_heal, 0, p_roll)]
+
+        # защита игрока обрывает раунд: действие врага не считается
+        p_defense = p_kind == DEFENSE
+        state["player_defending"] |= p_defense
+        enemy_acts = ~p_defense
+
+        e_heal = enemy_acts & (e_kind == HEAL)
+        state["enemy_hp"] = np.where(e_heal, np.minimum(state["enemy_max"], state["enemy_hp"] + e_roll),
+                                     state["enemy_hp"])
+        enemy_damage = rules.enemy_damage[pt, et, pa, ea, state["player_defending"].astype(np.int8),
+                                          np.where(e_kind == HEAL, 0, e_roll)]
+
+        state["enemy_defending"] |= enemy_acts & (e_kind == DEFENSE)
+
+        # apply_damage
+        state["enemy_hp"] = np.maximum(0, state["enemy_hp"] - player_damage).astype(np.int32)
+        state["player_hp"] = np.maximum(0, state["player_hp"] - enemy_damage).astype(np.int32)
+        state["player_defending"][:] = False
+        state["enemy_defending"][:] = False
+        state["player_cd"] = np.maximum(0, state["player_cd"] - 1).astype(np.int8)
+        state["enemy_cd"] = np.maximum(0, state["enemy_cd"] - 1).astype(np.int8)
+
+        return player_damage, enemy_damage, pa
+
+
+class BalanceReport:
+    """Итоги пакетной симуляции: победы по парам типов и по действиям"""
+
+    def __init__(self, rules, player_types, enemy_types, winner, rounds, used,
+                 action_uses, action_dealt, action_taken):
+        self.rules = rules
+        n_types = len(rules.types)
+        pair = player_types * n_types + enemy_types
+
+        self.battles = len(winner)
+        self.unfinished = int((winner == 0).sum())
+        self.mean_rounds = float(rounds.mean()) if len(rounds) else 0.0
+        self.matchup_battles = np.bincount(pair, minlength=n_types ** 2).reshape(n_types, n_types)
+        self.matchup_wins = np.bincount(pair, weights=winner == 1, minlength=n_types ** 2).reshape(n_types, n_types)
+
+        self.action_uses = action_uses
+        self.action_dealt = action_dealt
+        self.action_taken = action_taken
+        self.action_battles = used.sum(axis=0)
+        self.action_wins = (used & (winner == 1)[:, None]).sum(axis=0)
+
+    def matchup_win_rates(self):
+        """Доля побед игрока: строки - тип игрока, столбцы - тип врага"""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.matchup_wins / self.matchup_battles
+
+    def action_win_rates(self):
+        """Доля выигранных боев среди тех, где игрок хоть раз выбрал действие"""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.action_wins / self.action_battles
+
+    def format(self):
+        rules = self.rules
+        lines = [f"Боев: {self.battles}, в среднем раундов: {self.mean_rounds:.2f}, "
+                 f"не закончено: {self.unfinished}", "", "Победы игрока по типам (игрок \\ враг):"]
+        width = max(len(t) for t in rules.types) + 2
+        lines.append(" " * width + "".join(f"{t:>{width}}" for t in rules.types))
+        rates = self.matchup_win_rates()
+        for i, t in enumerate(rules.types):
+            lines.append(f"{t:<{width}}" + "".join(f"{rate:>{width}.3f}" for rate in rates[i]))
+
+        lines += ["", "Действия игрока:"]
+        action_rates = self.action_win_rates()
+        for i, a in enumerate(rules.actions):
+            uses = max(1, self.action_uses[i])
+            lines.append(f"{a:<15} выбрано {self.action_uses[i]:>10}  "
+                         f"урон {self.action_dealt[i] / uses:6.2f}  "
+                         f"получено {self.action_taken[i] / uses:6.2f}  "
+                         f"победы {action_rates[i]:.3f}")
+        return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Пакетная симуляция баланса боев Морти")
+    parser.add_argument("-n", "--battles", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--level", type=int, default=1, help="уровень врага")
+    parser.add_argument("--max-rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    report = BalanceSimulator(seed=args.seed, max_rounds=args.max_rounds).run(args.battles,
+                                                                              enemy_levels=args.level)
+    elapsed = time.perf_counter() - start
+    print(report.format())
+    print(f"\nВремя: {elapsed:.2f} с")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+import time
+from collections import OrderedDict
+
+from battle_engine import SPECIAL_ACTIONS
+
+
+class TranspositionTable:
+    """Ограниченная таблица уже посчитанных состояний (LRU)"""
+
+    def __init__(self, max_entries=50000):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self.entries[key] = value
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+
+class SearchTimeout(Exception):
+    """Время на поиск вышло посреди глубины"""
+
+
+class SearchState:
+    """Сжатое состояние боя для поиска: HP, кулдауны и флаги защиты"""
+
+    __slots__ = ("player_hp", "enemy_hp", "player_cd", "enemy_cd", "player_defending", "enemy_defending")
+
+    def __init__(self, player_hp, enemy_hp, player_cd, enemy_cd, player_defending=False, enemy_defending=False):
+        self.player_hp = player_hp
+        self.enemy_hp = enemy_hp
+        self.player_cd = player_cd
+        self.enemy_cd = enemy_cd
+        self.player_defending = player_defending
+        self.enemy_defending = enemy_defending
+
+
+class ExpectimaxPolicy:
+    """Враг, который просчитывает несколько ходов вперед по ожидаемому урону"""
+
+    def __init__(self, depth=3, hp_bucket=5, table_size=50000, time_budget_ms=15):
+        self.depth = depth
+        self.hp_bucket = hp_bucket
+        self.time_budget = time_budget_ms / 1000
+        self.table = TranspositionTable(table_size)
+        self.deadline = None
+        # незаконченный поиск: (состояние, последняя законченная глубина, лучший ход на ней)
+        self.pending = None
+
+    def __call__(self, engine, is_player):
+        return self.choose(engine, is_player)
+
+    def choose(self, engine, is_player=False):
+        """Лучшее действие для стороны is_player в текущем состоянии движка"""
+        return self.think(engine, is_player)
+
+    def think(self, engine, is_player=False, budget_ms=None):
+        """Углубляет поиск, пока есть время, и возвращает лучший ход последней законченной глубины
+
+        Если состояние не изменилось с прошлого вызова, поиск продолжается с той же
+        глубины (уже посчитанные узлы лежат в таблице): так сцена думает за врага
+        порциями, пока идет пауза перед его ходом.
+        """
+        self.engine = engine
+        self.player = engine.player_morty
+        self.enemy = engine.enemy_morty
+        self.actions = list(engine.attacks.keys())
+        self.matchup = (self.player.morty_type, self.enemy.morty_type, self.player.max_hp, self.enemy.max_hp)
+
+        state = SearchState(
+            self.player.hp, self.enemy.hp,
+            tuple(engine.player_cooldowns.get(action, 0) for action in SPECIAL_ACTIONS),
+            tuple(engine.enemy_cooldowns.get(action, 0) for action in SPECIAL_ACTIONS),
+            engine.player_defending, engine.enemy_defending,
+        )
+
+        key = (self.matchup, is_player, state.player_hp, state.enemy_hp, state.player_cd, state.enemy_cd,
+               state.player_defending, state.enemy_defending)
+        done, best = self.pending[1:] if self.pending and self.pending[0] == key else (0, None)
+
+        # итеративное углубление; value() обрывает глубину по дедлайну, и остается ход
+        # последней законченной. Первая глубина считается всегда: иначе нечего вернуть
+        budget = self.time_budget if budget_ms is None else budget_ms / 1000
+        start = time.perf_counter()
+        try:
+            for depth in range(done + 1, self.depth + 1):
+                self.deadline = start + budget if best is not None else None
+                best = self.best_action(state, depth, is_player)
+                done = depth
+        except SearchTimeout:
+            pass
+        finally:
+            self.deadline = None
+        self.pending = (key, done, best)
+        return best
+
+    def available(self, cooldowns):
+        return [action for action in self.actions
+                if action not in SPECIAL_ACTIONS or cooldowns[SPECIAL_ACTIONS.index(action)] <= 0]
+
+    def best_action(self, state, depth, is_player):
+        mine = self.available(state.player_cd if is_player else state.enemy_cd)
+        theirs = self.available(state.enemy_cd if is_player else state.player_cd)
+        best_value = None
+        best = mine[0]
+        for action in mine:
+            value = self.action_value(state, action, theirs, depth, is_player)
+            if best_value is None or value > best_value:
+                best_value = value
+                best = action
+        return best
+
+    def action_value(self, state, action, theirs, depth, is_player):
+        """Среднее по ответам противника (противник считается случайным)"""
+        total = 0
+        for answer in theirs:
+            if is_player:
+                next_state, winner = self.resolve(state, action, answer)
+            else:
+                next_state, winner = self.resolve(state, answer, action)
+            if winner is not None:
+                total += 1 if (winner == "player") == is_player else -1
+            else:
+                total += self.value(next_state, depth - 1, is_player)
+        return total / len(theirs)
+
+    def value(self, state, depth, is_player):
+        if depth <= 0:
+            return self.evaluate(state, is_player)
+
+        key = self.key(state, depth, is_player)
+        cached = self.table.get(key)
+        if cached is not None:
+            return cached
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+
+        mine = self.available(state.player_cd if is_player else state.enemy_cd)
+        theirs = self.available(state.enemy_cd if is_player else state.player_cd)
+        value = max(self.action_value(state, action, theirs, depth, is_player) for action in mine)
+        self.table.put(key, value)
+        return value
+
+    def key(self, state, depth, is_player):
+        bucket = self.hp_bucket
+        return (self.matchup, depth, is_player, int(state.player_hp // bucket), int(state.enemy_hp // bucket),
+                state.player_cd, state.enemy_cd, state.player_defending, state.enemy_defending)
+
+    def evaluate(self, state, is_player):
+        """Разница долей HP с точки зрения ищущей стороны"""
+        score = state.enemy_hp / self.enemy.max_hp - state.player_hp / self.player.max_hp
+        return -score if is_player else score
+
+    def resolve(self, state, player_choice, enemy_choice):
+        """Ожидаемый исход раунда по тем же таблицам урона, что и BattleEngine.calculate_round_results"""
+        tables = self.engine.tables
+        pt = self.player.type_code
+        et = self.enemy.type_code
+        pa = tables.action_index[player_choice]
+        ea = tables.action_index[enemy_choice]
+        player_hp = state.player_hp
+        enemy_hp = state.enemy_hp
+        player_damage = enemy_damage = 0
+
+        # защита игрока обрывает раунд до хода врага
+        player_kind = tables.kind[pa]
+        if player_kind != "defense":
+            if player_kind == "heal":
+                player_hp = min(self.player.max_hp, player_hp + tables.mean_roll(pa))
+            else:
+                player_damage = tables.mean_damage(tables.index(pt, et, pa, ea, state.enemy_defending), pa)
+
+            enemy_kind = tables.kind[ea]
+            if enemy_kind == "heal":
+                enemy_hp = min(self.enemy.max_hp, enemy_hp + tables.mean_roll(ea))
+            elif enemy_kind != "defense":
+                enemy_damage = tables.mean_damage(tables.index(pt, et, pa, ea, state.player_defending), ea,
+                                                  player=False)
+
+        enemy_hp = max(0, enemy_hp - player_damage)
+        player_hp = max(0, player_hp - enemy_damage)
+
+        # враг проверяется первым, как в apply_damage
+        if enemy_hp <= 0:
+            return None, "player"
+        if player_hp <= 0:
+            return None, "enemy"
+
+        next_state = SearchState(player_hp, enemy_hp,
+                                 self.tick(state.player_cd, player_choice),
+                                 self.tick(state.enemy_cd, enemy_choice))
+        return next_state, None
+
+    def tick(self, cooldowns, choice):
+        """Ставит кулдаун выбранному действию и уменьшает все кулдауны на 1"""
+        values = list(cooldowns)
+        if choice in SPECIAL_ACTIONS:
+            values[SPECIAL_ACTIONS.index(choice)] = self.engine.attacks[choice].get("cooldown", 2)
+        return tuple(max(0, value - 1) for value in values)
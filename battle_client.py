@@ -0,0 +1,218 @@
+import asyncio
+import math
+import queue
+import threading
+
+import pygame
+
+from battle_engine import MORTY_TYPES, SPECIAL_ACTIONS, TYPE_NAMES
+from battle_protocol import (ACTION, ACTION_CODES, CLOSED, DRAW, FIND, LEAVE, MATCH, OPPONENT_LEFT, QUEUED, REJECT,
+                             REJECT_REASONS, REMATCH, ROUND, WAIT, WINNER_ME, BattleClient, MatchInfo, RoundInfo)
+
+
+class ClientThread:
+    """BattleClient в фоновом потоке для игрового цикла pygame
+
+    Основной поток вызывает send() и забирает входящие сообщения через poll();
+    сетью занимается свой цикл asyncio. Когда соединение закрывается (или не
+    открылось), во входящие кладется (CLOSED, b"").
+    """
+
+    def __init__(self, host, port, name=""):
+        self.host = host
+        self.port = port
+        self.name = name
+        self.incoming = queue.Queue()
+        self.outgoing = []
+        self.lock = threading.Lock()
+        self.client = None
+        self.error = None
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_until_complete, args=(self.run(),), daemon=True)
+        self.thread.start()
+
+    async def run(self):
+        try:
+            client = await BattleClient.connect(self.host, self.port, self.name)
+            with self.lock:
+                self.client = client
+                for message in self.outgoing:
+                    client.send(*message)
+                self.outgoing.clear()
+            while True:
+                self.incoming.put(await client.receive())
+        except (OSError, asyncio.IncompleteReadError, ValueError) as error:
+            self.error = error
+        finally:
+            self.incoming.put((CLOSED, b""))
+            if self.client is not None:
+                await self.client.close()
+
+    def send(self, message_type, payload=b""):
+        """Отправка из основного потока; до подключения сообщения копятся"""
+        with self.lock:
+            if self.client is None:
+                self.outgoing.append((message_type, payload))
+                return
+        self.loop.call_soon_threadsafe(self.client.send, message_type, payload)
+
+    def poll(self):
+        """Пришедшие сообщения [(тип, данные)] (основной поток)"""
+        messages = []
+        while True:
+            try:
+                messages.append(self.incoming.get_nowait())
+            except queue.Empty:
+                return messages
+
+    def close(self):
+        if self.client is not None and self.thread.is_alive():
+            self.loop.call_soon_threadsafe(self.client.writer.close)
+
+
+class NetworkBattle:
+    """MortyBattle против человека через сервер боев (battle_server.py)
+
+    События проходят через MortyBattle.handle_event как обычно, но выбор
+    игрока уходит на сервер, а вместо хода врага сцена ждет итог раунда от
+    сервера. Итог раскладывается в поля движка так же, как после enemy_choose,
+    поэтому рисование, SPACE и apply_damage остаются прежними.
+
+    Сцена живет в SceneManager между входами: соединение остается открытым,
+    при уходе со сцены (suspend) бой покидается, при входе (resume) ищется новый.
+    """
+
+    def __init__(self, battle, client):
+        self.battle = battle
+        self.client = client
+        self.connected = True
+        self.winner = None
+
+    def resume(self):
+        # то, что пришло после ухода, относится к старому бою
+        for message_type, payload in self.client.poll():
+            if message_type == CLOSED:
+                self.connected = False
+        if not self.connected:
+            self.wait("Нет связи с сервером")
+            return
+        self.wait("Поиск соперника...")
+        self.client.send(FIND)
+
+    def suspend(self):
+        if self.connected:
+            self.client.send(LEAVE)
+
+    def wait(self, message):
+        """Ожидание сервера: сцена в состоянии хода врага, но сама враг не выбирает"""
+        battle = self.battle
+        battle.engine.game_state = "enemy_turn"
+        battle.enemy_choice_timer = math.inf
+        battle.show_message(message, math.inf)
+
+    def handle_event(self, event):
+        battle = self.battle
+        state = battle.game_state
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_SPACE and state == "enemy_turn":
+                # пропустить ожидание нельзя: ход соперника решает сервер
+                return None
+            if event.key == pygame.K_r and state == "game_over":
+                if self.connected:
+                    self.client.send(REMATCH)
+                    self.wait("Ждем соперника...")
+                return None
+        result = battle.handle_event(event)
+        if result == "quit":
+            self.close()
+        elif state == "round_result" and battle.game_state == "game_over":
+            # при обоюдном нокауте победителя решает сервер, а не порядок проверок apply_damage
+            if self.winner == WINNER_ME:
+                battle.message = "Победа! Соперник побежден!"
+            elif self.winner == DRAW:
+                battle.message = "Ничья! Оба Морти повержены!"
+            else:
+                battle.message = "Поражение! Соперник победил!"
+        elif state == "player_turn" and battle.game_state == "enemy_turn":
+            self.client.send(ACTION, bytes([ACTION_CODES[battle.player_choice]]))
+            battle.enemy_choice_timer = math.inf
+        return result
+
+    def update(self, dt):
+        for message_type, payload in self.client.poll():
+            self.receive(message_type, payload)
+        return self.battle.update(dt)
+
+    def receive(self, message_type, payload):
+        battle = self.battle
+        if message_type == MATCH:
+            self.start_match(MatchInfo.unpack(payload))
+        elif message_type == ROUND:
+            self.apply_round(RoundInfo.unpack(payload))
+        elif message_type == WAIT:
+            battle.show_message("Соперник еще выбирает...", math.inf)
+        elif message_type == QUEUED:
+            self.wait("Поиск соперника...")
+        elif message_type == OPPONENT_LEFT:
+            self.wait("Соперник вышел. Поиск нового...")
+            self.client.send(FIND)
+        elif message_type == REJECT:
+            reason = REJECT_REASONS.get(payload[0], "ошибка") if payload else "ошибка"
+            if battle.game_state == "enemy_turn" and battle.player_choice is not None:
+                # выбор не принят: возвращаем ход, кулдаун не считается
+                battle.player_cooldowns.pop(battle.player_choice, None)
+                battle.engine.game_state = "player_turn"
+            battle.show_message(f"Сервер: {reason}", 1500)
+        elif message_type == CLOSED:
+            self.connected = False
+            self.wait("Нет связи с сервером")
+
+    def start_match(self, info):
+        """Новый бой: типы и HP с сервера, свой Морти - всегда снизу"""
+        battle = self.battle
+        engine = battle.engine
+        engine.set_matchup(TYPE_NAMES[info.my_type], TYPE_NAMES[info.opp_type], info.opp_level)
+        for morty, level, hp, max_hp in ((engine.player_morty, info.my_level, info.my_hp, info.my_max_hp),
+                                         (engine.enemy_morty, info.opp_level, info.opp_hp, info.opp_max_hp)):
+            morty.level = level
+            morty.hp = hp
+            morty.max_hp = max_hp
+        battle.reset_round()
+        my_name = MORTY_TYPES[engine.player_morty.morty_type]["name"]
+        opp_name = MORTY_TYPES[engine.enemy_morty.morty_type]["name"]
+        battle.show_message(f"Соперник найден! {my_name} против {opp_name}", 2500)
+
+    def apply_round(self, info):
+        """Итог раунда от сервера - в поля движка, как после enemy_choose"""
+        battle = self.battle
+        engine = battle.engine
+        engine.player_choice = info.my_action
+        engine.enemy_choice = info.opp_action
+        if info.opp_action in SPECIAL_ACTIONS:
+            engine.enemy_cooldowns[info.opp_action] = engine.attacks[info.opp_action].get("cooldown", 2)
+        engine.round_damage_player = info.my_damage
+        engine.round_damage_enemy = info.opp_damage
+        engine.player_heal = info.my_heal
+        engine.enemy_heal = info.opp_heal
+        engine.player_defending = info.my_defending
+        engine.enemy_defending = info.opp_defending
+        engine.type_bonus = info.type_bonus
+        engine.player_morty.hp = info.my_hp
+        engine.enemy_morty.hp = info.opp_hp
+        engine.round_result = engine.round_text()
+        engine.game_state = "round_result"
+        self.winner = info.winner
+
+        battle.message_timer = 0
+        battle.round_result_timer = battle.round_result_delay
+        battle.combat_animation = True
+        battle.combat_timer = 0
+
+    def invalidate(self):
+        self.battle.invalidate()
+
+    def draw(self):
+        return self.battle.draw()
+
+    def close(self):
+        self.client.close()
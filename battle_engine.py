@@ -0,0 +1,429 @@
+import copy
+import random
+import sys
+
+from battle_tables import get_tables
+
+
+MORTY_TYPES = {
+    "normal": {
+        "name": "Обычный Морти",
+        "color": (168, 213, 186),
+        "weakness": "rock",
+        "strength": "paper"
+    },
+    "evil": {
+        "name": "Злой Морти",
+        "color": (247, 168, 168),
+        "weakness": "scissors",
+        "strength": "rock"
+    },
+    "scientist": {
+        "name": "Ученый Морти",
+        "color": (168, 200, 247),
+        "weakness": "paper",
+        "strength": "scissors"
+    },
+    "warrior": {
+        "name": "Воин Морти",
+        "color": (247, 213, 168),
+        "weakness": "scissors",
+        "strength": "rock"
+    }
+}
+
+ATTACKS = {
+    "rock": {
+        "name": "🪨 Камень",
+        "beats": "scissors",
+        "damage": (20, 30),
+        "type": "attack"
+    },
+    "scissors": {
+        "name": "✂️ Ножницы",
+        "beats": "paper",
+        "damage": (15, 25),
+        "type": "attack"
+    },
+    "paper": {
+        "name": "📄 Бумага",
+        "beats": "rock",
+        "damage": (18, 28),
+        "type": "attack"
+    },
+    "heal": {
+        "name": "💊 Лечение",
+        "beats": None,
+        "heal_amount": (20, 35),
+        "type": "heal"
+    },
+    "strong_attack": {
+        "name": "💥 Сильная атака",
+        "beats": None,
+        "damage": (30, 40),
+        "type": "special_attack",
+        "cooldown": 3
+    },
+    "defense": {
+        "name": "🛡️ Защита",
+        "beats": None,
+        "damage_reduction": 0.5,
+        "type": "defense"
+    }
+}
+
+# Множители урона в раунде
+RPS_WIN_MULTIPLIER = 1.5
+RPS_LOSE_MULTIPLIER = 0.5
+DEFENSE_MULTIPLIER = 0.5
+
+# Действия с кулдауном
+SPECIAL_ACTIONS = ["strong_attack", "heal", "defense"]
+
+# Таблица выбора врага
+ENEMY_CHOICES = ["rock", "scissors", "paper", "heal", "defense", "strong_attack"]
+ENEMY_WEIGHTS = [0.25, 0.25, 0.25, 0.1, 0.1, 0.05]  # Вероятности выбора
+
+
+# Коды типов: Морти хранит номер типа, а не строки и кортежи цветов
+TYPE_NAMES = [sys.intern(morty_type) for morty_type in MORTY_TYPES]
+TYPE_CODES = {morty_type: code for code, morty_type in enumerate(TYPE_NAMES)}
+TYPE_COLORS = [MORTY_TYPES[morty_type]["color"] for morty_type in TYPE_NAMES]
+TYPE_WEAKNESSES = [sys.intern(MORTY_TYPES[morty_type]["weakness"]) for morty_type in TYPE_NAMES]
+TYPE_STRENGTHS = [sys.intern(MORTY_TYPES[morty_type]["strength"]) for morty_type in TYPE_NAMES]
+
+
+class Morty:
+    __slots__ = ("name", "level", "hp", "max_hp", "type_code", "position", "is_player",
+                 "animation_offset", "base_max_hp", "base_level")
+
+    def __init__(self, name, level, max_hp, morty_type, position, is_player=True):
+        self.name = name
+        self.level = level
+        self.hp = max_hp
+        self.max_hp = max_hp
+        self.type_code = TYPE_CODES[morty_type]
+        self.position = position
+        self.is_player = is_player
+        self.animation_offset = 0
+        self.base_max_hp = max_hp
+        self.base_level = level
+
+    @property
+    def morty_type(self):
+        return TYPE_NAMES[self.type_code]
+
+    @property
+    def color(self):
+        return TYPE_COLORS[self.type_code]
+
+    @property
+    def weakness(self):
+        return TYPE_WEAKNESSES[self.type_code]
+
+    @property
+    def strength(self):
+        return TYPE_STRENGTHS[self.type_code]
+
+    def take_damage(self, damage):
+        self.hp = max(0, self.hp - damage)
+        return self.hp <= 0
+
+    def heal(self, amount):
+        self.hp = min(self.max_hp, self.hp + amount)
+        return self.hp
+
+    def level_up(self):
+        """Повышение уровня Морти"""
+        self.level += 1
+        self.max_hp = int(self.base_max_hp * (1 + (self.level - self.base_level) * 0.2))
+        self.hp = self.max_hp
+        return self.level
+
+
+class BattleEngine:
+    """Правила боя без pygame: состояние, ходы и детерминированный ГСЧ"""
+
+    def __init__(self, seed=None, player_position=(0, 0), enemy_position=(0, 0), attacks=None):
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.attacks = copy.deepcopy(attacks if attacks is not None else ATTACKS)
+        self.rebuild_tables()
+        self.player_position = player_position
+        self.enemy_position = enemy_position
+
+        # политика врага: функция (engine, is_player) -> действие, None - таблица весов
+        self.enemy_policy = None
+
+        self.wins_count = 0
+        self.enemy_level = 1
+
+        player_type = self.rng.choice(list(MORTY_TYPES.keys()))
+        enemy_type = self.rng.choice(list(MORTY_TYPES.keys()))
+
+        self.player_morty = Morty("Morty", 1, 100, player_type, player_position, True)
+        self.enemy_morty = Morty("Evil Morty", self.enemy_level, 80, enemy_type, enemy_position, False)
+
+        self.player_cooldowns = {}
+        self.enemy_cooldowns = {}
+
+        self.player_defending = False
+        self.enemy_defending = False
+        self.is_effective = False
+        self.reset_round()
+
+    def reset_round(self):
+        """Сброс раунда для следующего хода"""
+        self.player_choice = None
+        self.enemy_choice = None
+        self.round_result = ""
+        self.round_damage_player = 0
+        self.round_damage_enemy = 0
+        self.player_heal = 0
+        self.enemy_heal = 0
+        self.type_bonus = 0
+        self.game_state = "player_turn"
+        self.player_defending = False
+        self.enemy_defending = False
+
+    def is_on_cooldown(self, action_type, cooldowns):
+        return action_type in cooldowns and cooldowns[action_type] > 0
+
+    def available_actions(self, is_player=True):
+        """Действия, которые сейчас не на кулдауне"""
+        cooldowns = self.player_cooldowns if is_player else self.enemy_cooldowns
+        return [action for action in self.attacks if not self.is_on_cooldown(action, cooldowns)]
+
+    def determine_winner(self, player_attack, enemy_attack):
+        """Определяет победителя в раунде РПС"""
+        if player_attack == enemy_attack:
+            return "draw"
+
+        if player_attack in ["heal", "defense", "strong_attack"] or enemy_attack in ["heal", "defense",
+                                                                                     "strong_attack"]:
+            return "special"
+
+        if self.attacks[player_attack]["beats"] == enemy_attack:
+            return "player"  # Игрок выиграл
+        else:
+            return "enemy"  # Враг выиграл
+
+    def calculate_type_bonus(self, attacker, attack_type, defender):
+        """Рассчитывает бонус урона за тип"""
+        bonus = 0
+
+        if attack_type == defender.weakness:
+            bonus = 50  # +50% урона
+
+        if attacker.strength == attack_type:
+            bonus += 25  # дополнительные +25% урона
+
+        return bonus
+
+    def player_action(self, action_type):
+        """Выбор игрока, возвращает False если действие на кулдауне"""
+        if self.game_state != "player_turn":
+            return False
+
+        if self.is_on_cooldown(action_type, self.player_cooldowns):
+            return False
+
+        self.player_choice = action_type
+        self.game_state = "enemy_turn"
+
+        # Устанавливаем кулдаун для специальных атак
+        if action_type in SPECIAL_ACTIONS:
+            cooldown = self.attacks[action_type].get("cooldown", 2)
+            self.player_cooldowns[action_type] = cooldown
+        return True
+
+    def choose_enemy_action(self):
+        """Случайный выбор врага по таблице весов"""
+        available_choices = []
+        available_weights = []
+
+        for i, choice in enumerate(ENEMY_CHOICES):
+            if not self.is_on_cooldown(choice, self.enemy_cooldowns):
+                available_choices.append(choice)
+                available_weights.append(ENEMY_WEIGHTS[i])
+
+        # Если все на кулдауне, выбираем из основных атак
+        if not available_choices:
+            available_choices = ["rock", "scissors", "paper"]
+            available_weights = [0.33, 0.33, 0.34]
+
+        return self.rng.choices(available_choices, weights=available_weights, k=1)[0]
+
+    def decide_enemy_action(self):
+        """Действие врага: по политике, если она задана, иначе по таблице весов"""
+        if self.enemy_policy is not None:
+            return self.enemy_policy(self, False)
+        return self.choose_enemy_action()
+
+    def enemy_choose(self, action_type=None):
+        """Враг делает выбор и раунд рассчитывается"""
+        if action_type is None:
+            action_type = self.decide_enemy_action()
+        self.enemy_choice = action_type
+
+        if self.enemy_choice in SPECIAL_ACTIONS:
+            cooldown = self.attacks[self.enemy_choice].get("cooldown", 2)
+            self.enemy_cooldowns[self.enemy_choice] = cooldown
+
+        self.game_state = "round_result"
+        self.calculate_round_results()
+        return self.enemy_choice
+
+    def rebuild_tables(self):
+        """Пересчитывает таблицы урона после изменения self.attacks или множителей"""
+        self.tables = get_tables(self.attacks, MORTY_TYPES, RPS_WIN_MULTIPLIER, RPS_LOSE_MULTIPLIER,
+                                 DEFENSE_MULTIPLIER)
+
+    def calculate_round_results(self):
+        """Рассчитывает результаты раунда по готовым таблицам урона"""
+        self.round_damage_player = 0
+        self.round_damage_enemy = 0
+        self.player_heal = 0
+        self.enemy_heal = 0
+        self.type_bonus = 0
+
+        tables = self.tables
+        pt = self.player_morty.type_code
+        et = self.enemy_morty.type_code
+        pa = tables.action_index[self.player_choice]
+        ea = tables.action_index[self.enemy_choice]
+
+        player_kind = tables.kind[pa]
+        if player_kind == "defense":
+            #  игрок защищается
+            self.player_defending = True
+            self.round_result = self.round_text()
+            return
+
+        roll = self.rng.randint(*tables.rolls[pa])
+        if player_kind == "heal":
+            self.player_heal = roll
+            self.player_morty.heal(roll)
+        else:
+            if player_kind == "attack":
+                self.type_bonus = tables.type_bonus[pt][pa][et]
+            self.round_damage_player = tables.player_damage[tables.index(pt, et, pa, ea, self.enemy_defending)][roll]
+
+        enemy_kind = tables.kind[ea]
+        if enemy_kind == "defense":
+            self.enemy_defending = True
+            self.round_result = self.round_text()
+            return
+
+        roll = self.rng.randint(*tables.rolls[ea])
+        if enemy_kind == "heal":
+            self.enemy_heal = roll
+            self.enemy_morty.heal(roll)
+        else:
+            self.round_damage_enemy = tables.enemy_damage[tables.index(pt, et, pa, ea, self.player_defending)][roll]
+
+        self.round_result = self.round_text()
+
+    def round_text(self):
+        """Текст результата раунда: зависит только от выборов сторон и лечения"""
+        tables = self.tables
+        pa = tables.action_index[self.player_choice]
+        ea = tables.action_index[self.enemy_choice]
+        if tables.kind[pa] == "defense":
+            return "Вы защищаетесь! Урон снижен на 50%"
+        if tables.kind[ea] == "defense":
+            return "Враг защищается! Урон снижен на 50%"
+
+        result = tables.outcome[pa][ea]
+        player_action = self.attacks[self.player_choice]
+        enemy_action = self.attacks[self.enemy_choice]
+        if result == "player":
+            return f"{player_action['name']} выигрывает у {enemy_action['name']}!"
+        elif result == "enemy":
+            return f"{enemy_action['name']} выигрывает у {player_action['name']}!"
+        elif result == "draw":
+            return "Ничья! Оба получают урон!"
+        elif self.player_heal > 0:
+            return f"Вы восстановили {self.player_heal} HP!"
+        elif self.enemy_heal > 0:
+            return f"Враг восстановил {self.enemy_heal} HP!"
+        return "Специальные действия!"
+
+    def apply_damage(self):
+        """Применяет урон от раунда, возвращает "player"/"enemy" если бой окончен"""
+        enemy_defeated = False
+        player_defeated = False
+
+        if self.round_damage_player > 0:
+            enemy_defeated = self.enemy_morty.take_damage(self.round_damage_player)
+
+        if self.round_damage_enemy > 0:
+            player_defeated = self.player_morty.take_damage(self.round_damage_enemy)
+
+        self.player_defending = False
+        self.enemy_defending = False
+
+        for action in list(self.player_cooldowns.keys()):
+            if self.player_cooldowns[action] > 0:
+                self.player_cooldowns[action] -= 1
+
+        for action in list(self.enemy_cooldowns.keys()):
+            if self.enemy_cooldowns[action] > 0:
+                self.enemy_cooldowns[action] -= 1
+
+        # Проверяем окончание боя
+        if enemy_defeated:
+            self.game_state = "game_over"
+            self.wins_count += 1
+            self.enemy_level += 1
+            return "player"
+        elif player_defeated:
+            self.game_state = "game_over"
+            self.wins_count = 0
+            self.enemy_level = max(1, self.enemy_level - 1)
+            return "enemy"
+        return None
+
+    def set_matchup(self, player_type, enemy_type, enemy_level=1):
+        """Начинает бой с заданными типами и уровнем врага, как после серии побед"""
+        self.player_morty = Morty("Morty", 1, 100, player_type, self.player_position, True)
+        self.enemy_level = enemy_level
+        self.enemy_morty = Morty("Evil Morty", enemy_level, int(80 * (1 + (enemy_level - 1) * 0.3)),
+                                 enemy_type, self.enemy_position, False)
+        self.player_cooldowns = {}
+        self.enemy_cooldowns = {}
+        self.reset_round()
+
+    def start_new_battle(self):
+        """Начинает новый бой после победы или поражения"""
+        if self.player_morty.hp <= 0:
+            player_type = self.rng.choice(list(MORTY_TYPES.keys()))
+            enemy_type = self.rng.choice(list(MORTY_TYPES.keys()))
+
+            self.player_morty = Morty("Morty", 1, 100, player_type, self.player_position, True)
+            self.enemy_morty = Morty("Evil Morty", 1, 80, enemy_type, self.enemy_position, False)
+            self.enemy_level = 1
+            self.wins_count = 0
+        else:
+            # если игрок выиграл, усиливаем врага
+            enemy_type = self.rng.choice(list(MORTY_TYPES.keys()))
+            self.enemy_morty = Morty("Evil Morty", self.enemy_level,
+                                     int(80 * (1 + (self.enemy_level - 1) * 0.3)),
+                                     enemy_type, self.enemy_position, False)
+            heal_amount = int(self.player_morty.max_hp * 0.3)
+            self.player_morty.heal(heal_amount)
+
+        self.player_cooldowns = {}
+        self.enemy_cooldowns = {}
+
+        self.reset_round()
+
+    def play_round(self, action_type, enemy_action=None):
+        """Полный раунд без задержек: выбор игрока, ответ врага, урон"""
+        if not self.player_action(action_type):
+            return None
+        self.enemy_choose(enemy_action)
+        winner = self.apply_damage()
+        if winner is None:
+            self.reset_round()
+        return winner
@@ -0,0 +1,58 @@
+from battle_ai import ExpectimaxPolicy
+from battle_engine import ENEMY_CHOICES, ENEMY_WEIGHTS
+
+
+def opponent_of(engine, is_player):
+    """Возвращает (свой Морти, Морти противника)"""
+    if is_player:
+        return engine.player_morty, engine.enemy_morty
+    return engine.enemy_morty, engine.player_morty
+
+
+def random_policy(engine, is_player):
+    """Равновероятно любое доступное действие"""
+    return engine.rng.choice(engine.available_actions(is_player))
+
+
+def table_policy(engine, is_player):
+    """Выбор по таблице весов врага из enemy_choose"""
+    available = engine.available_actions(is_player)
+    choices = [choice for choice in ENEMY_CHOICES if choice in available]
+    weights = [ENEMY_WEIGHTS[ENEMY_CHOICES.index(choice)] for choice in choices]
+    return engine.rng.choices(choices, weights=weights, k=1)[0]
+
+
+def expected_damage(engine, action_type, attacker, defender, is_player):
+    """Ожидаемый урон действия без учета ответа противника"""
+    action = engine.attacks[action_type]
+    if "damage" not in action:
+        return 0
+    low, high = action["damage"]
+    if action["type"] == "special_attack":
+        # у игрока сильная атака считает бонус как камень, у врага бонуса нет
+        bonus = engine.calculate_type_bonus(attacker, "rock", defender) if is_player else 0
+    else:
+        bonus = engine.calculate_type_bonus(attacker, action_type, defender)
+    return (low + high) / 2 * (1 + bonus / 100)
+
+
+def greedy_policy(engine, is_player):
+    """Лечится при низком HP, иначе бьет атакой с наибольшим ожидаемым уроном"""
+    me, enemy = opponent_of(engine, is_player)
+    available = engine.available_actions(is_player)
+
+    if "heal" in available and me.hp < me.max_hp * 0.35:
+        return "heal"
+
+    attacks = [action for action in available if "damage" in engine.attacks[action]]
+    if not attacks:
+        return engine.rng.choice(available)
+    return max(attacks, key=lambda action: expected_damage(engine, action, me, enemy, is_player))
+
+
+POLICIES = {
+    "random": random_policy,
+    "table": table_policy,
+    "greedy": greedy_policy,
+    "expectimax": ExpectimaxPolicy(),
+}
@@ -0,0 +1,175 @@
+import asyncio
+import struct
+
+from battle_engine import ATTACKS
+
+
+VERSION = 1
+
+# Кадр: длина (u16, тип + данные), тип сообщения (u8), данные
+FRAME = struct.Struct("<HB")
+MAX_FRAME = 256
+
+# клиент -> сервер
+HELLO = 0x01  # версия (u8) и имя (utf-8 до конца кадра)
+FIND = 0x02  # встать в очередь на бой
+ACTION = 0x03  # код действия (u8)
+REMATCH = 0x04  # после конца боя: готов к следующему
+LEAVE = 0x05  # выйти из боя
+
+# сервер -> клиент
+MATCH = 0x81  # начался бой (MatchInfo)
+WAIT = 0x82  # выбор принят, ждем соперника
+ROUND = 0x83  # итог раунда (RoundInfo)
+REJECT = 0x84  # сообщение отклонено, причина (u8)
+OPPONENT_LEFT = 0x85
+QUEUED = 0x86  # в очереди, соперника пока нет
+
+# не приходит по сети: клиент сам кладет его во входящие, когда соединение закрылось
+CLOSED = 0x00
+
+# причины REJECT
+COOLDOWN = 1
+NO_MATCH = 2
+ALREADY_CHOSE = 3
+BAD_MESSAGE = 4
+BAD_VERSION = 5
+REJECT_REASONS = {
+    COOLDOWN: "действие на кулдауне",
+    NO_MATCH: "нет активного боя",
+    ALREADY_CHOSE: "выбор уже сделан",
+    BAD_MESSAGE: "неверное сообщение",
+    BAD_VERSION: "неподдерживаемая версия протокола",
+}
+
+# код действия - индекс в ACTIONS
+ACTIONS = list(ATTACKS)
+ACTION_CODES = {action: code for code, action in enumerate(ACTIONS)}
+
+# победитель в RoundInfo
+NO_WINNER = 0
+WINNER_ME = 1
+WINNER_OPPONENT = 2
+DRAW = 3  # оба Морти пали в одном раунде
+
+
+def frame(message_type, payload=b""):
+    return FRAME.pack(len(payload) + 1, message_type) + payload
+
+
+async def read_frame(reader):
+    """Следующее сообщение (тип, данные); при закрытом соединении - asyncio.IncompleteReadError"""
+    length, = struct.unpack("<H", await reader.readexactly(2))
+    if not 1 <= length <= MAX_FRAME:
+        raise ValueError(f"неверная длина кадра: {length}")
+    data = await reader.readexactly(length)
+    return data[0], data[1:]
+
+
+class MatchInfo:
+    """Начало боя с точки зрения получателя: его Морти - my_*, соперника - opp_*"""
+
+    __slots__ = ("seat", "my_type", "opp_type", "my_level", "opp_level",
+                 "my_hp", "my_max_hp", "opp_hp", "opp_max_hp")
+    FORMAT = struct.Struct("<BBBBBHHHH")
+
+    def __init__(self, seat, my_type, opp_type, my_level, opp_level, my_hp, my_max_hp, opp_hp, opp_max_hp):
+        self.seat = seat
+        self.my_type = my_type
+        self.opp_type = opp_type
+        self.my_level = my_level
+        self.opp_level = opp_level
+        self.my_hp = my_hp
+        self.my_max_hp = my_max_hp
+        self.opp_hp = opp_hp
+        self.opp_max_hp = opp_max_hp
+
+    def pack(self):
+        return self.FORMAT.pack(self.seat, self.my_type, self.opp_type, self.my_level, self.opp_level,
+                                self.my_hp, self.my_max_hp, self.opp_hp, self.opp_max_hp)
+
+    @classmethod
+    def unpack(cls, payload):
+        return cls(*cls.FORMAT.unpack(payload))
+
+
+class RoundInfo:
+    """Итог раунда с точки зрения получателя
+
+    HP - после выбора и лечения, но до урона: урон клиент применяет сам
+    (apply_damage), как и в одиночном бою.
+    """
+
+    __slots__ = ("my_action", "opp_action", "my_damage", "opp_damage", "my_heal", "opp_heal",
+                 "my_defending", "opp_defending", "type_bonus", "my_hp", "opp_hp", "winner")
+    FORMAT = struct.Struct("<BBHHHHBBHHB")
+
+    def __init__(self, my_action, opp_action, my_damage, opp_damage, my_heal, opp_heal,
+                 my_defending, opp_defending, type_bonus, my_hp, opp_hp, winner):
+        self.my_action = my_action
+        self.opp_action = opp_action
+        self.my_damage = my_damage
+        self.opp_damage = opp_damage
+        self.my_heal = my_heal
+        self.opp_heal = opp_heal
+        self.my_defending = my_defending
+        self.opp_defending = opp_defending
+        self.type_bonus = type_bonus
+        self.my_hp = my_hp
+        self.opp_hp = opp_hp
+        self.winner = winner
+
+    def pack(self):
+        flags = self.my_defending | self.opp_defending << 1
+        return self.FORMAT.pack(ACTION_CODES[self.my_action], ACTION_CODES[self.opp_action],
+                                self.my_damage, self.opp_damage, self.my_heal, self.opp_heal, flags,
+                                self.type_bonus, self.my_hp, self.opp_hp, self.winner)
+
+    @classmethod
+    def unpack(cls, payload):
+        (my_action, opp_action, my_damage, opp_damage, my_heal, opp_heal, flags, type_bonus,
+         my_hp, opp_hp, winner) = cls.FORMAT.unpack(payload)
+        return cls(ACTIONS[my_action], ACTIONS[opp_action], my_damage, opp_damage, my_heal, opp_heal,
+                   bool(flags & 1), bool(flags & 2), type_bonus, my_hp, opp_hp, winner)
+
+
+class BattleClient:
+    """Клиент сервера боев на asyncio: отправка сообщений и чтение входящих"""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, host, port, name=""):
+        reader, writer = await asyncio.open_connection(host, port)
+        client = cls(reader, writer)
+        client.send(HELLO, bytes([VERSION]) + name.encode("utf-8")[:MAX_FRAME - 2])
+        return client
+
+    def send(self, message_type, payload=b""):
+        self.writer.write(frame(message_type, payload))
+
+    def find(self):
+        self.send(FIND)
+
+    def action(self, action_type):
+        self.send(ACTION, bytes([ACTION_CODES[action_type]]))
+
+    def rematch(self):
+        self.send(REMATCH)
+
+    def leave(self):
+        self.send(LEAVE)
+
+    async def receive(self):
+        """Следующее сообщение сервера (тип, данные)"""
+        await self.writer.drain()
+        return await read_frame(self.reader)
+
+    async def close(self):
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
@@ -1,6 +1,11 @@
 import pygame
-import math
-import random
+
+from battle_engine import MORTY_TYPES, BattleEngine
+import gltf_loader
+from asset_manager import assets
+from dirty_rects import DirtyRenderer, Layer
+from morty_sprites import MortySprites
+from render_cache import get_font
 
 
 WHITE = (255, 255, 255)
@@ -17,162 +22,90 @@ GRAY = (100, 100, 100)
 LIGHT_GRAY = (150, 150, 150)
 
 
-MORTY_TYPES = {
-    "normal": {
-        "name": "Обычный Морти",
-        "color": (168, 213, 186),
-        "weakness": "rock",
-        "strength": "paper"
-    },
-    "evil": {
-        "name": "Злой Морти",
-        "color": (247, 168, 168),
-        "weakness": "scissors",
-        "strength": "rock"
-    },
-    "scientist": {
-        "name": "Ученый Морти",
-        "color": (168, 200, 247),
-        "weakness": "paper",
-        "strength": "scissors"
-    },
-    "warrior": {
-        "name": "Воин Морти",
-        "color": (247, 213, 168),
-        "weakness": "scissors",
-        "strength": "rock"
-    }
-}
-
-
-class Morty:
-    def __init__(self, name, level, max_hp, morty_type, position, is_player=True):
-        self.name = name
-        self.level = level
-        self.hp = max_hp
-        self.max_hp = max_hp
-        self.morty_type = morty_type
-        self.color = MORTY_TYPES[morty_type]["color"]
-        self.position = position
-        self.is_player = is_player
-        self.animation_offset = 0
-        self.base_max_hp = max_hp
-        self.base_level = level
-        self.weakness = MORTY_TYPES[morty_type]["weakness"]
-        self.strength = MORTY_TYPES[morty_type]["strength"]
-
-    def take_damage(self, damage):
-        self.hp = max(0, self.hp - damage)
-        return self.hp <= 0
-
-    def heal(self, amount):
-        self.hp = min(self.max_hp, self.hp + amount)
-        return self.hp
-
-    def level_up(self):
-        """Повышение уровня Морти"""
-        self.level += 1
-        self.max_hp = int(self.base_max_hp * (1 + (self.level - self.base_level) * 0.2))
-        self.hp = self.max_hp
-        return self.level
+def engine_field(name):
+    """Свойство сцены, которое читает и пишет поле движка боя"""
+    return property(lambda self: getattr(self.engine, name),
+                    lambda self, value: setattr(self.engine, name, value))
 
 
 class MortyBattle:
-    def __init__(self, screen):
+    # скорость покачивания Морти: 0.1 пикселя за кадр при 60 FPS
+    FLOAT_SPEED = 0.1 / (1000 / 60)
+
+    player_morty = engine_field("player_morty")
+    enemy_morty = engine_field("enemy_morty")
+    attacks = engine_field("attacks")
+    wins_count = engine_field("wins_count")
+    enemy_level = engine_field("enemy_level")
+    game_state = engine_field("game_state")
+    player_choice = engine_field("player_choice")
+    enemy_choice = engine_field("enemy_choice")
+    round_result = engine_field("round_result")
+    round_damage_player = engine_field("round_damage_player")
+    round_damage_enemy = engine_field("round_damage_enemy")
+    player_heal = engine_field("player_heal")
+    enemy_heal = engine_field("enemy_heal")
+    player_defending = engine_field("player_defending")
+    enemy_defending = engine_field("enemy_defending")
+    is_effective = engine_field("is_effective")
+    type_bonus = engine_field("type_bonus")
+    player_cooldowns = engine_field("player_cooldowns")
+    enemy_cooldowns = engine_field("enemy_cooldowns")
+
+    def __init__(self, screen, seed=None, enemy_policy=None, sprite_art=False, layout=None):
         self.screen = screen
         self.screen_width = screen.get_width()
         self.screen_height = screen.get_height()
-        self.background = self.create_background()
 
-        self.wins_count = 0
-        self.enemy_level = 1
+        # кадры Морти рисуются один раз и дальше только копируются на экран
+        sprite_size = min(40, self.screen_width * 0.05)
+        if sprite_art:
+            self.sprites = MortySprites.with_art(sprite_size, assets)
+        else:
+            self.sprites = MortySprites(sprite_size)
+
+        # glTF-раскладка на фоне вместо сетки: проецируется один раз, рисуется в статичном слое
+        self.layout = None
+        if layout:
+            self.layout = gltf_loader.project(gltf_loader.load(layout), gltf_loader.LAYOUT_PITCH)
 
         player_x = self.screen_width * 0.2
         player_y = self.screen_height * 0.7
         enemy_x = self.screen_width * 0.8
         enemy_y = self.screen_height * 0.3
 
-        player_type = random.choice(list(MORTY_TYPES.keys()))
-        enemy_type = random.choice(list(MORTY_TYPES.keys()))
-
-        self.player_morty = Morty("Morty", 1, 100, player_type, (player_x, player_y), True)
-        self.enemy_morty = Morty("Evil Morty", self.enemy_level, 80, enemy_type, (enemy_x, enemy_y), False)
-
-        self.attacks = {
-            "rock": {
-                "name": "🪨 Камень",
-                "beats": "scissors",
-                "damage": (20, 30),
-                "type": "attack"
-            },
-            "scissors": {
-                "name": "✂️ Ножницы",
-                "beats": "paper",
-                "damage": (15, 25),
-                "type": "attack"
-            },
-            "paper": {
-                "name": "📄 Бумага",
-                "beats": "rock",
-                "damage": (18, 28),
-                "type": "attack"
-            },
-            "heal": {
-                "name": "💊 Лечение",
-                "beats": None,
-                "heal_amount": (20, 35),
-                "type": "heal"
-            },
-            "strong_attack": {
-                "name": "💥 Сильная атака",
-                "beats": None,
-                "damage": (30, 40),
-                "type": "special_attack",
-                "cooldown": 3
-            },
-            "defense": {
-                "name": "🛡️ Защита",
-                "beats": None,
-                "damage_reduction": 0.5,
-                "type": "defense"
-            }
-        }
-
-        self.player_choice = None
-        self.enemy_choice = None
-        self.round_result = ""
-
-        self.game_state = "player_turn"
+        # правила и состояние боя живут в движке, сцена только рисует
+        self.engine = BattleEngine(seed, (player_x, player_y), (enemy_x, enemy_y))
+        self.engine.enemy_policy = enemy_policy
+
         self.message = ""
         self.message_timer = 0
 
-        self.round_damage_player = 0
-        self.round_damage_enemy = 0
-        self.player_heal = 0
-        self.enemy_heal = 0
-        self.player_defending = False
-        self.enemy_defending = False
-        self.is_effective = False
-        self.type_bonus = 0
-
         self.animation_direction = 1
         self.combat_animation = False
         self.combat_timer = 0
 
-        self.player_cooldowns = {}
-        self.enemy_cooldowns = {}
-
         self.create_action_buttons()
 
         self.back_button = pygame.Rect(20, 20, 100, 30)
 
         self.enemy_choice_timer = 0
         self.enemy_choice_delay = 1000
+        # сколько мс за шаг обновления враг с поиском (ExpectimaxPolicy) думает во время паузы
+        self.enemy_think_ms = 4
         self.round_result_timer = 0
         self.round_result_delay = 3000
 
-        player_type_name = MORTY_TYPES[player_type]["name"]
-        enemy_type_name = MORTY_TYPES[enemy_type]["name"]
+        # фон и статичная обвязка (платформы, рамки, кнопка назад)
+        # запекаются в один слой; каждый кадр рисуется только то, что меняется.
+        # draw_* вызываются через self при отрисовке, а не сохраняются заранее:
+        # profiler.instrument подменяет их у экземпляра уже после конструктора
+        self.chrome = Layer(self.screen.get_size, lambda surface: self.draw_chrome(surface))
+        self.renderer = DirtyRenderer(self.screen, self.chrome)
+        self.create_widgets()
+
+        player_type_name = MORTY_TYPES[self.player_morty.morty_type]["name"]
+        enemy_type_name = MORTY_TYPES[self.enemy_morty.morty_type]["name"]
         self.show_message(f"Битва начинается! Ваш тип: {player_type_name} против {enemy_type_name}", 2500)
 
     def create_action_buttons(self):
@@ -218,76 +151,75 @@ class MortyBattle:
         return background
 
     def draw_morty(self, morty, is_attacking=False, damage_effect=False, heal_effect=False):
-        """Рисует Морти с возможностью анимации атаки"""
+        """Рисует Морти готовым кадром из кэша спрайтов"""
         x, y = morty.position
+        self.sprites.blit(self.screen, (x, y + morty.animation_offset),
+                          self.sprite_key(morty, is_attacking, damage_effect, heal_effect))
 
-        y += morty.animation_offset
+    def sprite_key(self, morty, is_attacking=False, damage_effect=False, heal_effect=False):
+        """Ключ кадра Морти: эффекты видны только во время анимации боя"""
+        animate = self.combat_animation
+        view = "back" if morty is self.player_morty else "front"
+        return self.sprites.key(morty.color, is_attacking and animate, damage_effect and animate,
+                                heal_effect and animate, self.combat_timer, view)
 
-        if is_attacking and self.combat_animation:
-            size_mod = 5 * math.sin(self.combat_timer * 0.2)
-        else:
-            size_mod = 0
-
-        if damage_effect and self.combat_animation:
-            damage_color = (255, 100, 100)
-            if int(self.combat_timer / 50) % 2 == 0:
-                damage_color = (255, 200, 200)
-        elif heal_effect and self.combat_animation:
-            damage_color = (100, 255, 100)
-        else:
-            damage_color = morty.color
-
-        size = min(40, self.screen_width * 0.05)
-
-        pygame.draw.circle(self.screen, damage_color, (int(x), int(y)), int(size + size_mod))
-
-        eye_offset = 0
-        if is_attacking and self.combat_animation:
-            eye_offset = 3 * math.sin(self.combat_timer * 0.3)
-
-        eye_size = max(3, size // 10)
-        pygame.draw.circle(self.screen, BLACK, (int(x - size // 3 + eye_offset), int(y - size // 4)), eye_size)
-        pygame.draw.circle(self.screen, BLACK, (int(x + size // 3 + eye_offset), int(y - size // 4)), eye_size)
-
-        mouth_y = y + size // 4
-        if is_attacking and self.combat_animation:
-            mouth_y += 3 * math.sin(self.combat_timer * 0.4)
-
-        if is_attacking and self.combat_animation:
-            pygame.draw.arc(self.screen, BLACK,
-                            (x - size // 2, mouth_y - size // 8, size, size // 2),
-                            math.pi / 6, 5 * math.pi / 6, 3)
-        elif damage_effect and self.combat_animation:
-            pygame.draw.ellipse(self.screen, BLACK,
-                                (x - size // 3, mouth_y - size // 8, size // 1.5, size // 3))
-        elif heal_effect and self.combat_animation:
-            pygame.draw.arc(self.screen, BLACK,
-                            (x - size // 2, mouth_y - size // 8, size, size // 2),
-                            math.pi / 6, 5 * math.pi / 6, 3)
-        else:
-            pygame.draw.line(self.screen, BLACK,
-                             (x - size // 2, mouth_y),
-                             (x + size // 2, mouth_y), 3)
-
-    def draw_platform(self, position, size):
+    def draw_platform(self, position, size, surface=None):
         """Рисует платформу для Морти"""
+        surface = surface or self.screen
         x, y = position
         width, height = size
 
         platform_rect = pygame.Rect(x - width // 2, y - height // 2, width, height)
-        pygame.draw.rect(self.screen, GRAY, platform_rect, border_radius=5)
-        pygame.draw.rect(self.screen, LIGHT_GRAY, platform_rect, 1, border_radius=5)
+        pygame.draw.rect(surface, GRAY, platform_rect, border_radius=5)
+        pygame.draw.rect(surface, LIGHT_GRAY, platform_rect, 1, border_radius=5)
+
+    def draw_frame(self, surface, rect, border_color, border_width, radius, color=DARK_GRAY):
+        """Рамка панели: заливка и обводка со скругленными углами"""
+        pygame.draw.rect(surface, color, rect, border_radius=radius)
+        pygame.draw.rect(surface, border_color, rect, border_width, border_radius=radius)
+
+    def draw_chrome(self, surface):
+        """Статичный слой: фон, платформы, рамки меню, счетчика побед, HP и панелей,
+        подсказка управления и кнопка назад"""
+        if self.layout is not None:
+            surface.blit(self.layout.render(surface.get_size(), background=DARK_GRAY), (0, 0))
+        else:
+            surface.blit(self.create_background(), (0, 0))
+        for position in (self.player_morty.position, self.enemy_morty.position):
+            self.draw_platform(position, self.platform_size, surface)
+        self.draw_frame(surface, self.wins_counter_frame(), GOLD, 2, 5)
+        self.draw_frame(surface, self.battle_menu_frame(), LIGHT_GRAY, 2, 8)
+        for position in self.hp_positions:
+            self.draw_frame(surface, self.hp_bar_frame(position), LIGHT_GRAY, 1, 3)
+        for position in self.info_positions:
+            self.draw_frame(surface, self.info_panel_frame(position), LIGHT_GRAY, 1, 5)
+        self.draw_controls(surface)
+        self.draw_back_button(surface)
+
+    def wins_counter_frame(self):
+        return pygame.Rect(10, 60, 200, 40)
+
+    def battle_menu_frame(self):
+        menu_width = min(500, self.screen_width * 0.8)
+        menu_height = self.screen_height * 0.25
+        return pygame.Rect((self.screen_width - menu_width) // 2,
+                           self.screen_height - menu_height - 20,
+                           menu_width, menu_height)
+
+    def hp_bar_frame(self, position):
+        x, y = position
+        return pygame.Rect(x, y, self.screen_width * 0.15, self.screen_height * 0.02)
+
+    def info_panel_frame(self, position):
+        x, y = position
+        return pygame.Rect(x, y, self.screen_width * 0.15, self.screen_height * 0.08)
 
     def draw_hp_bar(self, morty, position):
-        """Рисует HP бар"""
+        """Рисует заполнение HP бара и текст (рамка - в статичном слое)"""
         x, y = position
         width = self.screen_width * 0.15
         height = self.screen_height * 0.02
 
-        bg_rect = pygame.Rect(x, y, width, height)
-        pygame.draw.rect(self.screen, DARK_GRAY, bg_rect, border_radius=3)
-        pygame.draw.rect(self.screen, LIGHT_GRAY, bg_rect, 1, border_radius=3)
-
         hp_percent = morty.hp / morty.max_hp if morty.max_hp > 0 else 0
         fill_width = max(0, int(width * hp_percent))
         fill_rect = pygame.Rect(x, y, fill_width, height)
@@ -302,7 +234,7 @@ class MortyBattle:
         pygame.draw.rect(self.screen, color, fill_rect, border_radius=3)
 
         font_size = max(12, int(self.screen_height * 0.015))
-        font = pygame.font.SysFont('Arial', font_size)
+        font = get_font('Arial', font_size)
         hp_text = f"HP: {morty.hp}/{morty.max_hp}"
         text_surface = font.render(hp_text, True, WHITE)
         self.screen.blit(text_surface, (
@@ -311,17 +243,11 @@ class MortyBattle:
         ))
 
     def draw_info_panel(self, morty, position):
-        """Рисует информационную панель"""
+        """Рисует текст информационной панели (рамка - в статичном слое)"""
         x, y = position
-        width = self.screen_width * 0.15
-        height = self.screen_height * 0.08
-
-        panel_rect = pygame.Rect(x, y, width, height)
-        pygame.draw.rect(self.screen, DARK_GRAY, panel_rect, border_radius=5)
-        pygame.draw.rect(self.screen, LIGHT_GRAY, panel_rect, 1, border_radius=5)
 
         font_size = max(12, int(self.screen_height * 0.02))
-        font = pygame.font.SysFont('Arial', font_size)
+        font = get_font('Arial', font_size)
 
         type_name = MORTY_TYPES[morty.morty_type]["name"]
         name_text = font.render(f"{type_name}", True, morty.color)
@@ -346,7 +272,7 @@ class MortyBattle:
         if self.game_state in ["enemy_turn", "round_result", "game_over"]:
             if self.enemy_choice and self.player_choice:
                 font_size = max(16, int(self.screen_height * 0.02))
-                font = pygame.font.SysFont('Arial', font_size, bold=True)
+                font = get_font('Arial', font_size, bold=True)
 
                 player_action_text = self.attacks[self.player_choice][
                     "name"] if self.player_choice in self.attacks else "?"
@@ -374,17 +300,11 @@ class MortyBattle:
                                               enemy_bg.centery - enemy_text.get_height() // 2))
 
     def draw_battle_menu(self):
-        """Рисует меню боя"""
-        menu_width = min(500, self.screen_width * 0.8)
+        """Рисует меню боя (рамка меню - в статичном слое)"""
         menu_height = self.screen_height * 0.25
-        menu_rect = pygame.Rect((self.screen_width - menu_width) // 2,
-                                self.screen_height - menu_height - 20,
-                                menu_width, menu_height)
-        pygame.draw.rect(self.screen, DARK_GRAY, menu_rect, border_radius=8)
-        pygame.draw.rect(self.screen, LIGHT_GRAY, menu_rect, 2, border_radius=8)
 
         font_size = max(16, int(self.screen_height * 0.02))
-        font = pygame.font.SysFont('Arial', font_size)
+        font = get_font('Arial', font_size)
 
         if self.game_state == "game_over":
             if self.player_morty.hp <= 0:
@@ -402,7 +322,7 @@ class MortyBattle:
                                  self.screen_height - menu_height + 15))
 
         button_font_size = max(12, int(self.screen_height * 0.018))
-        button_font = pygame.font.SysFont('Arial', button_font_size)
+        button_font = get_font('Arial', button_font_size)
 
         for i, action in enumerate(self.player_actions):
             is_on_cooldown = False
@@ -430,7 +350,7 @@ class MortyBattle:
 
         if self.game_state == "round_result" and self.round_result:
             font_size = max(14, int(self.screen_height * 0.018))
-            font = pygame.font.SysFont('Arial', font_size)
+            font = get_font('Arial', font_size)
 
             result_color = GREEN if "выигрывает" in self.round_result else RED if "проигрывает" in self.round_result else GOLD
             result_text = font.render(self.round_result, True, result_color)
@@ -465,7 +385,7 @@ class MortyBattle:
         """Рисует сообщение боя"""
         if self.message and self.message_timer > 0:
             font_size = max(16, int(self.screen_height * 0.02))
-            font = pygame.font.SysFont('Arial', font_size)
+            font = get_font('Arial', font_size)
             text_surface = font.render(self.message, True, WHITE)
 
             message_rect = pygame.Rect(
@@ -486,13 +406,9 @@ class MortyBattle:
     def draw_wins_counter(self):
         """Рисует счетчик побед"""
         font_size = max(18, int(self.screen_height * 0.022))
-        font = pygame.font.SysFont('Arial', font_size, bold=True)
+        font = get_font('Arial', font_size, bold=True)
         wins_text = font.render(f"Побед подряд: {self.wins_count}", True, GOLD)
 
-        counter_bg = pygame.Rect(10, 60, 200, 40)
-        pygame.draw.rect(self.screen, DARK_GRAY, counter_bg, border_radius=5)
-        pygame.draw.rect(self.screen, GOLD, counter_bg, 2, border_radius=5)
-
         self.screen.blit(wins_text, (20, 70))
 
         enemy_level_text = font.render(f"Уровень врага: {self.enemy_morty.level}", True, RED)
@@ -505,29 +421,11 @@ class MortyBattle:
 
     def determine_winner(self, player_attack, enemy_attack):
         """Определяет победителя в раунде РПС"""
-        if player_attack == enemy_attack:
-            return "draw"
-
-        if player_attack in ["heal", "defense", "strong_attack"] or enemy_attack in ["heal", "defense",
-                                                                                     "strong_attack"]:
-            return "special"
-
-        if self.attacks[player_attack]["beats"] == enemy_attack:
-            return "player"  # Игрок выиграл
-        else:
-            return "enemy"  # Враг выиграл
+        return self.engine.determine_winner(player_attack, enemy_attack)
 
     def calculate_type_bonus(self, attacker, attack_type, defender):
         """Рассчитывает бонус урона за тип"""
-        bonus = 0
-
-        if attack_type == defender.weakness:
-            bonus = 50  # +50% урона
-
-        if attacker.strength == attack_type:
-            bonus += 25  # дополнительные +25% урона
-
-        return bonus
+        return self.engine.calculate_type_bonus(attacker, attack_type, defender)
 
     def player_action(self, action_type):
         """Действие игрока"""
@@ -535,231 +433,47 @@ class MortyBattle:
             return
 
         # Проверяем кулдаун
-        if action_type in self.player_cooldowns and self.player_cooldowns[action_type] > 0:
+        if not self.engine.player_action(action_type):
             self.show_message(f"Действие {self.attacks[action_type]['name']} на кулдауне!", 1000)
             return
 
-        # Игрок делает выбор
-        self.player_choice = action_type
-        self.game_state = "enemy_turn"
         self.enemy_choice_timer = self.enemy_choice_delay
-
-        # Устанавливаем кулдаун для специальных атак
-        if action_type in ["strong_attack", "heal", "defense"]:
-            cooldown = self.attacks[action_type].get("cooldown", 2)
-            self.player_cooldowns[action_type] = cooldown
-
         self.show_message(f"Вы выбрали: {self.attacks[action_type]['name']}...", 1000)
 
     def enemy_choose(self):
         """Враг делает выбор"""
-        choices = ["rock", "scissors", "paper", "heal", "defense", "strong_attack"]
-        weights = [0.25, 0.25, 0.25, 0.1, 0.1, 0.05]  # Вероятности выбора
-
-        available_choices = []
-        available_weights = []
+        self.engine.enemy_choose()
 
-        for i, choice in enumerate(choices):
-            if choice not in self.enemy_cooldowns or self.enemy_cooldowns[choice] <= 0:
-                available_choices.append(choice)
-                available_weights.append(weights[i])
-
-        # Если все на кулдауне, выбираем из основных атак
-        if not available_choices:
-            available_choices = ["rock", "scissors", "paper"]
-            available_weights = [0.33, 0.33, 0.34]
-
-        self.enemy_choice = random.choices(available_choices, weights=available_weights, k=1)[0]
-
-        if self.enemy_choice in ["strong_attack", "heal", "defense"]:
-            cooldown = self.attacks[self.enemy_choice].get("cooldown", 2)
-            self.enemy_cooldowns[self.enemy_choice] = cooldown
-
-        self.game_state = "round_result"
         self.round_result_timer = self.round_result_delay
 
         self.combat_animation = True
         self.combat_timer = 0
 
-        self.calculate_round_results()
-
     def calculate_round_results(self):
         """Рассчитывает результаты раунда"""
-        self.round_damage_player = 0
-        self.round_damage_enemy = 0
-        self.player_heal = 0
-        self.enemy_heal = 0
-        self.type_bonus = 0
-
-        player_action = self.attacks[self.player_choice]
-
-        if player_action["type"] == "attack":
-            base_damage = random.randint(*player_action["damage"])
-
-            self.type_bonus = self.calculate_type_bonus(
-                self.player_morty, self.player_choice, self.enemy_morty
-            )
-
-            damage_multiplier = 1 + self.type_bonus / 100
-            self.round_damage_player = int(base_damage * damage_multiplier)
-
-            if self.enemy_defending:
-                self.round_damage_player = int(self.round_damage_player * 0.5)
-
-        elif player_action["type"] == "heal":
-            heal_amount = random.randint(*player_action["heal_amount"])
-            self.player_heal = heal_amount
-            self.player_morty.heal(heal_amount)
-
-        elif player_action["type"] == "special_attack":
-            base_damage = random.randint(*player_action["damage"])
-            self.round_damage_player = base_damage
-
-            # бонус за тип
-            type_bonus = self.calculate_type_bonus(
-                self.player_morty, "rock", self.enemy_morty  # Сильная атака считается как камень
-            )
-            damage_multiplier = 1 + type_bonus / 100
-            self.round_damage_player = int(self.round_damage_player * damage_multiplier)
-
-        elif player_action["type"] == "defense":
-            #  игрок защищается
-            self.player_defending = True
-            self.round_result = "Вы защищаетесь! Урон снижен на 50%"
-            return
-
-        enemy_action = self.attacks[self.enemy_choice]
-
-        if enemy_action["type"] == "attack":
-            base_damage = random.randint(*enemy_action["damage"])
-
-            enemy_type_bonus = self.calculate_type_bonus(
-                self.enemy_morty, self.enemy_choice, self.player_morty
-            )
-
-            damage_multiplier = 1 + enemy_type_bonus / 100
-            self.round_damage_enemy = int(base_damage * damage_multiplier)
-
-            if self.player_defending:
-                self.round_damage_enemy = int(self.round_damage_enemy * 0.5)
-
-        elif enemy_action["type"] == "heal":
-            heal_amount = random.randint(*enemy_action["heal_amount"])
-            self.enemy_heal = heal_amount
-            self.enemy_morty.heal(heal_amount)
-
-        elif enemy_action["type"] == "special_attack":
-            base_damage = random.randint(*enemy_action["damage"])
-            self.round_damage_enemy = base_damage
-
-        elif enemy_action["type"] == "defense":
-            self.enemy_defending = True
-            self.round_result = "Враг защищается! Урон снижен на 50%"
-            return
-
-        if player_action["type"] == "attack" and enemy_action["type"] == "attack":
-            result = self.determine_winner(self.player_choice, self.enemy_choice)
-
-            if result == "player":
-                self.round_damage_player = int(self.round_damage_player * 1.5)
-                self.round_damage_enemy = int(self.round_damage_enemy * 0.5)
-                self.round_result = f"{player_action['name']} выигрывает у {enemy_action['name']}!"
-            elif result == "enemy":
-                self.round_damage_player = int(self.round_damage_player * 0.5)
-                self.round_damage_enemy = int(self.round_damage_enemy * 1.5)
-                self.round_result = f"{enemy_action['name']} выигрывает у {player_action['name']}!"
-            else:
-                self.round_result = "Ничья! Оба получают урон!"
-        else:
-            if self.player_heal > 0:
-                self.round_result = f"Вы восстановили {self.player_heal} HP!"
-            elif self.enemy_heal > 0:
-                self.round_result = f"Враг восстановил {self.enemy_heal} HP!"
-            else:
-                self.round_result = "Специальные действия!"
+        self.engine.calculate_round_results()
 
     def apply_damage(self):
         """Применяет урон от раунда"""
-        enemy_defeated = False
-        player_defeated = False
-
-        if self.round_damage_player > 0:
-            enemy_defeated = self.enemy_morty.take_damage(self.round_damage_player)
-
-        if self.round_damage_enemy > 0:
-            player_defeated = self.player_morty.take_damage(self.round_damage_enemy)
-
-        self.player_defending = False
-        self.enemy_defending = False
-
-        for action in list(self.player_cooldowns.keys()):
-            if self.player_cooldowns[action] > 0:
-                self.player_cooldowns[action] -= 1
-
-        for action in list(self.enemy_cooldowns.keys()):
-            if self.enemy_cooldowns[action] > 0:
-                self.enemy_cooldowns[action] -= 1
+        winner = self.engine.apply_damage()
 
         # Проверяем окончание боя
-        if enemy_defeated:
-            self.game_state = "game_over"
-            self.wins_count += 1
-            self.enemy_level += 1
+        if winner == "player":
             self.message = f"Победа! Злой Морти побежден! Побед подряд: {self.wins_count}"
             self.message_timer = 3000
-        elif player_defeated:
-            self.game_state = "game_over"
-            self.wins_count = 0
-            self.enemy_level = max(1, self.enemy_level - 1)
+        elif winner == "enemy":
             self.message = f"Поражение! Морти проиграл! Счетчик побед сброшен."
             self.message_timer = 3000
-        else:
-            pass
 
     def reset_round(self):
         """Сброс раунда для следующего хода"""
-        self.player_choice = None
-        self.enemy_choice = None
-        self.round_result = ""
-        self.round_damage_player = 0
-        self.round_damage_enemy = 0
-        self.player_heal = 0
-        self.enemy_heal = 0
-        self.type_bonus = 0
-        self.game_state = "player_turn"
+        self.engine.reset_round()
         self.combat_animation = False
         self.combat_timer = 0
-        self.player_defending = False
-        self.enemy_defending = False
 
     def start_new_battle(self):
         """Начинает новый бой после победы"""
-        player_x = self.screen_width * 0.2
-        player_y = self.screen_height * 0.7
-        enemy_x = self.screen_width * 0.8
-        enemy_y = self.screen_height * 0.3
-
-        if self.player_morty.hp <= 0:
-            player_type = random.choice(list(MORTY_TYPES.keys()))
-            enemy_type = random.choice(list(MORTY_TYPES.keys()))
-
-            self.player_morty = Morty("Morty", 1, 100, player_type, (player_x, player_y), True)
-            self.enemy_morty = Morty("Evil Morty", 1, 80, enemy_type, (enemy_x, enemy_y), False)
-            self.enemy_level = 1
-            self.wins_count = 0
-        else:
-            # если игрок выиграл, усиливаем врага
-            enemy_type = random.choice(list(MORTY_TYPES.keys()))
-            self.enemy_morty = Morty("Evil Morty", self.enemy_level,
-                                     int(80 * (1 + (self.enemy_level - 1) * 0.3)),
-                                     enemy_type, (enemy_x, enemy_y), False)
-            heal_amount = int(self.player_morty.max_hp * 0.3)
-            self.player_morty.heal(heal_amount)
-
-        self.player_cooldowns = {}
-        self.enemy_cooldowns = {}
-
-        self.game_state = "player_turn"
+        self.engine.start_new_battle()
         self.reset_round()
 
         player_type_name = MORTY_TYPES[self.player_morty.morty_type]["name"]
@@ -818,13 +532,17 @@ class MortyBattle:
             self.message_timer -= dt
 
         if self.game_state == "enemy_turn":
+            think = getattr(self.engine.enemy_policy, "think", None)
+            if think is not None:
+                think(self.engine, False, self.enemy_think_ms)
             self.enemy_choice_timer -= dt
             if self.enemy_choice_timer <= 0:
                 self.enemy_choose()
 
-        # Анимация плавающего движения Морти
-        self.player_morty.animation_offset += 0.1 * self.animation_direction
-        self.enemy_morty.animation_offset += 0.1 * self.animation_direction
+        # Анимация плавающего движения Морти (зависит от dt, а не от числа кадров)
+        offset = self.FLOAT_SPEED * dt * self.animation_direction
+        self.player_morty.animation_offset += offset
+        self.enemy_morty.animation_offset += offset
         if abs(self.player_morty.animation_offset) > 3:
             self.animation_direction *= -1
 
@@ -834,106 +552,184 @@ class MortyBattle:
                 self.combat_animation = False
                 self.combat_timer = 0
 
-    def draw(self):
-        """Отрисовка всей сцены"""
-        self.screen.blit(self.background, (0, 0))
-
-        platform_width = self.screen_width * 0.15
-        platform_height = self.screen_height * 0.08
-        self.draw_platform(self.player_morty.position, (platform_width, platform_height))
-        self.draw_platform(self.enemy_morty.position, (platform_width, platform_height))
-
-        # морти с анимацией
-        player_is_attacking = False
-        enemy_is_attacking = False
-        player_taking_damage = False
-        enemy_taking_damage = False
-        player_healing = False
-        enemy_healing = False
-
-        if self.game_state == "round_result" and self.player_choice and self.enemy_choice:
-            player_action = self.attacks[self.player_choice]
-            enemy_action = self.attacks[self.enemy_choice]
-
-            if player_action["type"] in ["attack", "special_attack"] and self.round_damage_player > 0:
-                player_is_attacking = True
-                enemy_taking_damage = True
-            elif player_action["type"] == "heal" and self.player_heal > 0:
-                player_healing = True
-
-            if enemy_action["type"] in ["attack", "special_attack"] and self.round_damage_enemy > 0:
-                enemy_is_attacking = True
-                player_taking_damage = True
-            elif enemy_action["type"] == "heal" and self.enemy_heal > 0:
-                enemy_healing = True
-
-        self.draw_morty(self.player_morty,
-                        is_attacking=player_is_attacking and self.combat_animation,
-                        damage_effect=player_taking_damage and self.combat_animation,
-                        heal_effect=player_healing and self.combat_animation)
-        self.draw_morty(self.enemy_morty,
-                        is_attacking=enemy_is_attacking and self.combat_animation,
-                        damage_effect=enemy_taking_damage and self.combat_animation,
-                        heal_effect=enemy_healing and self.combat_animation)
-
-        self.draw_hp_bar(self.player_morty, (self.screen_width * 0.05, self.screen_height * 0.62))
-        self.draw_hp_bar(self.enemy_morty, (self.screen_width * 0.8, self.screen_height * 0.13))
-
-        self.draw_info_panel(self.player_morty, (self.screen_width * 0.05, self.screen_height * 0.65))
-        self.draw_info_panel(self.enemy_morty, (self.screen_width * 0.8, self.screen_height * 0.16))
-
-        self.draw_attack_choice()
-        self.draw_wins_counter()
-
-        self.draw_battle_menu()
-
-        self.draw_message()
-
-        pygame.draw.rect(self.screen, DARK_GRAY, self.back_button, border_radius=3)
-        pygame.draw.rect(self.screen, LIGHT_GRAY, self.back_button, 1, border_radius=3)
+    def create_widgets(self):
+        """Создает виджеты сцены в порядке отрисовки"""
+        w, h = self.screen_width, self.screen_height
+        self.platform_size = (w * 0.15, h * 0.08)
+        player_hp_pos = (w * 0.05, h * 0.62)
+        enemy_hp_pos = (w * 0.8, h * 0.13)
+        player_info_pos = (w * 0.05, h * 0.65)
+        enemy_info_pos = (w * 0.8, h * 0.16)
+        self.hp_positions = (player_hp_pos, enemy_hp_pos)
+        self.info_positions = (player_info_pos, enemy_info_pos)
+
+        # платформы, все рамки, подсказка управления и кнопка назад - в слое self.chrome;
+        # здесь только то, что меняется: Морти, заполнение HP, тексты, меню
+        add = self.renderer.add
+        add("player_morty", lambda: self.draw_morty_with_effects(self.player_morty),
+            lambda: self.morty_rect(self.player_morty), lambda: self.morty_state(self.player_morty))
+        add("enemy_morty", lambda: self.draw_morty_with_effects(self.enemy_morty),
+            lambda: self.morty_rect(self.enemy_morty), lambda: self.morty_state(self.enemy_morty))
+
+        add("player_hp", lambda: self.draw_hp_bar(self.player_morty, player_hp_pos),
+            lambda: self.hp_bar_rect(player_hp_pos), lambda: (self.player_morty.hp, self.player_morty.max_hp))
+        add("enemy_hp", lambda: self.draw_hp_bar(self.enemy_morty, enemy_hp_pos),
+            lambda: self.hp_bar_rect(enemy_hp_pos), lambda: (self.enemy_morty.hp, self.enemy_morty.max_hp))
+
+        add("player_info", lambda: self.draw_info_panel(self.player_morty, player_info_pos),
+            lambda: self.info_panel_rect(self.player_morty, player_info_pos),
+            lambda: (self.player_morty.morty_type, self.player_morty.level))
+        add("enemy_info", lambda: self.draw_info_panel(self.enemy_morty, enemy_info_pos),
+            lambda: self.info_panel_rect(self.enemy_morty, enemy_info_pos),
+            lambda: (self.enemy_morty.morty_type, self.enemy_morty.level))
+
+        add("attack_choice", lambda: self.draw_attack_choice(), self.attack_choice_rect,
+            lambda: (self.player_choice, self.enemy_choice))
+        add("wins_counter", lambda: self.draw_wins_counter(), self.wins_counter_rect,
+            lambda: (self.wins_count, self.enemy_morty.level))
+        add("battle_menu", lambda: self.draw_battle_menu(), self.battle_menu_rect, self.battle_menu_state)
+        add("message", lambda: self.draw_message(), self.message_rect, lambda: self.message)
+        add("hint", lambda: self.draw_hint(), self.hint_rect, self.hint_text)
+
+    def morty_rect(self, morty):
+        """Область Морти с запасом на покачивание и анимацию атаки"""
+        x, y = morty.position
+        margin = min(40, self.screen_width * 0.05) + 8
+        return pygame.Rect(x - margin, y - margin - 4, margin * 2, margin * 2 + 8)
+
+    def morty_effects(self, morty):
+        """Эффекты Морти в текущем кадре: (атакует, получает урон, лечится)"""
+        if not (self.combat_animation and self.game_state == "round_result"
+                and self.player_choice and self.enemy_choice):
+            return False, False, False
+
+        player_action = self.attacks[self.player_choice]
+        enemy_action = self.attacks[self.enemy_choice]
+        player_attacking = player_action["type"] in ["attack", "special_attack"] and self.round_damage_player > 0
+        enemy_attacking = enemy_action["type"] in ["attack", "special_attack"] and self.round_damage_enemy > 0
+
+        if morty is self.player_morty:
+            return player_attacking, enemy_attacking, player_action["type"] == "heal" and self.player_heal > 0
+        return enemy_attacking, player_attacking, enemy_action["type"] == "heal" and self.enemy_heal > 0
+
+    def morty_state(self, morty):
+        # кадр выводится по целой координате, так что перерисовка нужна только при смене пикселя или кадра
+        y = int(morty.position[1] + morty.animation_offset)
+        return y, self.sprite_key(morty, *self.morty_effects(morty))
+
+    def draw_morty_with_effects(self, morty):
+        is_attacking, damage_effect, heal_effect = self.morty_effects(morty)
+        self.draw_morty(morty, is_attacking=is_attacking, damage_effect=damage_effect, heal_effect=heal_effect)
+
+    def hp_bar_rect(self, position):
+        # текст HP чуть выше самой полоски
+        return self.hp_bar_frame(position).inflate(0, 10)
+
+    def info_panel_rect(self, morty, position):
+        x, y = position
+        font = get_font('Arial', max(12, int(self.screen_height * 0.02)))
+        lines = [MORTY_TYPES[morty.morty_type]["name"], f"Уровень: {morty.level}",
+                 f"Слабость: {self.get_attack_name(morty.weakness)}",
+                 f"Сила: {self.get_attack_name(morty.strength)}"]
+        text_width = max(font.text_size(line)[0] for line in lines)
+        text_rect = pygame.Rect(x + 10, y + 5, text_width, 60 + font.text_size(lines[0])[1])
+        return self.info_panel_frame(position).union(text_rect)
+
+    def attack_choice_rect(self):
+        if self.game_state not in ["enemy_turn", "round_result", "game_over"]:
+            return None
+        if not (self.enemy_choice and self.player_choice):
+            return None
+        return pygame.Rect(self.screen_width * 0.3, self.screen_height * 0.4,
+                           self.screen_width * 0.4, self.screen_height * 0.05).inflate(4, 4)
+
+    def wins_counter_rect(self):
+        font = get_font('Arial', max(18, int(self.screen_height * 0.022)), bold=True)
+        level_size = font.text_size(f"Уровень врага: {self.enemy_morty.level}")
+        return pygame.Rect(10, 60, 200, 40).union(pygame.Rect((20, 100), level_size))
+
+    def battle_menu_rect(self):
+        """Вся нижняя полоса: кнопки выступают за рамку меню"""
+        menu_top = int(self.screen_height - self.screen_height * 0.25 - 20)
+        return pygame.Rect(0, menu_top, self.screen_width, self.screen_height - menu_top)
+
+    def battle_menu_state(self):
+        cooldowns = tuple(self.player_cooldowns.get(action["action"], 0) for action in self.player_actions)
+        return (self.game_state, self.player_morty.hp <= 0, cooldowns, self.round_result,
+                self.round_damage_player, self.player_heal, self.round_damage_enemy, self.enemy_heal,
+                self.type_bonus)
+
+    def message_rect(self):
+        if not (self.message and self.message_timer > 0):
+            return None
+        font = get_font('Arial', max(16, int(self.screen_height * 0.02)))
+        text_width, text_height = font.text_size(self.message)
+        return pygame.Rect(
+            self.screen_width // 2 - text_width // 2 - 20,
+            self.screen_height // 2 - text_height // 2 - 15,
+            text_width + 40,
+            text_height + 30
+        )
+
+    def draw_back_button(self, surface=None):
+        surface = surface or self.screen
+        self.draw_frame(surface, self.back_button, LIGHT_GRAY, 1, 3)
         font_size = max(12, int(self.screen_height * 0.018))
-        font = pygame.font.SysFont('Arial', font_size)
+        font = get_font('Arial', font_size)
         back_text = font.render("← Назад", True, WHITE)
-        self.screen.blit(back_text, (
+        surface.blit(back_text, (
             self.back_button.centerx - back_text.get_width() // 2,
             self.back_button.centery - back_text.get_height() // 2
         ))
 
+    def hint_text(self):
+        """Подсказка внизу экрана для текущего состояния"""
         if self.game_state == "game_over":
-            font_size = max(14, int(self.screen_height * 0.02))
-            font = pygame.font.SysFont('Arial', font_size)
-            hint_text = font.render("Нажмите R для нового боя", True, LIGHT_GRAY)
-            self.screen.blit(hint_text, (
-                self.screen_width // 2 - hint_text.get_width() // 2,
-                self.screen_height * 0.9
-            ))
+            return "Нажмите R для нового боя"
         elif self.game_state == "round_result":
-            font_size = max(14, int(self.screen_height * 0.02))
-            font = pygame.font.SysFont('Arial', font_size)
-            hint_text = font.render("Нажмите SPACE чтобы продолжить", True, LIGHT_GRAY)
-            self.screen.blit(hint_text, (
-                self.screen_width // 2 - hint_text.get_width() // 2,
-                self.screen_height * 0.9
-            ))
+            return "Нажмите SPACE чтобы продолжить"
         elif self.game_state == "enemy_turn":
-            font_size = max(14, int(self.screen_height * 0.02))
-            font = pygame.font.SysFont('Arial', font_size)
-            hint_text = font.render("Нажмите SPACE чтобы пропустить ожидание", True, LIGHT_GRAY)
-            self.screen.blit(hint_text, (
-                self.screen_width // 2 - hint_text.get_width() // 2,
-                self.screen_height * 0.9
-            ))
+            return "Нажмите SPACE чтобы пропустить ожидание"
+        return None
+
+    def hint_rect(self):
+        text = self.hint_text()
+        if text is None:
+            return None
+        font = get_font('Arial', max(14, int(self.screen_height * 0.02)))
+        text_width, text_height = font.text_size(text)
+        return pygame.Rect(self.screen_width // 2 - text_width // 2, int(self.screen_height * 0.9),
+                           text_width, text_height + 1)
+
+    def draw_hint(self):
+        font_size = max(14, int(self.screen_height * 0.02))
+        font = get_font('Arial', font_size)
+        hint_text = font.render(self.hint_text(), True, LIGHT_GRAY)
+        self.screen.blit(hint_text, (
+            self.screen_width // 2 - hint_text.get_width() // 2,
+            self.screen_height * 0.9
+        ))
 
+    CONTROLS = [
+        "Управление: 1-Камень(20-30) 2-Ножницы(15-25) 3-Бумага(18-28) 4-Лечение 5-Сильная атака(30-40) 6-Защита",
+        "SPACE-пропуск ожидания, R-новый бой. Каждый тип имеет слабости и силы!"
+    ]
+
+    def draw_controls(self, surface):
         font_size = max(12, int(self.screen_height * 0.016))
-        font = pygame.font.SysFont('Arial', font_size)
-        controls = [
-            "Управление: 1-Камень(20-30) 2-Ножницы(15-25) 3-Бумага(18-28) 4-Лечение 5-Сильная атака(30-40) 6-Защита",
-            "SPACE-пропуск ожидания, R-новый бой. Каждый тип имеет слабости и силы!"
-        ]
+        font = get_font('Arial', font_size)
 
-        for i, text in enumerate(controls):
+        for i, text in enumerate(self.CONTROLS):
             control_text = font.render(text, True, LIGHT_GRAY)
-            self.screen.blit(control_text, (
+            surface.blit(control_text, (
                 self.screen_width // 2 - control_text.get_width() // 2,
                 self.screen_height * 0.95 + i * 20
-            ))
\ No newline at end of file
+            ))
+
+    def invalidate(self):
+        """Следующий кадр будет перерисован целиком"""
+        self.renderer.invalidate()
+
+    def draw(self):
+        """Отрисовка сцены: рисуются только изменившиеся виджеты, возвращает измененные области"""
+        return self.renderer.render()
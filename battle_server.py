@@ -0,0 +1,406 @@
+import argparse
+import asyncio
+import random
+import sys
+import time
+from collections import deque
+
+from battle_engine import ATTACKS, MORTY_TYPES, SPECIAL_ACTIONS, TYPE_CODES, BattleEngine
+from battle_protocol import (ACTION, ACTIONS, ALREADY_CHOSE, BAD_MESSAGE, BAD_VERSION, COOLDOWN, DRAW, FIND, HELLO,
+                             LEAVE, MATCH, NO_MATCH, NO_WINNER, OPPONENT_LEFT, QUEUED, REJECT, REMATCH, ROUND,
+                             VERSION, WAIT, WINNER_ME, WINNER_OPPONENT, BattleClient, MatchInfo, RoundInfo,
+                             frame, read_frame)
+
+
+PORT = 8765
+
+
+class Connection:
+    __slots__ = ("writer", "name", "match", "seat")
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.name = ""
+        self.match = None
+        self.seat = 0
+
+    def send(self, message_type, payload=b""):
+        if not self.writer.is_closing():
+            self.writer.write(frame(message_type, payload))
+
+    def reject(self, reason):
+        self.send(REJECT, bytes([reason]))
+
+
+class Match:
+    """Бой двух людей на одном BattleEngine
+
+    Место 0 - player_morty движка, место 1 - enemy_morty. Правила одиночной
+    игры несимметричны (у врага меньше HP, защита игрока обрывает раунд, бонус
+    типа только у игрока), поэтому раунд считается своим симметричным resolve
+    по тем же таблицам battle_tables: каждое место бьет как игрок.
+    Раунд рассчитывается, когда выбрали оба.
+    """
+
+    def __init__(self, players, seed):
+        self.players = players
+        self.engine = BattleEngine(seed)
+        self.choices = [None, None]
+        self.rematch = [False, False]
+        self.rounds = 0
+        for seat, player in enumerate(players):
+            player.match = self
+            player.seat = seat
+
+    def new_battle(self):
+        engine = self.engine
+        types = list(MORTY_TYPES)
+        engine.set_matchup(engine.rng.choice(types), engine.rng.choice(types))
+        # HP поровну: оба Морти первого уровня со здоровьем игрока
+        player, enemy = engine.player_morty, engine.enemy_morty
+        enemy.hp = enemy.max_hp = enemy.base_max_hp = player.max_hp
+        self.choices = [None, None]
+        self.rematch = [False, False]
+        for seat, player in enumerate(self.players):
+            player.send(MATCH, self.match_info(seat).pack())
+
+    def morties(self, seat):
+        """(свой Морти, Морти соперника) для места"""
+        engine = self.engine
+        if seat == 0:
+            return engine.player_morty, engine.enemy_morty
+        return engine.enemy_morty, engine.player_morty
+
+    def match_info(self, seat):
+        mine, theirs = self.morties(seat)
+        return MatchInfo(seat, TYPE_CODES[mine.morty_type], TYPE_CODES[theirs.morty_type], mine.level, theirs.level,
+                         mine.hp, mine.max_hp, theirs.hp, theirs.max_hp)
+
+    def cooldowns(self, seat):
+        return self.engine.player_cooldowns if seat == 0 else self.engine.enemy_cooldowns
+
+    def choose(self, seat, action_type):
+        """Выбор игрока; возвращает причину отказа или None"""
+        if self.engine.game_state != "player_turn":
+            return NO_MATCH
+        if self.choices[seat] is not None:
+            return ALREADY_CHOSE
+        if self.engine.is_on_cooldown(action_type, self.cooldowns(seat)):
+            return COOLDOWN
+        self.choices[seat] = action_type
+        if None in self.choices:
+            self.players[seat].send(WAIT)
+        else:
+            self.resolve()
+        return None
+
+    def resolve(self):
+        """Симметричный раунд: урон каждого места - по таблице урона игрока"""
+        engine = self.engine
+        tables = engine.tables
+        choices = self.choices
+        morties = (engine.player_morty, engine.enemy_morty)
+        types = [morty.type_code for morty in morties]
+        actions = [tables.action_index[choice] for choice in choices]
+        defending = [tables.kind[action] == "defense" for action in actions]
+        for seat, choice in enumerate(choices):
+            if choice in SPECIAL_ACTIONS:
+                self.cooldowns(seat)[choice] = engine.attacks[choice].get("cooldown", 2)
+
+        damage = [0, 0]
+        heal = [0, 0]
+        bonus = [0, 0]
+        for seat in (0, 1):
+            other = 1 - seat
+            kind = tables.kind[actions[seat]]
+            if kind == "defense":
+                continue
+            roll = engine.rng.randint(*tables.rolls[actions[seat]])
+            if kind == "heal":
+                heal[seat] = roll
+                morties[seat].heal(roll)
+                continue
+            if kind == "attack":
+                bonus[seat] = tables.type_bonus[types[seat]][actions[seat]][types[other]]
+            row = tables.index(types[seat], types[other], actions[seat], actions[other], defending[other])
+            damage[seat] = tables.player_damage[row][roll]
+
+        # HP после лечения, но до урона: урон клиенты применяют у себя
+        hp = [morty.hp for morty in morties]
+        defeated = [morties[seat].take_damage(damage[1 - seat]) for seat in (0, 1)]
+        for seat in (0, 1):
+            cooldowns = self.cooldowns(seat)
+            for action in cooldowns:
+                if cooldowns[action] > 0:
+                    cooldowns[action] -= 1
+        if any(defeated):
+            engine.game_state = "game_over"
+        else:
+            engine.reset_round()
+        self.rounds += 1
+        self.choices = [None, None]
+
+        for seat, player in enumerate(self.players):
+            other = 1 - seat
+            if all(defeated):
+                result = DRAW
+            elif defeated[other]:
+                result = WINNER_ME
+            elif defeated[seat]:
+                result = WINNER_OPPONENT
+            else:
+                result = NO_WINNER
+            player.send(ROUND, RoundInfo(choices[seat], choices[other], damage[seat], damage[other],
+                                         heal[seat], heal[other], defending[seat], defending[other],
+                                         bonus[seat], hp[seat], hp[other], result).pack())
+
+    def opponent(self, seat):
+        return self.players[1 - seat]
+
+
+class BattleServer:
+    """Авторитетный сервер боев: много боев в одном процессе на asyncio
+
+    Соединение - одна корутина, бой - объект Match без своих задач: раунд
+    считается прямо при получении второго выбора. Сообщения - кадры
+    battle_protocol.
+    """
+
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+        self.waiting = deque()
+        self.matches = set()
+        self.peak_matches = 0
+        self.connections = 0
+        self.battles = 0
+        self.rounds = 0
+        self.server = None
+        self.handlers = {
+            HELLO: self.on_hello,
+            FIND: self.on_find,
+            ACTION: self.on_action,
+            REMATCH: self.on_rematch,
+            LEAVE: self.on_leave,
+        }
+
+    async def start(self, host="127.0.0.1", port=PORT):
+        self.server = await asyncio.start_server(self.handle, host, port, backlog=4096)
+        return self.server
+
+    @property
+    def port(self):
+        return self.server.sockets[0].getsockname()[1]
+
+    async def handle(self, reader, writer):
+        conn = Connection(writer)
+        self.connections += 1
+        try:
+            while True:
+                message_type, payload = await read_frame(reader)
+                handler = self.handlers.get(message_type)
+                if handler is None:
+                    conn.reject(BAD_MESSAGE)
+                else:
+                    handler(conn, payload)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            self.connections -= 1
+            self.drop(conn)
+            writer.close()
+
+    def on_hello(self, conn, payload):
+        if not payload or payload[0] != VERSION:
+            conn.reject(BAD_VERSION)
+            return
+        conn.name = payload[1:].decode("utf-8", "replace")
+
+    def on_find(self, conn, payload):
+        if conn.match is not None or conn in self.waiting:
+            return
+        if not self.waiting:
+            self.waiting.append(conn)
+            conn.send(QUEUED)
+            return
+        players = [self.waiting.popleft(), conn]
+        # места случайные: правила движка для игрока и врага не совсем одинаковые
+        self.rng.shuffle(players)
+        match = Match(players, self.rng.randrange(2 ** 32))
+        self.matches.add(match)
+        self.peak_matches = max(self.peak_matches, len(self.matches))
+        self.start_battle(match)
+
+    def start_battle(self, match):
+        match.new_battle()
+        self.battles += 1
+
+    def on_action(self, conn, payload):
+        if conn.match is None:
+            conn.reject(NO_MATCH)
+            return
+        if len(payload) != 1 or payload[0] >= len(ACTIONS):
+            conn.reject(BAD_MESSAGE)
+            return
+        match = conn.match
+        rounds = match.rounds
+        reason = match.choose(conn.seat, ACTIONS[payload[0]])
+        if reason is not None:
+            conn.reject(reason)
+        self.rounds += match.rounds - rounds
+
+    def on_rematch(self, conn, payload):
+        match = conn.match
+        if match is None or match.engine.game_state != "game_over":
+            conn.reject(NO_MATCH)
+            return
+        match.rematch[conn.seat] = True
+        if all(match.rematch):
+            self.start_battle(match)
+        else:
+            conn.send(WAIT)
+
+    def on_leave(self, conn, payload):
+        self.drop(conn)
+
+    def drop(self, conn):
+        """Убирает игрока из очереди или боя; сопернику сообщается, бой закрывается"""
+        if conn in self.waiting:
+            self.waiting.remove(conn)
+        match = conn.match
+        if match is None:
+            return
+        self.matches.discard(match)
+        for player in match.players:
+            player.match = None
+        match.opponent(conn.seat).send(OPPONENT_LEFT)
+
+    def stats(self):
+        return {"connections": self.connections, "matches": len(self.matches), "peak_matches": self.peak_matches,
+                "waiting": len(self.waiting), "battles": self.battles, "rounds": self.rounds}
+
+
+def bot_choice(rng, cooldowns):
+    """Случайное действие не на кулдауне (кулдауны бот считает сам, как движок)"""
+    return rng.choice([action for action in ACTIONS if cooldowns.get(action, 0) <= 0])
+
+
+async def bot(host, port, battles, seed=None, name="bot", latencies=None):
+    """Бот по сети: ищет соперника, играет случайно battles боев подряд и выходит
+
+    В latencies (если передан список) добавляется время от отправки выбора до
+    итога раунда, в секундах.
+    """
+    rng = random.Random(seed)
+    client = await BattleClient.connect(host, port, name)
+    client.find()
+    cooldowns = {}
+    finished = rounds = 0
+    sent = 0.0
+    try:
+        while finished < battles:
+            message_type, payload = await client.receive()
+            if message_type == MATCH:
+                cooldowns = {}
+                client.action(bot_choice(rng, cooldowns))
+                sent = time.perf_counter()
+            elif message_type == ROUND:
+                if latencies is not None:
+                    latencies.append(time.perf_counter() - sent)
+                info = RoundInfo.unpack(payload)
+                rounds += 1
+                # как apply_damage: кулдаун ставится при выборе и уменьшается в конце раунда
+                if info.my_action in SPECIAL_ACTIONS:
+                    cooldowns[info.my_action] = ATTACKS[info.my_action].get("cooldown", 2)
+                for action in cooldowns:
+                    cooldowns[action] -= 1
+                if info.winner == NO_WINNER:
+                    client.action(bot_choice(rng, cooldowns))
+                    sent = time.perf_counter()
+                else:
+                    finished += 1
+                    if finished < battles:
+                        client.rematch()
+            elif message_type == OPPONENT_LEFT:
+                client.find()
+            elif message_type == REJECT:
+                raise ValueError(f"{name}: сервер отклонил сообщение, причина {payload[0]}")
+        client.leave()
+    finally:
+        await client.close()
+    return rounds
+
+
+async def run_bots(pairs, battles, host="127.0.0.1", port=None, seed=0):
+    """pairs пар ботов против сервера; без port поднимает сервер в этом же процессе на loopback"""
+    server = None
+    if port is None:
+        server = BattleServer(seed)
+        await server.start(host, 0)
+        port = server.port
+    start = time.perf_counter()
+    tasks = [bot(host, port, battles, seed=seed * 100003 + i, name=f"bot{i}") for i in range(pairs * 2)]
+    rounds = await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+    stats = server.stats() if server else None
+    if server is not None:
+        server.server.close()
+        await server.server.wait_closed()
+    return sum(rounds) // 2, elapsed, stats
+
+
+def raise_file_limit():
+    """Тысячи соединений на loopback - вдвое больше дескрипторов: поднимаем мягкий лимит до жесткого"""
+    try:
+        import resource
+    except ImportError:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+async def serve(host, port, seed):
+    server = BattleServer(seed)
+    await server.start(host, port)
+    print(f"сервер боев на {host}:{server.port}")
+    while True:
+        await asyncio.sleep(10)
+        print(server.stats())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сервер боев на asyncio и проверочные боты")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = sub.add_parser("serve", help="запустить сервер")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=PORT)
+    serve_parser.add_argument("--seed", type=int, default=None)
+
+    bots_parser = sub.add_parser("bots", help="сыграть ботами (без --port - со своим сервером на loopback)")
+    bots_parser.add_argument("--pairs", type=int, default=1000)
+    bots_parser.add_argument("--battles", type=int, default=3, help="боев на пару")
+    bots_parser.add_argument("--host", default="127.0.0.1")
+    bots_parser.add_argument("--port", type=int, default=None)
+    bots_parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    raise_file_limit()
+    if args.command == "serve":
+        try:
+            asyncio.run(serve(args.host, args.port, args.seed))
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    rounds, elapsed, stats = asyncio.run(run_bots(args.pairs, args.battles, args.host, args.port, args.seed))
+    print(f"{args.pairs} боев одновременно, {args.pairs * args.battles} боев всего, {rounds} раундов "
+          f"за {elapsed:.2f} с ({rounds / elapsed:.0f} раундов/с)")
+    if stats:
+        print(stats)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+class BattleTables:
+    """Заранее посчитанные таблицы урона и исходов раунда
+
+    Урон зависит только от (тип игрока, тип врага, действие игрока, действие врага,
+    флаг защиты, выпавшее значение), поэтому весь расчет раунда сводится к индексам.
+    """
+
+    def __init__(self, attacks, morty_types, win_multiplier, lose_multiplier, defense_multiplier):
+        self.actions = list(attacks.keys())
+        self.types = list(morty_types.keys())
+        self.action_index = {action: i for i, action in enumerate(self.actions)}
+        self.type_index = {morty_type: i for i, morty_type in enumerate(self.types)}
+
+        self.kind = [attacks[action]["type"] for action in self.actions]
+        self.rolls = [attacks[action].get("damage") or attacks[action].get("heal_amount")
+                      for action in self.actions]
+        self.max_roll = max(roll[1] for roll in self.rolls if roll)
+
+        # type_bonus[тип атакующего][действие][тип защищающегося] в процентах
+        self.type_bonus = [[[self.bonus(morty_types, attacker, action, defender) for defender in self.types]
+                            for action in self.actions] for attacker in self.types]
+
+        # outcome[действие игрока][действие врага]: "player"/"enemy"/"draw", если оба атакуют
+        self.outcome = [[self.rps_outcome(attacks, player_action, enemy_action) for enemy_action in self.actions]
+                        for player_action in self.actions]
+
+        self.player_damage = []
+        self.enemy_damage = []
+        # средний урон строки по броскам: считается при первом запросе (mean_damage)
+        self.means = {}
+        n_types = len(self.types)
+        n_actions = len(self.actions)
+        for pt in range(n_types):
+            for et in range(n_types):
+                for pa in range(n_actions):
+                    for ea in range(n_actions):
+                        for defending in (False, True):
+                            self.player_damage.append(tuple(
+                                self.player_hit(pt, et, pa, ea, defending, roll, win_multiplier,
+                                                lose_multiplier, defense_multiplier)
+                                for roll in range(self.max_roll + 1)))
+                            self.enemy_damage.append(tuple(
+                                self.enemy_hit(pt, et, pa, ea, defending, roll, win_multiplier,
+                                               lose_multiplier, defense_multiplier)
+                                for roll in range(self.max_roll + 1)))
+
+    def index(self, pt, et, pa, ea, defending):
+        """Номер строки таблицы урона"""
+        n_types = len(self.types)
+        n_actions = len(self.actions)
+        return (((pt * n_types + et) * n_actions + pa) * n_actions + ea) * 2 + bool(defending)
+
+    def mean_roll(self, action):
+        low, high = self.rolls[action]
+        return (low + high) / 2
+
+    def mean_damage(self, row, action, player=True):
+        """Средний урон строки player_damage (или enemy_damage) по равновероятным броскам action"""
+        key = (row, action, player)
+        mean = self.means.get(key)
+        if mean is None:
+            rolls = self.rolls[action]
+            if rolls is None:
+                mean = 0.0
+            else:
+                values = (self.player_damage if player else self.enemy_damage)[row][rolls[0]:rolls[1] + 1]
+                mean = sum(values) / len(values)
+            self.means[key] = mean
+        return mean
+
+    def bonus(self, morty_types, attacker, action, defender):
+        bonus = 0
+        if action == morty_types[defender]["weakness"]:
+            bonus = 50  # +50% урона
+        if morty_types[attacker]["strength"] == action:
+            bonus += 25  # дополнительные +25% урона
+        return bonus
+
+    def rps_outcome(self, attacks, player_action, enemy_action):
+        if attacks[player_action]["type"] != "attack" or attacks[enemy_action]["type"] != "attack":
+            return None
+        if player_action == enemy_action:
+            return "draw"
+        if attacks[player_action]["beats"] == enemy_action:
+            return "player"
+        return "enemy"
+
+    def player_hit(self, pt, et, pa, ea, enemy_defending, roll, win_multiplier, lose_multiplier,
+                   defense_multiplier):
+        """Урон игрока при выпавшем значении roll (с отбрасыванием дробной части на каждом шаге)"""
+        kind = self.kind[pa]
+        if kind == "attack":
+            damage = int(roll * (1 + self.type_bonus[pt][pa][et] / 100))
+            if enemy_defending:
+                damage = int(damage * defense_multiplier)
+        elif kind == "special_attack":
+            # Сильная атака считается как камень
+            damage = int(roll * (1 + self.type_bonus[pt][self.action_index["rock"]][et] / 100))
+        else:
+            return 0
+
+        outcome = self.outcome[pa][ea]
+        if outcome == "player":
+            damage = int(damage * win_multiplier)
+        elif outcome == "enemy":
+            damage = int(damage * lose_multiplier)
+        return damage
+
+    def enemy_hit(self, pt, et, pa, ea, player_defending, roll, win_multiplier, lose_multiplier,
+                  defense_multiplier):
+        """Урон врага при выпавшем значении roll"""
+        if self.kind[pa] == "defense":
+            # защита игрока обрывает раунд до хода врага
+            return 0
+
+        kind = self.kind[ea]
+        if kind == "attack":
+            damage = int(roll * (1 + self.type_bonus[et][ea][pt] / 100))
+            if player_defending:
+                damage = int(damage * defense_multiplier)
+        elif kind == "special_attack":
+            damage = roll
+        else:
+            return 0
+
+        outcome = self.outcome[pa][ea]
+        if outcome == "player":
+            damage = int(damage * lose_multiplier)
+        elif outcome == "enemy":
+            damage = int(damage * win_multiplier)
+        return damage
+
+
+_tables = {}
+
+
+def get_tables(attacks, morty_types, win_multiplier, lose_multiplier, defense_multiplier):
+    """Таблицы для конфигурации; пересчитываются только когда конфигурация изменилась"""
+    key = repr((attacks, morty_types, win_multiplier, lose_multiplier, defense_multiplier))
+    tables = _tables.get(key)
+    if tables is None:
+        tables = BattleTables(attacks, morty_types, win_multiplier, lose_multiplier, defense_multiplier)
+        _tables[key] = tables
+    return tables
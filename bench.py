@@ -0,0 +1,258 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+# без окна: бенчмарк должен работать на сервере без дисплея
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+
+from profiler import FrameProfiler
+
+
+BASELINE = "bench_baseline.json"
+
+# Метрики, по которым ищется регрессия: имя -> True, если больше - лучше
+METRICS = {
+    "fps": True,
+    "frame_ms_p95": False,
+    "alloc_kb_per_frame": False,
+}
+
+# доля попаданий в кэши кадров после прогрева: цикл анимации должен целиком лежать в кэше
+MIN_CACHE_HIT_RATE = 0.99
+
+BATTLE_KEYS = [pygame.K_1, pygame.K_2, pygame.K_3, pygame.K_4, pygame.K_5, pygame.K_6]
+
+
+def menu_scene(profiler):
+    """Объекты меню из main.py; возвращает функцию одного кадра (с кэшами кадров в frame.caches)"""
+    import main
+
+    step = 1000 / main.SIMULATION_HZ
+
+    def frame(index):
+        with profiler.section("update"):
+            for obj in main.drawable_objects:
+                if hasattr(obj, "update"):
+                    obj.update(step)
+        with profiler.section("interpolate"):
+            for obj in main.drawable_objects:
+                if hasattr(obj, "interpolate"):
+                    obj.interpolate(0)
+        with profiler.section("draw"):
+            main.screen.fill(main.WHITE)
+            for obj in main.drawable_objects:
+                obj.draw(main.screen)
+        with profiler.section("display"):
+            pygame.display.flip()
+
+    frame.caches = {obj.image_path: obj.frame_cache for obj in main.drawable_objects
+                    if getattr(obj, "frame_cache", None)}
+    return frame
+
+
+def battle_scene(profiler, seed=0):
+    """MortyBattle с заранее известной последовательностью нажатий"""
+    import main
+    from battle_scene import MortyBattle
+
+    battle = profiler.instrument(MortyBattle(main.screen, seed=seed), group="battle")
+    step = 1000 / main.SIMULATION_HZ
+
+    def frame(index):
+        # раз в 10 кадров - нажатие: ход игрока, продолжение или новый бой
+        if index % 10 == 0:
+            if battle.game_state == "player_turn":
+                key = BATTLE_KEYS[index // 10 % len(BATTLE_KEYS)]
+            elif battle.game_state == "game_over":
+                key = pygame.K_r
+            else:
+                key = pygame.K_SPACE
+            with profiler.section("events"):
+                battle.handle_event(pygame.event.Event(pygame.KEYDOWN, key=key))
+        with profiler.section("update"):
+            battle.update(step)
+        with profiler.section("draw"):
+            rects = battle.draw()
+        with profiler.section("display"):
+            if rects:
+                pygame.display.update(rects)
+
+    return frame
+
+
+OVERWORLD_KEYS = [pygame.K_RIGHT, pygame.K_DOWN, pygame.K_LEFT, pygame.K_UP]
+
+
+def overworld_scene(profiler, seed=0):
+    """Карта main.py по размеру и числу объектов; персонаж ходит кругами"""
+    import main
+    from atlas import Atlas
+    from overworld import OverworldScene, generate
+
+    world = generate(main.OVERWORLD_SIZE, main.OVERWORLD_SIZE, main.OVERWORLD_OBJECTS, seed=seed)
+    scene = profiler.instrument(OverworldScene(main.screen, world, Atlas.load(assets=main.assets)),
+                                group="overworld")
+    step = 1000 / main.SIMULATION_HZ
+
+    def frame(index):
+        # раз в 2 секунды - смена направления
+        if index % 120 == 0:
+            with profiler.section("events"):
+                key = OVERWORLD_KEYS[index // 120 % len(OVERWORLD_KEYS)]
+                previous = OVERWORLD_KEYS[(index // 120 - 1) % len(OVERWORLD_KEYS)]
+                scene.handle_event(pygame.event.Event(pygame.KEYUP, key=previous))
+                scene.handle_event(pygame.event.Event(pygame.KEYDOWN, key=key))
+        with profiler.section("update"):
+            scene.update(step)
+        with profiler.section("interpolate"):
+            scene.interpolate(0)
+        with profiler.section("draw"):
+            scene.draw()
+        with profiler.section("display"):
+            pygame.display.flip()
+
+    return frame
+
+
+SCENES = {
+    "menu": menu_scene,
+    "battle": battle_scene,
+    "overworld": overworld_scene,
+}
+
+
+def measure(scene, frames, warmup):
+    """Гоняет сцену: проход на время и отдельный проход с tracemalloc на память"""
+    profiler = FrameProfiler(enabled=True, history=frames)
+    frame = SCENES[scene](profiler)
+    for index in range(warmup):
+        frame(index)
+    profiler.frames.clear()
+    caches = getattr(frame, "caches", {})
+    cache_before = {name: (cache.frames.hits, cache.frames.misses) for name, cache in caches.items()}
+
+    gc_before = gc.get_stats()[0]["collections"]
+    start = time.perf_counter()
+    for index in range(warmup, warmup + frames):
+        profiler.begin_frame()
+        frame(index)
+        profiler.end_frame()
+    elapsed = time.perf_counter() - start
+    gc_collections = gc.get_stats()[0]["collections"] - gc_before
+    summary = profiler.summary()
+    hit_rates = {}
+    for name, cache in caches.items():
+        hits = cache.frames.hits - cache_before[name][0]
+        misses = cache.frames.misses - cache_before[name][1]
+        hit_rates[name] = hits / (hits + misses) if hits + misses else 1.0
+
+    # пик памяти внутри кадра относительно его начала (только выделения Python)
+    alloc_frames = max(1, frames // 4)
+    tracemalloc.start()
+    peaks = []
+    for index in range(warmup + frames, warmup + frames + alloc_frames):
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        frame(index)
+        peaks.append(tracemalloc.get_traced_memory()[1] - current)
+    tracemalloc.stop()
+
+    return {
+        "frames": frames,
+        "fps": frames / elapsed,
+        "frame_ms_p50": summary["frame_ms"]["p50"],
+        "frame_ms_p95": summary["frame_ms"]["p95"],
+        "frame_ms_p99": summary["frame_ms"]["p99"],
+        "alloc_kb_per_frame": sum(peaks) / len(peaks) / 1024,
+        "gc_gen0_per_1k_frames": gc_collections * 1000 / frames,
+        "phases_ms": summary["sections_ms"],
+        "cache_hit_rate": hit_rates,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Список регрессий относительно базовой линии
+
+    Сцена или метрика, которой нет в базе, тоже считается провалом: иначе
+    проверка молча становится неполной.
+    """
+    regressions = []
+    for scene, metrics in results.items():
+        for name, rate in metrics.get("cache_hit_rate", {}).items():
+            if rate < MIN_CACHE_HIT_RATE:
+                regressions.append(f"{scene}: попаданий в кэш кадров {name} {rate:.1%} "
+                                   f"(нужно не меньше {MIN_CACHE_HIT_RATE:.0%})")
+        base = baseline.get("scenes", {}).get(scene)
+        if not base:
+            regressions.append(f"{scene}: нет в базе (обновите ее: --update-baseline)")
+            continue
+        for name, higher_is_better in METRICS.items():
+            if name not in base:
+                regressions.append(f"{scene}.{name}: нет в базе (обновите ее: --update-baseline)")
+                continue
+            value, reference = metrics[name], base[name]
+            if higher_is_better:
+                failed = value < reference * (1 - tolerance)
+            else:
+                failed = value > reference * (1 + tolerance)
+            if failed:
+                regressions.append(f"{scene}.{name}: {value:.2f} (база {reference:.2f})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк сцен без окна (SDL dummy)")
+    parser.add_argument("--scenes", default=",".join(SCENES))
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--warmup", type=int, default=500,
+                        help="кадров на прогрев (ленивые кэши кадров, шрифтов и чанков)")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="допустимое отклонение от базы (доля)")
+    parser.add_argument("--update-baseline", action="store_true", help="записать результаты как новую базу")
+    parser.add_argument("--out", default=None, help="куда записать результаты (JSON)")
+    args = parser.parse_args()
+
+    results = {}
+    for scene in args.scenes.split(","):
+        results[scene] = measure(scene, args.frames, args.warmup)
+        metrics = results[scene]
+        print(f"{scene}: {metrics['fps']:.0f} кадров/с, p95 {metrics['frame_ms_p95']:.2f} мс, "
+              f"{metrics['alloc_kb_per_frame']:.1f} КБ/кадр")
+        for phase, ms in metrics["phases_ms"].items():
+            print(f"    {phase:<36} {ms:7.3f} мс")
+        for name, rate in metrics["cache_hit_rate"].items():
+            print(f"    попаданий в кэш {name:<36} {rate:7.1%}")
+
+    report = {"python": sys.version.split()[0], "pygame": pygame.version.ver,
+              "machine": platform.machine(), "scenes": results}
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1)
+
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1)
+        print(f"База обновлена: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"Нет базы {args.baseline}, сравнивать не с чем (--update-baseline)")
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print("РЕГРЕССИЯ", regression)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
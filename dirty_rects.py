@@ -0,0 +1,127 @@
+import pygame
+
+
+class Layer:
+    """Заранее отрисованный статичный слой
+
+    Собирается функцией build(surface) и пересобирается только при смене
+    размера или состояния (state), а не каждый кадр.
+    """
+
+    def __init__(self, size, build, state=None):
+        self.size_fn = size
+        self.build = build
+        self.state_fn = state
+        self.key = None
+        self.surface = None
+        self.builds = 0
+
+    def update(self):
+        """Пересобирает слой, если он устарел; возвращает True, если пересобрал"""
+        key = (tuple(self.size_fn()), self.state_fn() if self.state_fn else None)
+        if key == self.key:
+            return False
+        if self.surface is None or self.surface.get_size() != key[0]:
+            self.surface = pygame.Surface(key[0])
+        self.build(self.surface)
+        self.key = key
+        self.builds += 1
+        return True
+
+
+class Widget:
+    """Элемент сцены: сам знает свой прямоугольник и когда его надо перерисовать"""
+
+    def __init__(self, name, draw, rect, state=None):
+        self.name = name
+        self.draw = draw
+        self.rect_fn = rect
+        self.state_fn = state
+        self.rect = None
+        self.state = None
+        self.dirty = True
+
+    def refresh(self):
+        """Возвращает области, которые изменились с прошлого кадра"""
+        rect = self.rect_fn()
+        state = self.state_fn() if self.state_fn else None
+        if not self.dirty and state == self.state and rect == self.rect:
+            return []
+
+        changed = [r for r in (self.rect, rect) if r is not None]
+        self.rect = rect
+        self.state = state
+        self.dirty = False
+        return changed
+
+
+def merge_rects(rects, bounds):
+    """Сливает пересекающиеся прямоугольники и обрезает их по экрану"""
+    merged = []
+    for rect in rects:
+        rect = rect.clip(bounds)
+        if rect.width <= 0 or rect.height <= 0:
+            continue
+        i = 0
+        while i < len(merged):
+            if merged[i].colliderect(rect):
+                rect = rect.union(merged.pop(i))
+                i = 0
+            else:
+                i += 1
+        merged.append(rect)
+    return merged
+
+
+class DirtyRenderer:
+    """Перерисовывает только изменившиеся области поверх готового фона
+
+    Фон - готовая поверхность или Layer; если слой пересобрался, кадр рисуется целиком.
+    """
+
+    def __init__(self, surface, background):
+        self.surface = surface
+        self.layer = background if isinstance(background, Layer) else None
+        self.background = None if self.layer else background
+        self.widgets = []
+        self.full_redraw = True
+
+    def add(self, name, draw, rect, state=None):
+        widget = Widget(name, draw, rect, state)
+        self.widgets.append(widget)
+        return widget
+
+    def invalidate(self):
+        """Следующий кадр будет нарисован целиком"""
+        self.full_redraw = True
+
+    def render(self):
+        """Рисует кадр и возвращает список областей для display.update"""
+        if self.layer is not None and self.layer.update():
+            self.background = self.layer.surface
+            self.full_redraw = True
+
+        changed = []
+        for widget in self.widgets:
+            changed.extend(widget.refresh())
+
+        bounds = self.surface.get_rect()
+        if self.full_redraw:
+            self.full_redraw = False
+            self.surface.blit(self.background, (0, 0))
+            for widget in self.widgets:
+                if widget.rect is not None:
+                    widget.draw()
+            return [bounds]
+
+        dirty = merge_rects(changed, bounds)
+        for rect in dirty:
+            # все, что рисуют виджеты, обрезается по грязной области
+            self.surface.set_clip(rect)
+            self.surface.blit(self.background, rect, rect)
+            for widget in self.widgets:
+                if widget.rect is not None and widget.rect.colliderect(rect):
+                    widget.draw()
+        self.surface.set_clip(None)
+        return dirty
+
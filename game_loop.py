@@ -0,0 +1,41 @@
+class FixedTimestep:
+    """Накопитель времени: логика обновляется шагами постоянной длины, отрисовка - сколько успевает
+
+    Если кадр затянулся и шагов набралось больше max_steps, лишнее время
+    выбрасывается: на медленной машине игра замедляется, но логика остается
+    правильной и не уходит в бесконечное догоняние.
+    """
+
+    def __init__(self, step_ms=1000 / 60, max_steps=5):
+        self.step = step_ms
+        self.max_steps = max_steps
+        self.accumulator = 0
+        self.steps = 0
+        self.dropped_ms = 0
+
+    def advance(self, dt):
+        """Добавляет прошедшее время (мс), возвращает число шагов логики для этого кадра"""
+        self.accumulator += dt
+        steps = int(self.accumulator // self.step)
+        if steps > self.max_steps:
+            dropped = self.accumulator - self.max_steps * self.step
+            # остаток меньше шага сохраняем, чтобы интерполяция не дергалась
+            dropped -= dropped % self.step
+            self.dropped_ms += dropped
+            self.accumulator -= dropped
+            steps = self.max_steps
+        self.accumulator -= steps * self.step
+        self.steps += steps
+        return steps
+
+    def alpha(self):
+        """Доля следующего шага, уже прошедшая к моменту отрисовки (0..1)"""
+        return self.accumulator / self.step
+
+    def reset(self):
+        self.accumulator = 0
+
+
+def lerp(previous, current, alpha):
+    """Значение между двумя шагами логики для отрисовки"""
+    return previous + (current - previous) * alpha
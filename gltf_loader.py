@@ -0,0 +1,326 @@
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pygame
+
+
+COMPONENT_TYPES = {
+    5120: np.int8,
+    5121: np.uint8,
+    5122: np.int16,
+    5123: np.uint16,
+    5125: np.uint32,
+    5126: np.float32,
+}
+
+TYPE_SIZES = {"SCALAR": 1, "VEC2": 2, "VEC3": 3, "VEC4": 4, "MAT2": 4, "MAT3": 9, "MAT4": 16}
+
+TRIANGLES = 4
+
+# вид как у камеры веб-прототипа (scene0.html): наклон 36.5 градусов
+LAYOUT_PITCH = 36.5
+
+
+class Gltf:
+    """glTF 2.0 с буферами, отображенными в память
+
+    Файлы .bin не читаются целиком: np.memmap отдает их страницы по мере
+    обращения, а accessor() возвращает представление NumPy прямо поверх
+    буфера (с учетом byteOffset и byteStride), без копирования.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.directory = os.path.dirname(path)
+        with open(path, encoding="utf-8") as f:
+            self.json = json.load(f)
+        self.buffers = {}
+        self.accessors = {}
+
+    def buffer(self, index):
+        """Буфер как массив байт: файл - через memmap, data: URI - декодируется"""
+        buffer = self.buffers.get(index)
+        if buffer is None:
+            info = self.json["buffers"][index]
+            uri = info["uri"]
+            if uri.startswith("data:"):
+                buffer = np.frombuffer(base64.b64decode(uri.split(",", 1)[1]), dtype=np.uint8)
+            else:
+                buffer = np.memmap(os.path.join(self.directory, uri), dtype=np.uint8, mode="r",
+                                   shape=(info["byteLength"],))
+            self.buffers[index] = buffer
+        return buffer
+
+    def accessor(self, index):
+        """Данные accessor как представление NumPy: (count,) для SCALAR, иначе (count, n)"""
+        array = self.accessors.get(index)
+        if array is not None:
+            return array
+        info = self.json["accessors"][index]
+        if "sparse" in info:
+            raise ValueError(f"sparse accessor {index} не поддерживается")
+        dtype = np.dtype(COMPONENT_TYPES[info["componentType"]])
+        size = TYPE_SIZES[info["type"]]
+        count = info["count"]
+        shape = (count,) if size == 1 else (count, size)
+
+        if "bufferView" not in info:
+            array = np.zeros(shape, dtype)
+        else:
+            view = self.json["bufferViews"][info["bufferView"]]
+            stride = view.get("byteStride") or dtype.itemsize * size
+            offset = view.get("byteOffset", 0) + info.get("byteOffset", 0)
+            strides = (stride,) if size == 1 else (stride, dtype.itemsize)
+            array = np.ndarray(shape, dtype, buffer=self.buffer(view["buffer"]), offset=offset, strides=strides)
+        self.accessors[index] = array
+        return array
+
+    def floats(self, index):
+        """accessor в float32; нормализованные целые переводятся в 0..1 (-1..1)"""
+        array = self.accessor(index)
+        if array.dtype == np.float32:
+            return array
+        if self.json["accessors"][index].get("normalized"):
+            values = array.astype(np.float32) / np.iinfo(array.dtype).max
+            if np.issubdtype(array.dtype, np.signedinteger):
+                # по спецификации glTF: max(c / 127, -1), иначе -128 дает меньше -1
+                np.maximum(values, -1.0, out=values)
+            return values
+        return array.astype(np.float32)
+
+    def node_matrices(self, scene=None):
+        """Мировые матрицы узлов сцены: [(номер узла, матрица 4x4)]"""
+        nodes = self.json.get("nodes", [])
+        scenes = self.json.get("scenes")
+        if scenes:
+            roots = scenes[self.json.get("scene", 0) if scene is None else scene]["nodes"]
+        else:
+            roots = range(len(nodes))
+        result = []
+        stack = [(root, np.identity(4)) for root in reversed(roots)]
+        while stack:
+            index, parent = stack.pop()
+            matrix = parent @ local_matrix(nodes[index])
+            result.append((index, matrix))
+            for child in reversed(nodes[index].get("children", [])):
+                stack.append((child, matrix))
+        return result
+
+    def primitives(self, scene=None):
+        """Примитивы сцены с мировой матрицей: (узел, примитив, матрица)"""
+        nodes = self.json.get("nodes", [])
+        for index, matrix in self.node_matrices(scene):
+            mesh = nodes[index].get("mesh")
+            if mesh is None:
+                continue
+            for primitive in self.json["meshes"][mesh]["primitives"]:
+                yield nodes[index], primitive, matrix
+
+    def image_path(self, texture):
+        image = self.json["images"][self.json["textures"][texture]["source"]]
+        return os.path.join(self.directory, image["uri"])
+
+    def close(self):
+        self.buffers.clear()
+        self.accessors.clear()
+
+
+def quaternion_matrix(x, y, z, w):
+    return np.array([
+        [1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)],
+        [2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)],
+        [2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)],
+    ])
+
+
+def local_matrix(node):
+    """Локальная матрица узла из matrix или translation/rotation/scale"""
+    if "matrix" in node:
+        return np.array(node["matrix"], dtype=np.float64).reshape(4, 4).T
+    matrix = np.identity(4)
+    matrix[:3, :3] = quaternion_matrix(*node.get("rotation", (0, 0, 0, 1))) * node.get("scale", (1, 1, 1))
+    matrix[:3, 3] = node.get("translation", (0, 0, 0))
+    return matrix
+
+
+def view_matrix(pitch=90, yaw=0):
+    """Поворот мира к виду: pitch 90 - сверху, 0 - спереди; ось y экрана смотрит вниз"""
+    pitch, yaw = np.radians(pitch), np.radians(yaw)
+    cy, sy = np.cos(yaw), np.sin(yaw)
+    cp, sp = np.cos(pitch), np.sin(pitch)
+    rotate_yaw = np.array([[cy, 0, sy], [0, 1, 0], [-sy, 0, cy]])
+    rotate_pitch = np.array([[1, 0, 0], [0, cp, -sp], [0, sp, cp]])
+    flip = np.diag([1, -1, -1])
+    return flip @ rotate_pitch @ rotate_yaw
+
+
+class Projection:
+    """2D-данные для отрисовки: треугольники в единицах сцены, цвета, глубина и рамки узлов
+
+    Треугольники отсортированы от дальних к ближним (алгоритм художника).
+    """
+
+    def __init__(self, triangles, colors, depth, items):
+        order = np.argsort(-depth, kind="stable")
+        self.triangles = triangles[order]
+        self.colors = colors[order]
+        self.depth = depth[order]
+        self.items = items
+        if len(triangles):
+            points = self.triangles.reshape(-1, 2)
+            self.bounds = (*points.min(axis=0), *points.max(axis=0))
+        else:
+            self.bounds = (0, 0, 0, 0)
+
+    def fit(self, size, margin=0.05):
+        """Масштаб и сдвиг, вписывающие сцену в прямоугольник size"""
+        left, top, right, bottom = self.bounds
+        width, height = size
+        scale = min(width * (1 - 2 * margin) / max(right - left, 1e-6),
+                    height * (1 - 2 * margin) / max(bottom - top, 1e-6))
+        offset = (width / 2 - (left + right) / 2 * scale, height / 2 - (top + bottom) / 2 * scale)
+        return scale, offset
+
+    def render(self, size, background=None, margin=0.05):
+        """Рисует проекцию на новой поверхности; без background - с прозрачным фоном"""
+        if background is None:
+            surface = pygame.Surface(size, pygame.SRCALPHA)
+        else:
+            surface = pygame.Surface(size)
+            surface.fill(background)
+        scale, offset = self.fit(size, margin)
+        points = (self.triangles * scale + offset).tolist()
+        for triangle, color in zip(points, self.colors.tolist()):
+            pygame.draw.polygon(surface, color, triangle)
+        return surface
+
+
+class Texture:
+    """Пиксели текстуры для выборки цвета и прозрачности по UV"""
+
+    def __init__(self, path):
+        image = pygame.image.load(path)
+        has_alpha = image.get_flags() & pygame.SRCALPHA
+        if image.get_bytesize() >= 3:
+            # ссылки на пиксели поверхности, а не копии (палитровые картинки копируются)
+            self.image = image
+            self.pixels = pygame.surfarray.pixels3d(image)
+            self.alpha = pygame.surfarray.pixels_alpha(image) if has_alpha else None
+        else:
+            self.pixels = pygame.surfarray.array3d(image)
+            self.alpha = pygame.surfarray.array_alpha(image) if has_alpha else None
+
+    def sample(self, uv):
+        """(цвета, альфа) в точках uv"""
+        width, height = self.pixels.shape[:2]
+        x = (np.mod(uv[:, 0], 1) * (width - 1)).astype(np.int32)
+        y = (np.mod(uv[:, 1], 1) * (height - 1)).astype(np.int32)
+        alpha = self.alpha[x, y] if self.alpha is not None else np.full(len(uv), 255, np.uint8)
+        return self.pixels[x, y], alpha
+
+
+def material_colors(gltf, primitive, uv_faces, count, textures):
+    """Цвет каждого треугольника (текстура в центре треугольника по UV или baseColorFactor)
+    и маска видимых: прозрачные по текстуре треугольники с alphaMode MASK/BLEND выбрасываются"""
+    material = gltf.json["materials"][primitive["material"]] if "material" in primitive else {}
+    pbr = material.get("pbrMetallicRoughness", {})
+    factor = np.array(pbr.get("baseColorFactor", (1, 1, 1, 1)))
+    texture = pbr.get("baseColorTexture")
+    if texture is None or uv_faces is None:
+        return np.tile(factor[:3] * 255, (count, 1)), np.ones(count, bool)
+    path = gltf.image_path(texture["index"])
+    if path not in textures:
+        textures[path] = Texture(path)
+    colors, alpha = textures[path].sample(uv_faces.mean(axis=1))
+    visible = np.ones(count, bool)
+    if material.get("alphaMode", "OPAQUE") != "OPAQUE":
+        visible = alpha * factor[3] >= material.get("alphaCutoff", 0.5) * 255
+    return colors * factor[:3], visible
+
+
+def project(gltf, pitch=90, yaw=0, scene=None, light=0.35):
+    """Проецирует треугольники сцены на плоскость вида; возвращает Projection
+
+    Треугольник закрашивается цветом материала с простым затенением по
+    нормали: грани, повернутые к зрителю, светлее.
+    """
+    rotation = view_matrix(pitch, yaw)
+    triangles, colors, depth, items = [], [], [], []
+    textures = {}
+    for node, primitive, matrix in gltf.primitives(scene):
+        if primitive.get("mode", TRIANGLES) != TRIANGLES:
+            continue
+        positions = gltf.floats(primitive["attributes"]["POSITION"])
+        if "indices" in primitive:
+            indices = gltf.accessor(primitive["indices"]).astype(np.int64)
+        else:
+            indices = np.arange(len(positions))
+        indices = indices[:len(indices) // 3 * 3].reshape(-1, 3)
+
+        # вершины в мир и к виду; копируются только вершины, сами буферы остаются в memmap
+        transform = rotation @ matrix[:3, :3]
+        view = positions @ transform.T + rotation @ matrix[:3, 3]
+        faces = view[indices]
+
+        uv = primitive["attributes"].get("TEXCOORD_0")
+        uv_faces = gltf.floats(uv)[indices] if uv is not None else None
+        color, visible = material_colors(gltf, primitive, uv_faces, len(faces), textures)
+        faces, color = faces[visible], color[visible]
+
+        normals = np.cross(faces[:, 1] - faces[:, 0], faces[:, 2] - faces[:, 0])
+        lengths = np.linalg.norm(normals, axis=1)
+        facing = np.abs(normals[:, 2]) / np.where(lengths > 0, lengths, 1)
+        shade = (1 - light) + light * facing
+
+        triangles.append(faces[:, :, :2].astype(np.float32))
+        colors.append(np.clip(color * shade[:, None], 0, 255).astype(np.uint8))
+        depth.append(faces[:, :, 2].mean(axis=1))
+        if not len(faces):
+            continue
+        points = faces[:, :, :2].reshape(-1, 2)
+        items.append((node.get("name", ""), (*points.min(axis=0), *points.max(axis=0))))
+
+    if not triangles:
+        return Projection(np.zeros((0, 3, 2), np.float32), np.zeros((0, 3), np.uint8), np.zeros(0), items)
+    return Projection(np.concatenate(triangles), np.concatenate(colors), np.concatenate(depth), items)
+
+
+def load(path):
+    return Gltf(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Загрузка glTF-сцены и ее проекция в 2D")
+    parser.add_argument("path")
+    parser.add_argument("--pitch", type=float, default=LAYOUT_PITCH)
+    parser.add_argument("--yaw", type=float, default=0)
+    parser.add_argument("--png", default=None, help="сохранить картинку проекции")
+    parser.add_argument("--size", default="1200x675")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    gltf = load(args.path)
+    positions = 0
+    for _, primitive, _ in gltf.primitives():
+        positions += len(gltf.accessor(primitive["attributes"]["POSITION"]))
+    loaded = time.perf_counter() - start
+    projection = project(gltf, args.pitch, args.yaw)
+    projected = time.perf_counter() - start - loaded
+    print(f"{args.path}: узлов {len(gltf.json.get('nodes', []))}, вершин {positions}, "
+          f"треугольников {len(projection.triangles)}")
+    print(f"загрузка {loaded * 1000:.2f} мс, проекция {projected * 1000:.2f} мс")
+
+    if args.png:
+        size = tuple(int(value) for value in args.size.split("x"))
+        pygame.image.save(projection.render(size, background=(50, 50, 50)), args.png)
+        print(args.png)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,227 @@
+import argparse
+import asyncio
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from battle_engine import BattleEngine
+from battle_policies import POLICIES
+from battle_server import BattleServer, bot, raise_file_limit
+from tournament import MAX_ROUNDS
+
+
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+def rss_bytes():
+    """Текущий RSS процесса (Linux, /proc), None - если узнать нельзя"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class Player:
+    """Скриптовый игрок со своим боем: тот же цикл раунда, что и в MortyBattle"""
+
+    __slots__ = ("engine", "policy", "rounds", "battles", "battle_rounds")
+
+    def __init__(self, seed, policy):
+        self.engine = BattleEngine(seed)
+        self.policy = policy
+        self.rounds = 0
+        self.battles = 0
+        self.battle_rounds = 0
+
+    def play_round(self):
+        """player_action -> enemy_choose -> apply_damage -> reset_round или start_new_battle"""
+        engine = self.engine
+        engine.player_action(self.policy(engine, True))
+        engine.enemy_choose()
+        winner = engine.apply_damage()
+        self.rounds += 1
+        self.battle_rounds += 1
+        if winner is None and self.battle_rounds < MAX_ROUNDS:
+            engine.reset_round()
+        else:
+            engine.start_new_battle()
+            self.battles += 1
+            self.battle_rounds = 0
+
+
+async def play(player, loop, stop_at, think, rng, latencies):
+    """Игрок думает think мс (в среднем) и ходит; задержка - от готовности хода до итога раунда"""
+    while True:
+        ready = loop.time() + (rng.uniform(0.5, 1.5) * think / 1000 if think else 0)
+        if ready >= stop_at:
+            return
+        await asyncio.sleep(ready - loop.time())
+        player.play_round()
+        latencies.append(loop.time() - ready)
+
+
+def run_shard(shard):
+    """Пачка одновременных боев в одном процессе, на своем цикле asyncio"""
+    players, seconds, think, policy_name, seed = shard
+    policy = POLICIES[policy_name]
+    rng = random.Random(seed)
+
+    # память активного боя: движок после первого раунда, только объекты Python;
+    # общие таблицы строятся при первом раунде, их в счет боя не берем
+    Player(seed, policy).play_round()
+    gc.collect()
+    tracemalloc.start()
+    swarm = [Player(seed * 1_000_003 + i, policy) for i in range(players)]
+    for player in swarm:
+        player.play_round()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    for player in swarm:
+        player.rounds = player.battles = 0
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        stop_at = loop.time() + seconds
+        latencies = []
+        start = time.perf_counter()
+        await asyncio.gather(*(play(player, loop, stop_at, think, rng, latencies) for player in swarm))
+        return latencies, time.perf_counter() - start
+
+    latencies, elapsed = asyncio.run(run())
+    return {
+        "players": players,
+        "rounds": sum(player.rounds for player in swarm),
+        "battles": sum(player.battles for player in swarm),
+        "elapsed": elapsed,
+        "latencies": np.array(latencies, dtype=np.float32),
+        "memory": memory,
+        "rss": rss_bytes(),
+    }
+
+
+def split_players(players, workers):
+    base, extra = divmod(players, workers)
+    return [base + (i < extra) for i in range(workers) if base + (i < extra)]
+
+
+def run_local(players, seconds, think=0, workers=None, policy="random", seed=0):
+    """Рой игроков на движке без сети: players боев поровну по workers процессам"""
+    workers = workers or os.cpu_count() or 1
+    shards = [(count, seconds, think, policy, seed + i) for i, count in enumerate(split_players(players, workers))]
+    with ProcessPoolExecutor(max_workers=len(shards)) as pool:
+        results = list(pool.map(run_shard, shards))
+
+    rss = [result["rss"] for result in results if result["rss"] is not None]
+    return {
+        "players": players,
+        "workers": len(shards),
+        "rounds": sum(result["rounds"] for result in results),
+        "battles": sum(result["battles"] for result in results),
+        "elapsed": max(result["elapsed"] for result in results),
+        "latencies": np.concatenate([result["latencies"] for result in results]),
+        "memory_per_battle": sum(result["memory"] for result in results) / players,
+        "rss": sum(rss) if rss else None,
+    }
+
+
+async def run_server(pairs, battles, host="127.0.0.1", port=None, seed=0):
+    """Боты по сети против сервера; без port сервер поднимается в этом же процессе на loopback
+
+    Память на бой - прирост RSS процесса на пике, деленный на число боев на
+    пике; со своим сервером в нее входят и боты, и обе стороны соединений.
+    """
+    server = None
+    if port is None:
+        server = BattleServer(seed)
+        await server.start(host, 0)
+        port = server.port
+    gc.collect()
+    base_rss = rss_bytes()
+    peak_rss = base_rss
+
+    async def watch():
+        nonlocal peak_rss
+        while True:
+            await asyncio.sleep(0.1)
+            peak_rss = max(peak_rss, rss_bytes())
+
+    watcher = asyncio.create_task(watch()) if base_rss is not None else None
+    latencies = []
+    start = time.perf_counter()
+    rounds = await asyncio.gather(*(bot(host, port, battles, seed=seed * 100003 + i, name=f"load{i}",
+                                        latencies=latencies) for i in range(pairs * 2)))
+    elapsed = time.perf_counter() - start
+    if watcher is not None:
+        watcher.cancel()
+
+    result = {
+        "players": pairs * 2,
+        "rounds": sum(rounds) // 2,
+        "battles": pairs * battles,
+        "elapsed": elapsed,
+        "latencies": np.array(latencies, dtype=np.float32),
+        "memory_per_battle": None,
+        "rss": peak_rss,
+    }
+    if server is not None:
+        stats = server.stats()
+        if base_rss is not None and stats["peak_matches"]:
+            result["memory_per_battle"] = (peak_rss - base_rss) / stats["peak_matches"]
+        server.server.close()
+        await server.server.wait_closed()
+    return result
+
+
+def report(result):
+    latencies = result["latencies"] * 1000
+    lines = [f"игроков {result['players']}, раундов {result['rounds']}, боев {result['battles']} "
+             f"за {result['elapsed']:.2f} с: {result['rounds'] / result['elapsed']:.0f} раундов/с"]
+    if len(latencies):
+        values = np.percentile(latencies, PERCENTILES)
+        lines.append("задержка раунда, мс: " + "  ".join(f"p{p:g} {value:.2f}" for p, value in zip(PERCENTILES, values))
+                     + f"  max {latencies.max():.2f}")
+    if result["memory_per_battle"] is not None:
+        lines.append(f"память на активный бой: {result['memory_per_battle'] / 1024:.1f} КБ")
+    if result["rss"] is not None:
+        lines.append(f"RSS: {result['rss'] / 2 ** 20:.0f} МБ")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест боев: рой скриптовых игроков без сети или по loopback")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    local_parser = sub.add_parser("local", help="движки в пуле процессов, игроки - корутины asyncio")
+    local_parser.add_argument("--players", type=int, default=5000, help="одновременных боев")
+    local_parser.add_argument("--seconds", type=float, default=10)
+    local_parser.add_argument("--think", type=float, default=0, help="среднее время на ход, мс")
+    local_parser.add_argument("--workers", type=int, default=None)
+    local_parser.add_argument("--policy", default="random", choices=list(POLICIES))
+    local_parser.add_argument("--seed", type=int, default=0)
+
+    server_parser = sub.add_parser("server", help="боты через battle_server (без --port - свой сервер на loopback)")
+    server_parser.add_argument("--pairs", type=int, default=1000, help="одновременных боев")
+    server_parser.add_argument("--battles", type=int, default=3, help="боев на пару")
+    server_parser.add_argument("--host", default="127.0.0.1")
+    server_parser.add_argument("--port", type=int, default=None)
+    server_parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.command == "local":
+        result = run_local(args.players, args.seconds, args.think, args.workers, args.policy, args.seed)
+    else:
+        raise_file_limit()
+        result = asyncio.run(run_server(args.pairs, args.battles, args.host, args.port, args.seed))
+    print(report(result))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
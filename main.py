@@ -2,7 +2,21 @@ import pygame
 import sys
 import math
 import os
+import random
+import time
+from asset_manager import assets
+from asset_pipeline import BACKGROUND_PULSE_TOP, BUTTON_PULSE_TOP, MENU_VARIANTS, SPLASH_IMAGE, SPLASH_SCALE
+from battle_client import ClientThread, NetworkBattle
+from battle_policies import POLICIES
+from atlas import Atlas
 from battle_scene import MortyBattle
+from game_loop import FixedTimestep, lerp
+from map_chunks import CHUNK_EXT, ChunkedWorld
+from overworld import GridWorld, OverworldScene, generate
+from profiler import FrameProfiler
+from replay import ReplayRecorder
+from render_cache import FrameCache, get_font
+from scenes import SceneManager
 
 pygame.init()
 
@@ -21,9 +35,91 @@ window_scale = min(scale_x, scale_y)
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
 
+# Режим кэша кадров: пульсация и вращение берутся из заранее отрисованных кадров
+FRAME_CACHE_MODE = True
+
+# Политика врага из battle_policies.POLICIES, None - таблица весов enemy_choose
+ENEMY_POLICY = None
+
+# Морти в бою: False - векторные кадры, True - картинки front.png/back.png (кадры в обоих случаях кэшируются)
+MORTY_SPRITE_ART = False
+
+# glTF-раскладка на фоне боя (например, "assets/scenes/loyauts/none.gltf"), None - сетка
+BATTLE_LAYOUT = None
+
+# Карта overworld: JSON из overworld.py или экспорт редактора (грузится целиком),
+# .mchk из map_chunks.py (чанки подгружаются вокруг камеры), None - случайная карта
+OVERWORLD_MAP = None
+OVERWORLD_SIZE = 256  # сторона случайной карты в клетках
+OVERWORLD_OBJECTS = 5000
+OVERWORLD_KEY = pygame.K_m  # вход на карту из меню
+
+# Папка для записи боев, например "replays" (python replay.py run/show <файл>); None - не записывать
+REPLAY_DIR = None
+
+# Бой против человека через сервер (python battle_server.py serve), например ("127.0.0.1", 8765);
+# None - бой с ИИ. Сетевые бои не записываются
+BATTLE_SERVER = None
+
+# Логика обновляется фиксированными шагами, отрисовка идет со своей частотой
+SIMULATION_HZ = 60
+RENDER_FPS = 60  # 0 - без ограничения
+MAX_STEPS_PER_FRAME = 5  # больше шагов за кадр не делаем, лишнее время выбрасываем
+
+# Переход между сценами: "fade" - через черный, "crossfade" - смешивание снимков сцен
+SCENE_TRANSITION = "fade"
+# Результат handle_event сцены -> сцена, на которую переходим
+SCENE_ROUTES = {"battle": "battle", "settings": "settings", "back_to_menu": "menu",
+                "overworld": "overworld", "portal": "battle"}
+
+# Профайлер кадра: включается сразу или клавишей F3 (вместе с оверлеем)
+PROFILER_MODE = False
+PROFILER_KEY = pygame.K_F3
+PROFILE_DUMP = "profile"  # при выходе пишутся profile.csv и profile.json
+
+MORTY_ATLAS_IMAGE = "assets/images/morty/atlas.png"
+# Манифест asset_pipeline.py; если сборки нет, картинки грузятся из assets/
+ASSET_MANIFEST = "build/assets/manifest.json"
+
+
+def show_splash():
+    """Заставка, пока картинки декодируются в фоновом потоке"""
+    logo_image = assets.scaled(SPLASH_IMAGE, SPLASH_SCALE, window_scale)
+    logo_rect = logo_image.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2))
+    bar = pygame.Rect(0, 0, int(600 * window_scale), int(12 * window_scale))
+    bar.midtop = (SCREEN_WIDTH // 2, logo_rect.bottom + int(40 * window_scale))
+    splash_clock = pygame.time.Clock()
+
+    while not assets.done():
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                sys.exit()
+
+        assets.poll()
+        screen.fill(BLACK)
+        screen.blit(logo_image, logo_rect)
+        pygame.draw.rect(screen, WHITE, bar, 1)
+        filled = bar.copy()
+        filled.width = int(bar.width * assets.progress())
+        screen.fill(WHITE, filled)
+        pygame.display.flip()
+        splash_clock.tick(60)
+
+
+def level_frame(level_image, factor, center):
+    """Кадр из варианта level_image, уменьшенного в factor раз (1 - сам вариант)"""
+    size = (int(level_image.get_width() * factor), int(level_image.get_height() * factor))
+    image = level_image if size == level_image.get_size() else pygame.transform.scale(level_image, size)
+    return image, image.get_rect(center=center)
+
 
 class AnimatedButton:
-    def __init__(self, x, y, scale, image_path, text="", text_scale=1, offset_x=0, offset_y=0, is_special=False):
+    # верхняя граница pulse_scale: кадры пульсации уменьшаются из варианта этого масштаба
+    PULSE_TOP = BUTTON_PULSE_TOP
+
+    def __init__(self, x, y, scale, image_path, text="", text_scale=1, offset_x=0, offset_y=0, is_special=False,
+                 cache_frames=FRAME_CACHE_MODE, pulse_steps=16):
         self.x = x
         self.y = y
         self.scale = scale
@@ -33,42 +129,67 @@ class AnimatedButton:
         self.offset_y = offset_y
         self.is_special = is_special
 
-        self.original_image = pygame.image.load(image_path).convert_alpha()
-        self.image = self.original_image
+        # в памяти только вариант под текущее окно, оригинал не хранится
+        self.image_path = image_path
+        self.level_scale = self.scale if is_special else self.scale * self.PULSE_TOP
+        self.level_image = assets.scaled(image_path, self.level_scale, window_scale)
+        self.image = self.level_image
         self.rect = self.image.get_rect(center=(x, y))
 
         self.pulse_min = 0.95
         self.pulse_max = 1.05
         self.pulse_time = 0
+        self.prev_pulse_time = 0
         self.pulse_duration = 2000  # мс
 
+        self.frame_cache = None
+        if cache_frames and not is_special:
+            self.frame_cache = FrameCache(self.level_image, pulse_steps=pulse_steps, max_frames=pulse_steps)
+            self.frame_cache.prebake(self.center(), self.level_factor)
+
         self.apply_scale()
 
+    def center(self):
+        return self.x * window_scale, self.y * window_scale
+
+    def pulse_scale(self, progress):
+        return self.pulse_min + (self.pulse_max - self.pulse_min) * math.sin(
+            progress * math.pi * 2) * 0.5 + 0.5
+
+    def frame_scale(self, progress):
+        """Итоговый масштаб картинки для фазы пульсации"""
+        return self.scale * self.pulse_scale(progress) * window_scale
+
+    def level_factor(self, progress):
+        """Масштаб кадра относительно level_image"""
+        return self.frame_scale(progress) / (self.level_scale * window_scale)
+
     def apply_scale(self):
-        width = int(self.original_image.get_width() * self.scale * window_scale)
-        height = int(self.original_image.get_height() * self.scale * window_scale)
-        self.image = pygame.transform.scale(self.original_image, (width, height))
-        self.rect = self.image.get_rect(center=(self.x * window_scale, self.y * window_scale))
+        self.image, self.rect = level_frame(self.level_image, self.scale / self.level_scale, self.center())
 
     def update(self, dt):
         if not self.is_special:
+            self.prev_pulse_time = self.pulse_time
             self.pulse_time = (self.pulse_time + dt) % self.pulse_duration
-            progress = self.pulse_time / self.pulse_duration
 
-            pulse_scale = self.pulse_min + (self.pulse_max - self.pulse_min) * math.sin(
-                progress * math.pi * 2) * 0.5 + 0.5
+    def interpolate(self, alpha):
+        """Выбирает кадр для отрисовки между двумя последними шагами логики"""
+        if not self.is_special:
+            step = (self.pulse_time - self.prev_pulse_time) % self.pulse_duration
+            progress = (lerp(self.prev_pulse_time, self.prev_pulse_time + step, alpha) %
+                        self.pulse_duration) / self.pulse_duration
+
+            if self.frame_cache:
+                self.image, self.rect = self.frame_cache.get(self.center(), self.level_factor, progress)
+                return
 
-            current_scale = self.scale * pulse_scale
-            width = int(self.original_image.get_width() * current_scale * window_scale)
-            height = int(self.original_image.get_height() * current_scale * window_scale)
-            self.image = pygame.transform.scale(self.original_image, (width, height))
-            self.rect = self.image.get_rect(center=(self.x * window_scale, self.y * window_scale))
+            self.image, self.rect = level_frame(self.level_image, self.level_factor(progress), self.center())
 
     def draw(self, surface):
         surface.blit(self.image, self.rect)
 
         if self.text:
-            font = pygame.font.SysFont('comicsansms', int(24 * self.text_scale * window_scale))
+            font = get_font('comicsansms', int(24 * self.text_scale * window_scale))
             text_surface = font.render(self.text, True, (0, 0, 0))
             text_rect = text_surface.get_rect(center=(
                 self.rect.centerx + self.offset_x * window_scale,
@@ -81,41 +202,68 @@ class AnimatedButton:
 
 
 class AnimatedBackground:
-    def __init__(self, x, y, scale, image_path, rotation_speed=0.1, pulse_speed=0.001):
+    # верхняя граница пульсации (1 + 0.02 * sin)
+    PULSE_TOP = BACKGROUND_PULSE_TOP
+
+    def __init__(self, x, y, scale, image_path, rotation_speed=0.1, pulses_per_turn=1,
+                 cache_frames=FRAME_CACHE_MODE, pulse_steps=16, angle_step=1.5, detail=1.0, prebake=False):
         self.x = x
         self.y = y
         self.scale = scale
         self.rotation_speed = rotation_speed
-        self.pulse_speed = pulse_speed
+        # пульсация привязана к повороту: кадр зависит только от угла
+        self.pulses_per_turn = pulses_per_turn
 
-        self.original_image = pygame.image.load(image_path).convert_alpha()
-        self.image = self.original_image
+        self.image_path = image_path
+        self.level_scale = self.scale * self.PULSE_TOP
+        self.level_image = assets.scaled(image_path, self.level_scale, window_scale)
+        self.image = self.level_image
         self.rect = self.image.get_rect(center=(x, y))
 
         self.rotation_angle = 0
-        self.pulse_value = 0
+        self.prev_rotation_angle = 0
+
+        # кэш вмещает полный оборот; кадры режутся по экрану (спираль сильно больше окна)
+        self.frame_cache = None
+        if cache_frames:
+            self.frame_cache = FrameCache(self.level_image, pulse_steps=pulse_steps, angle_step=angle_step,
+                                          clip_rect=screen.get_rect(), detail=detail,
+                                          pulses_per_turn=pulses_per_turn)
+            if prebake:
+                self.frame_cache.prebake(self.center(), self.level_factor)
 
         self.apply_scale()
 
+    def center(self):
+        return self.x * window_scale, self.y * window_scale
+
+    def frame_scale(self, phase):
+        """Итоговый масштаб картинки для фазы пульсации (0..1)"""
+        return self.scale * (1 + 0.02 * math.sin(phase * math.pi * 2)) * window_scale
+
+    def level_factor(self, phase):
+        """Масштаб кадра относительно level_image"""
+        return self.frame_scale(phase) / (self.level_scale * window_scale)
+
     def apply_scale(self):
-        width = int(self.original_image.get_width() * self.scale * window_scale)
-        height = int(self.original_image.get_height() * self.scale * window_scale)
-        self.image = pygame.transform.scale(self.original_image, (width, height))
-        self.rect = self.image.get_rect(center=(self.x * window_scale, self.y * window_scale))
+        self.image, self.rect = level_frame(self.level_image, self.scale / self.level_scale, self.center())
 
     def update(self, dt):
+        self.prev_rotation_angle = self.rotation_angle
         self.rotation_angle -= self.rotation_speed * dt
 
-        self.pulse_value += self.pulse_speed * dt
-        pulse_scale = 1 + 0.02 * math.sin(self.pulse_value)
+    def interpolate(self, alpha):
+        """Выбирает кадр для отрисовки между двумя последними шагами логики"""
+        rotation_angle = lerp(self.prev_rotation_angle, self.rotation_angle, alpha)
+        phase = (rotation_angle / 360 * self.pulses_per_turn) % 1
+        if self.frame_cache:
+            self.image, self.rect = self.frame_cache.get(self.center(), self.level_factor, phase,
+                                                         rotation_angle)
+            return
 
-        current_scale = self.scale * pulse_scale
-        width = int(self.original_image.get_width() * current_scale * window_scale)
-        height = int(self.original_image.get_height() * current_scale * window_scale)
-
-        scaled_image = pygame.transform.scale(self.original_image, (width, height))
-        self.image = pygame.transform.rotate(scaled_image, self.rotation_angle)
-        self.rect = self.image.get_rect(center=(self.x * window_scale, self.y * window_scale))
+        scaled_image, _ = level_frame(self.level_image, self.level_factor(phase), self.center())
+        self.image = pygame.transform.rotate(scaled_image, rotation_angle)
+        self.rect = self.image.get_rect(center=self.center())
 
     def draw(self, surface):
         surface.blit(self.image, self.rect)
@@ -127,24 +275,30 @@ class StaticImage:
         self.y = y
         self.scale = scale
 
-        self.original_image = pygame.image.load(image_path).convert_alpha()
-        self.image = self.original_image
-        self.rect = self.image.get_rect(center=(x, y))
-
+        self.image_path = image_path
         self.apply_scale()
 
     def apply_scale(self):
-        width = int(self.original_image.get_width() * self.scale * window_scale)
-        height = int(self.original_image.get_height() * self.scale * window_scale)
-        self.image = pygame.transform.scale(self.original_image, (width, height))
+        self.image = assets.scaled(self.image_path, self.scale, window_scale)
         self.rect = self.image.get_rect(center=(self.x * window_scale, self.y * window_scale))
 
     def draw(self, surface):
         surface.blit(self.image, self.rect)
 
 
-fone = AnimatedBackground(960, 594, 1.8, "assets/images/menu/blueSpiral.png", rotation_speed=0.05)
-portal = AnimatedBackground(960, 594, 1.5, "assets/images/menu/portal.png", rotation_speed=0.1, pulse_speed=0.005)
+# варианты картинок меню (MENU_VARIANTS) собираются asset_pipeline.py под те же масштабы
+assets.load_manifest(ASSET_MANIFEST)
+assets.preload_scaled([(path, scale, window_scale) for path, scale in MENU_VARIANTS])
+# кадры ходьбы Морти для overworld: весь цикл - один лист атласа (собирается atlas.py)
+assets.preload([MORTY_ATLAS_IMAGE])
+show_splash()
+
+# полный оборот каждого фона лежит в кэше; чтобы он поместился в память киоска, размытая
+# спираль хранится в половинном разрешении, а портал - в 3/4 и с шагом 3 градуса
+fone = AnimatedBackground(960, 594, 1.8, "assets/images/menu/blueSpiral.png", rotation_speed=0.05,
+                          angle_step=2, detail=0.5)
+portal = AnimatedBackground(960, 594, 1.5, "assets/images/menu/portal.png", rotation_speed=0.1,
+                            pulses_per_turn=3, angle_step=3, detail=0.75)
 morty = StaticImage(960, 648, 2, "assets/images/menu/mortyPose.png")
 play_button = AnimatedButton(960, 756, 1.2, "assets/images/menu/playBtnUp.png", "")
 settings_button = AnimatedButton(1632, 1004, 1.5, "assets/images/menu/settingBtnUp.png", "", is_special=True)
@@ -152,92 +306,138 @@ logo = AnimatedButton(960, 162, 1.5, "assets/images/menu/logo.png", is_special=T
 
 drawable_objects = [fone, portal, morty, play_button, settings_button, logo]
 
-transition_alpha = 0
-transition_speed = 8
-transition_state = "none"
-next_scene = None
-current_scene = "menu"
-battle_instance = None
-
-clock = pygame.time.Clock()
-running = True
-
-while running:
-    dt = clock.tick(60)
-
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-
-        elif event.type == pygame.MOUSEBUTTONDOWN:
-            if event.button == 1:
-                mouse_pos = pygame.mouse.get_pos()
-
-                if current_scene == "menu":
-                    if play_button.is_clicked(mouse_pos):
-                        transition_state = "fade_out"
-                        next_scene = "battle"
-                    elif settings_button.is_clicked(mouse_pos):
-                        transition_state = "fade_out"
-                        next_scene = "settings"
-
-                elif current_scene == "battle" and battle_instance:
-                    result = battle_instance.handle_event(event)
-                    if result == "back_to_menu":
-                        transition_state = "fade_out"
-                        next_scene = "menu"
-
-        elif event.type == pygame.KEYDOWN:
-            if current_scene == "battle" and battle_instance:
-                result = battle_instance.handle_event(event)
-                if result == "back_to_menu":
-                    transition_state = "fade_out"
-                    next_scene = "menu"
-
-    # Обновление объектов
-    if current_scene == "menu":
-        for obj in drawable_objects:
-            if hasattr(obj, 'update'):
-                obj.update(dt)
-    elif current_scene == "battle" and battle_instance:
-        battle_instance.update(dt)
-
-    # переход между сценами
-    if transition_state == "fade_out":
-        transition_alpha += transition_speed
-        if transition_alpha >= 255:
-            transition_alpha = 255
-            transition_state = "fade_in"
-
-            if next_scene == "battle":
-                battle_instance = MortyBattle(screen)
-                current_scene = "battle"
-            elif next_scene == "menu":
-                current_scene = "menu"
-                battle_instance = None
-
-    elif transition_state == "fade_in":
-        transition_alpha -= transition_speed
-        if transition_alpha <= 0:
-            transition_alpha = 0
-            transition_state = "none"
-
-    if current_scene == "menu":
-        screen.fill(WHITE)
-        for obj in drawable_objects:
-            obj.draw(screen)
 
-    elif current_scene == "battle" and battle_instance:
-        battle_instance.draw()
+class MenuScene:
+    """Главное меню: анимированные объекты и кнопки перехода"""
+
+    def __init__(self, objects):
+        self.objects = objects
 
-    #  переход поверх всего
-    if transition_alpha > 0:
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-        overlay.fill(BLACK)
-        overlay.set_alpha(transition_alpha)
-        screen.blit(overlay, (0, 0))
+    def handle_event(self, event):
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            mouse_pos = pygame.mouse.get_pos()
+            if play_button.is_clicked(mouse_pos):
+                return "battle"
+            elif settings_button.is_clicked(mouse_pos):
+                return "settings"
+        elif event.type == pygame.KEYDOWN and event.key == OVERWORLD_KEY:
+            return "overworld"
+        return None
+
+    def update(self, dt):
+        for obj in self.objects:
+            if hasattr(obj, 'update'):
+                obj.update(dt)
 
-    pygame.display.flip()
+    def interpolate(self, alpha):
+        # кадры выбираются между двумя последними шагами логики
+        for obj in self.objects:
+            if hasattr(obj, 'interpolate'):
+                obj.interpolate(alpha)
 
-pygame.quit()
-sys.exit()
\ No newline at end of file
+    def draw(self):
+        screen.fill(WHITE)
+        for obj in self.objects:
+            obj.draw(screen)
+        return None
+
+
+if __name__ == "__main__":
+    clock = pygame.time.Clock()
+    timestep = FixedTimestep(1000 / SIMULATION_HZ, MAX_STEPS_PER_FRAME)
+    profiler = FrameProfiler(PROFILER_MODE)
+
+    recorders = []
+
+    def create_battle():
+        with profiler.section("battle.create"):
+            # для записи нужен известный сид
+            seed = random.randrange(2 ** 32) if REPLAY_DIR else None
+            battle = MortyBattle(screen, seed=seed, enemy_policy=POLICIES.get(ENEMY_POLICY),
+                                 sprite_art=MORTY_SPRITE_ART, layout=BATTLE_LAYOUT)
+            if BATTLE_SERVER:
+                battle = NetworkBattle(battle, ClientThread(*BATTLE_SERVER))
+            elif REPLAY_DIR:
+                recorders.append(ReplayRecorder(battle.engine))
+            return profiler.instrument(battle, group="battle")
+
+    def create_overworld():
+        with profiler.section("overworld.create"):
+            if OVERWORLD_MAP and OVERWORLD_MAP.endswith(CHUNK_EXT):
+                world = ChunkedWorld(OVERWORLD_MAP)
+            elif OVERWORLD_MAP:
+                world = GridWorld.load(OVERWORLD_MAP)
+            else:
+                world = generate(OVERWORLD_SIZE, OVERWORLD_SIZE, OVERWORLD_OBJECTS)
+            scene = OverworldScene(screen, world, Atlas.load(assets=assets))
+            return profiler.instrument(scene, group="overworld")
+
+    # сцены создаются при первом входе и потом сохраняются: возврат в них мгновенный
+    scenes = SceneManager(screen, {"menu": lambda: MenuScene(drawable_objects), "battle": create_battle,
+                                   "overworld": create_overworld},
+                          SCENE_ROUTES, SCENE_TRANSITION)
+    scenes.start("menu")
+    running = True
+
+    while running:
+        dt = clock.tick(RENDER_FPS)
+        profiler.begin_frame()
+
+        with profiler.section("events"):
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    running = False
+
+                elif event.type == pygame.MOUSEBUTTONDOWN:
+                    if event.button == 1:
+                        scenes.handle_event(event)
+
+                elif event.type == pygame.KEYDOWN:
+                    if event.key == PROFILER_KEY:
+                        profiler.toggle()
+                    else:
+                        scenes.handle_event(event)
+
+                elif event.type == pygame.KEYUP:
+                    # отпускание нужно overworld: персонаж идет, пока клавиша нажата
+                    scenes.handle_event(event)
+
+        # Обновление логики фиксированными шагами
+        for _ in range(timestep.advance(dt)):
+            with profiler.section("update." + scenes.current_name):
+                scenes.update(timestep.step)
+
+        with profiler.section("interpolate." + scenes.current_name):
+            scenes.interpolate(timestep.alpha())
+
+        with profiler.section("draw." + scenes.current_name):
+            dirty_rects = scenes.draw()
+
+        # оверлей профайлера рисуется поверх сцены: экран обновляется целиком,
+        # а следующий кадр сцена перерисует полностью, чтобы стереть оверлей
+        if profiler.draw(screen):
+            dirty_rects = None
+            scenes.screen_dirty = True
+
+        with profiler.section("display"):
+            if dirty_rects is not None:
+                # в бою обновляем только изменившиеся области
+                if dirty_rects:
+                    pygame.display.update(dirty_rects)
+            else:
+                pygame.display.flip()
+
+        profiler.end_frame()
+
+    if profiler.frame_count:
+        for path in profiler.dump(PROFILE_DUMP):
+            print(path)
+
+    for i, recorder in enumerate(recorders):
+        if recorder.replay.rounds:
+            path = os.path.join(REPLAY_DIR, time.strftime("battle-%Y%m%d-%H%M%S") + f"-{i}.mrpl")
+            recorder.replay.save(path)
+            print(path)
+
+    pygame.quit()
+    sys.exit()
\ No newline at end of file
@@ -0,0 +1,346 @@
+import argparse
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+from overworld import (BLOCKED, CELL_TYPES, EMPTY, OBJECT_TYPES, WALKABLE, GridWorld, SpatialHash,
+                       WorldObject, generate)
+
+
+MAGIC = b"MCHK"
+VERSION = 1
+# заголовок: версия, размер чанка, ширина и высота карты, старт (-1 - нет), число объектов
+HEADER = struct.Struct("<BHIIiiI")
+# запись оглавления на чанк: смещение и длина сжатых данных (0 - пустой чанк)
+INDEX_DTYPE = np.dtype([("offset", "<u8"), ("length", "<u4")])
+# объект в чанке: тип (индекс в OBJECT_TYPES), x и z внутри чанка
+OBJECT_RECORD = struct.Struct("<BBB")
+
+CHUNK_EXT = ".mchk"
+OBJECT_KINDS = list(OBJECT_TYPES)
+# объект хранится в чанке своей левой верхней клетки и может заходить в соседние справа и снизу
+MAX_OBJECT_SPAN = max(max(config["width"], config["depth"]) for config in OBJECT_TYPES.values()) - 1
+
+
+class Chunk:
+    """Загруженный чанк: клетки (numpy) и объекты в своем хэше"""
+
+    __slots__ = ("cx", "cz", "tiles", "objects")
+
+    def __init__(self, cx, cz, tiles, objects):
+        self.cx = cx
+        self.cz = cz
+        self.tiles = tiles
+        self.objects = objects
+
+
+def pack_chunk(tiles, objects, x0, z0):
+    """Сжатые данные чанка; пустой чанк (только пустые клетки, без объектов) - b\"\""""
+    if not objects and not tiles.any():
+        return b""
+    data = bytearray(tiles.tobytes())
+    data += struct.pack("<H", len(objects))
+    for obj in objects:
+        data += OBJECT_RECORD.pack(OBJECT_KINDS.index(obj.kind), obj.x - x0, obj.z - z0)
+    return zlib.compress(bytes(data))
+
+
+def save(world, path, chunk_size=16):
+    """Пишет GridWorld в файл чанков"""
+    if not 1 <= chunk_size <= 256:
+        raise ValueError(f"размер чанка должен быть от 1 до 256: {chunk_size}")
+    chunks_x = -(-world.width // chunk_size)
+    chunks_z = -(-world.height // chunk_size)
+    index = np.zeros(chunks_x * chunks_z, INDEX_DTYPE)
+    payloads = []
+    offset = 4 + HEADER.size + index.nbytes
+    for cx in range(chunks_x):
+        for cz in range(chunks_z):
+            x0, z0 = cx * chunk_size, cz * chunk_size
+            # края карты добиваются пустыми клетками до полного чанка
+            tiles = np.full((chunk_size, chunk_size), EMPTY, np.uint8)
+            part = world.tiles[x0:x0 + chunk_size, z0:z0 + chunk_size]
+            tiles[:part.shape[0], :part.shape[1]] = part
+            objects = [obj for obj in world.objects.query(x0, z0, chunk_size, chunk_size)
+                       if obj.x >= x0 and obj.z >= z0]
+            payload = pack_chunk(tiles, objects, x0, z0)
+            index[cx * chunks_z + cz] = (offset if payload else 0, len(payload))
+            offset += len(payload)
+            payloads.append(payload)
+
+    start = world.start if world.start is not None else (-1, -1)
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(HEADER.pack(VERSION, chunk_size, world.width, world.height, start[0], start[1],
+                            len(world.objects)))
+        f.write(index.tobytes())
+        for payload in payloads:
+            f.write(payload)
+
+
+class ChunkFile:
+    """Файл чанков: заголовок и оглавление в памяти, сами чанки читаются по одному"""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        # чтение идет и из фонового потока, и из основного (если чанк нужен сразу)
+        self.lock = threading.Lock()
+        if self.file.read(4) != MAGIC:
+            self.file.close()
+            raise ValueError(f"это не файл чанков: {path}")
+        (version, self.chunk_size, self.width, self.height, start_x, start_z,
+         self.object_count) = HEADER.unpack(self.file.read(HEADER.size))
+        if version != VERSION:
+            self.file.close()
+            raise ValueError(f"неподдерживаемая версия файла чанков: {version}")
+        self.start = (start_x, start_z) if start_x >= 0 else None
+        self.chunks_x = -(-self.width // self.chunk_size)
+        self.chunks_z = -(-self.height // self.chunk_size)
+        self.index = np.frombuffer(self.file.read(self.chunks_x * self.chunks_z * INDEX_DTYPE.itemsize),
+                                   INDEX_DTYPE)
+
+    def read(self, cx, cz):
+        size = self.chunk_size
+        offset, length = self.index[cx * self.chunks_z + cz]
+        x0, z0 = cx * size, cz * size
+        # у крайних чанков отрезаем добивку за краем карты
+        width, height = min(size, self.width - x0), min(size, self.height - z0)
+        objects = SpatialHash()
+        if not length:
+            return Chunk(cx, cz, np.zeros((width, height), np.uint8), objects)
+        with self.lock:
+            self.file.seek(int(offset))
+            data = zlib.decompress(self.file.read(int(length)))
+        tiles = np.frombuffer(data, np.uint8, size * size).reshape(size, size)[:width, :height]
+        if tiles.max() >= len(CELL_TYPES):
+            raise ValueError(f"неизвестный тип клетки в чанке ({cx}, {cz})")
+        count, = struct.unpack_from("<H", data, size * size)
+        position = size * size + 2
+        for _ in range(count):
+            kind, x, z = OBJECT_RECORD.unpack_from(data, position)
+            position += OBJECT_RECORD.size
+            objects.insert(WorldObject(OBJECT_KINDS[kind], x0 + x, z0 + z))
+        return Chunk(cx, cz, tiles, objects)
+
+    def close(self):
+        self.file.close()
+
+
+class ChunkedObjects:
+    """Поиск объектов по чанкам: тот же query, что у SpatialHash в GridWorld"""
+
+    def __init__(self, world):
+        self.world = world
+
+    def query(self, x, z, width=1, depth=1):
+        world = self.world
+        size = world.chunk_size
+        # объекты из чанков левее и выше могут заходить в область
+        cx0 = max(0, (x - MAX_OBJECT_SPAN) // size)
+        cz0 = max(0, (z - MAX_OBJECT_SPAN) // size)
+        cx1 = min(world.chunks_x, (x + width - 1) // size + 1)
+        cz1 = min(world.chunks_z, (z + depth - 1) // size + 1)
+        found = []
+        for cx in range(cx0, cx1):
+            for cz in range(cz0, cz1):
+                found.extend(world.chunk(cx, cz).objects.query(x, z, width, depth))
+        return found
+
+    def __len__(self):
+        return self.world.file.object_count
+
+
+class ChunkedWorld:
+    """Мир из файла чанков: чанки грузятся по мере надобности и выбрасываются по LRU
+
+    prefetch() ставит чанки в очередь фонового потока, poll() в основном потоке
+    переносит готовые в кэш. Если чанк нужен сразу (проверка хода, отрисовка),
+    а его еще нет, он читается синхронно. В памяти не больше cache_chunks
+    чанков, сколько бы их ни было в файле. Интерфейс для OverworldScene тот же,
+    что у GridWorld (без редактирования).
+    """
+
+    def __init__(self, path, cache_chunks=256):
+        self.file = ChunkFile(path)
+        self.width = self.file.width
+        self.height = self.file.height
+        self.chunk_size = self.file.chunk_size
+        self.chunks_x = self.file.chunks_x
+        self.chunks_z = self.file.chunks_z
+        self.start = self.file.start
+        self.cache_chunks = cache_chunks
+        self.chunks = OrderedDict()
+        self.objects = ChunkedObjects(self)
+
+        self.requests = queue.Queue()
+        self.loaded = queue.Queue()
+        self.pending = set()
+        self.thread = None
+        self.sync_loads = 0
+        self.async_loads = 0
+
+    def chunk(self, cx, cz):
+        """Чанк из кэша; если его еще нет - читается сразу"""
+        chunk = self.chunks.get((cx, cz))
+        if chunk is not None:
+            self.chunks.move_to_end((cx, cz))
+            return chunk
+        chunk = self.file.read(cx, cz)
+        self.sync_loads += 1
+        self.store(chunk)
+        return chunk
+
+    def store(self, chunk):
+        self.chunks[(chunk.cx, chunk.cz)] = chunk
+        while len(self.chunks) > self.cache_chunks:
+            self.chunks.popitem(last=False)
+
+    def prefetch(self, cx0, cz0, cx1, cz1):
+        """Ставит в фоновую загрузку чанки области, которых нет в кэше"""
+        for cx in range(max(0, cx0), min(self.chunks_x, cx1)):
+            for cz in range(max(0, cz0), min(self.chunks_z, cz1)):
+                key = (cx, cz)
+                if key in self.chunks:
+                    self.chunks.move_to_end(key)
+                elif key not in self.pending:
+                    self.pending.add(key)
+                    self.requests.put(key)
+        if self.pending and self.thread is None:
+            self.thread = threading.Thread(target=self.load_loop, daemon=True)
+            self.thread.start()
+
+    def load_loop(self):
+        while True:
+            key = self.requests.get()
+            if key is None:
+                return
+            try:
+                self.loaded.put((key, self.file.read(*key), None))
+            except (OSError, ValueError, zlib.error) as error:
+                self.loaded.put((key, None, error))
+
+    def poll(self):
+        """Переносит загруженные в фоне чанки в кэш (основной поток); возвращает новые чанки"""
+        fresh = []
+        while True:
+            try:
+                key, chunk, error = self.loaded.get_nowait()
+            except queue.Empty:
+                break
+            self.pending.discard(key)
+            if error is not None:
+                raise ValueError(f"не удалось прочитать чанк {key} из {self.file.path}: {error}")
+            if key not in self.chunks:
+                self.store(chunk)
+                self.async_loads += 1
+                fresh.append(chunk)
+        return fresh
+
+    def close(self):
+        if self.thread is not None:
+            self.requests.put(None)
+            self.thread.join()
+            self.thread = None
+        self.file.close()
+
+    def in_bounds(self, x, z):
+        return 0 <= x < self.width and 0 <= z < self.height
+
+    def tile(self, x, z):
+        size = self.chunk_size
+        return self.chunk(x // size, z // size).tiles[x % size, z % size]
+
+    def cell_type(self, x, z):
+        if not self.in_bounds(x, z):
+            return "empty"
+        return CELL_TYPES[self.tile(x, z)]
+
+    def object_at(self, x, z):
+        found = self.objects.query(x, z)
+        return found[0] if found else None
+
+    def can_move_to(self, x, z):
+        if not self.in_bounds(x, z) or self.tile(x, z) not in (WALKABLE, BLOCKED):
+            return False
+        return not any(obj.solid for obj in self.objects.query(x, z))
+
+    def is_portal(self, x, z):
+        return self.in_bounds(x, z) and self.tile(x, z) == BLOCKED
+
+    def start_cell(self):
+        """Стартовая клетка из файла; без нее - первая проходимая клетка по чанкам"""
+        if self.start is not None:
+            return self.start
+        for cx in range(self.chunks_x):
+            for cz in range(self.chunks_z):
+                chunk = self.chunk(cx, cz)
+                for x, z in zip(*np.nonzero(chunk.tiles == WALKABLE)):
+                    x, z = int(x) + cx * self.chunk_size, int(z) + cz * self.chunk_size
+                    if self.can_move_to(x, z):
+                        return x, z
+        raise ValueError("На карте нет проходимых клеток")
+
+
+def load(path, **kwargs):
+    return ChunkedWorld(path, **kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Карты overworld по чанкам: упаковка, генерация, проверка")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    pack_parser = sub.add_parser("pack", help="упаковать JSON-карту (overworld.py или редактор) в чанки")
+    pack_parser.add_argument("source")
+    pack_parser.add_argument("out")
+    pack_parser.add_argument("--chunk-size", type=int, default=16)
+
+    generate_parser = sub.add_parser("generate", help="сгенерировать случайную карту сразу в чанки")
+    generate_parser.add_argument("out")
+    generate_parser.add_argument("--size", type=int, default=1024, help="сторона карты в клетках")
+    generate_parser.add_argument("--objects", type=int, default=80000)
+    generate_parser.add_argument("--seed", type=int, default=None)
+    generate_parser.add_argument("--chunk-size", type=int, default=16)
+
+    info_parser = sub.add_parser("info", help="заголовок и проход по всем чанкам")
+    info_parser.add_argument("path")
+    args = parser.parse_args()
+
+    if args.command in ("pack", "generate"):
+        start = time.perf_counter()
+        if args.command == "pack":
+            world = GridWorld.load(args.source)
+        else:
+            world = generate(args.size, args.size, args.objects, args.seed)
+        save(world, args.out, args.chunk_size)
+        elapsed = time.perf_counter() - start
+        print(f"{args.out}: {world.width}x{world.height}, объектов {len(world.objects)}, "
+              f"{os.path.getsize(args.out)} байт за {elapsed:.2f} с")
+        return 0
+
+    world = ChunkedWorld(args.path, cache_chunks=1)
+    start = time.perf_counter()
+    empty = objects = 0
+    for cx in range(world.chunks_x):
+        for cz in range(world.chunks_z):
+            chunk = world.chunk(cx, cz)
+            empty += not chunk.tiles.any()
+            objects += len(chunk.objects)
+    elapsed = time.perf_counter() - start
+    total = world.chunks_x * world.chunks_z
+    print(f"{args.path}: {world.width}x{world.height}, чанки {world.chunk_size}x{world.chunk_size} "
+          f"({world.chunks_x}x{world.chunks_z}, пустых {empty}), объектов {objects}, старт {world.start}")
+    print(f"чтение всех чанков: {elapsed:.2f} с, {elapsed / total * 1000:.3f} мс на чанк")
+    world.close()
+    return 0 if objects == len(world.objects) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
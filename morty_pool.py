@@ -0,0 +1,93 @@
+import numpy as np
+
+from battle_engine import TYPE_CODES, TYPE_NAMES, Morty
+
+
+class MortyPool:
+    """Много Морти в типизированных массивах (структура массивов) с векторными операциями"""
+
+    def __init__(self, capacity=1024):
+        self.size = 0
+        self.level = np.zeros(capacity, dtype=np.int16)
+        self.hp = np.zeros(capacity, dtype=np.int32)
+        self.max_hp = np.zeros(capacity, dtype=np.int32)
+        self.base_max_hp = np.zeros(capacity, dtype=np.int32)
+        self.base_level = np.zeros(capacity, dtype=np.int16)
+        self.type_code = np.zeros(capacity, dtype=np.int8)
+        self.is_player = np.zeros(capacity, dtype=bool)
+
+    FIELDS = ("level", "hp", "max_hp", "base_max_hp", "base_level", "type_code", "is_player")
+
+    def __len__(self):
+        return self.size
+
+    def reserve(self, capacity):
+        """Увеличивает емкость массивов (с запасом в два раза)"""
+        if capacity <= len(self.level):
+            return
+        capacity = max(capacity, len(self.level) * 2)
+        for field in self.FIELDS:
+            old = getattr(self, field)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, field, new)
+
+    def add(self, level, max_hp, morty_type, count=1, is_player=False):
+        """Добавляет count одинаковых Морти, возвращает их индексы"""
+        start = self.size
+        end = start + count
+        self.reserve(end)
+        self.level[start:end] = level
+        self.hp[start:end] = max_hp
+        self.max_hp[start:end] = max_hp
+        self.base_max_hp[start:end] = max_hp
+        self.base_level[start:end] = level
+        self.type_code[start:end] = TYPE_CODES[morty_type] if isinstance(morty_type, str) else morty_type
+        self.is_player[start:end] = is_player
+        self.size = end
+        return np.arange(start, end)
+
+    def add_morty(self, morty):
+        """Переносит обычного Морти в пул"""
+        index = self.add(morty.base_level, morty.base_max_hp, morty.type_code, is_player=morty.is_player)[0]
+        self.level[index] = morty.level
+        self.hp[index] = morty.hp
+        self.max_hp[index] = morty.max_hp
+        return index
+
+    def to_morty(self, index, name="Morty", position=(0, 0)):
+        """Собирает обычного Морти из записи пула"""
+        morty = Morty(name, int(self.base_level[index]), int(self.base_max_hp[index]),
+                      TYPE_NAMES[self.type_code[index]], position, bool(self.is_player[index]))
+        morty.level = int(self.level[index])
+        morty.hp = int(self.hp[index])
+        morty.max_hp = int(self.max_hp[index])
+        return morty
+
+    def take_damage(self, indices, damage):
+        """Векторный take_damage: возвращает маску побежденных"""
+        hp = np.maximum(0, self.hp[indices] - damage)
+        self.hp[indices] = hp
+        return hp <= 0
+
+    def heal(self, indices, amount):
+        """Векторный heal: возвращает новое HP"""
+        hp = np.minimum(self.max_hp[indices], self.hp[indices] + amount)
+        self.hp[indices] = hp
+        return hp
+
+    def level_up(self, indices):
+        """Векторный level_up: уровень +1, HP растет на 20% от базового за уровень"""
+        level = self.level[indices] + 1
+        self.level[indices] = level
+        max_hp = (self.base_max_hp[indices] * (1 + (level - self.base_level[indices]) * 0.2)).astype(np.int32)
+        self.max_hp[indices] = max_hp
+        self.hp[indices] = max_hp
+        return level
+
+    def alive(self):
+        """Индексы Морти с HP > 0"""
+        return np.nonzero(self.hp[:self.size] > 0)[0]
+
+    def nbytes(self):
+        return sum(getattr(self, field)[:self.size].nbytes for field in self.FIELDS)
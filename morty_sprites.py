@@ -0,0 +1,125 @@
+import math
+
+import pygame
+
+from render_cache import SurfaceCache
+
+
+BLACK = (0, 0, 0)
+HURT_COLORS = ((255, 200, 200), (255, 100, 100))
+HEAL_COLOR = (100, 255, 100)
+
+EXPRESSIONS = ("idle", "attacking", "hurt", "healing")
+
+# общий период синусов анимации атаки (0.2, 0.3 и 0.4 рад/мс), мс
+ATTACK_PERIOD = 2 * math.pi / 0.1
+# мигание при уроне: смена цвета каждые 50 мс
+HURT_BLINK = 50
+
+MORTY_ART = {
+    "front": "assets/images/morty/Add/front.png",
+    "back": "assets/images/morty/Add/back.png",
+}
+
+
+class MortySprites:
+    """Заранее отрисованные кадры Морти: (цвет, выражение, фаза) -> поверхность
+
+    Каждая комбинация рисуется один раз, дальше Морти выводится одним blit.
+    Фаза атаки квантуется на phases шагов за период анимации. С art
+    (поверхности "front"/"back") вместо векторного Морти берется картинка,
+    подкрашенная цветом типа.
+    """
+
+    def __init__(self, size, phases=16, art=None, max_frames=256):
+        self.size = size
+        self.phases = max(1, phases)
+        self.art = art
+        # запас на раздувание при атаке и сдвиг глаз
+        self.radius = int(size) + 6
+        self.frames = SurfaceCache(max_frames)
+
+    @classmethod
+    def with_art(cls, size, assets, **kwargs):
+        """Кэш на картинках из MORTY_ART (вид спереди - враг, сзади - игрок)"""
+        art = {view: assets.image(path) for view, path in MORTY_ART.items()}
+        return cls(size, art=art, **kwargs)
+
+    def key(self, color, attacking=False, hurt=False, healing=False, timer=0, view="front"):
+        """Ключ кадра; одинаковые ключи дают одинаковую картинку"""
+        if hurt:
+            color = HURT_COLORS[int(timer / HURT_BLINK) % 2]
+        elif healing:
+            color = HEAL_COLOR
+        phase = int(timer % ATTACK_PERIOD / ATTACK_PERIOD * self.phases) if attacking else None
+        if attacking:
+            expression = "attacking"
+        elif hurt:
+            expression = "hurt"
+        elif healing:
+            expression = "healing"
+        else:
+            expression = "idle"
+        return (tuple(color), expression, phase, view if self.art else None)
+
+    def get(self, key):
+        return self.frames.get(key, lambda: self.render(*key))
+
+    def blit(self, surface, center, key):
+        """Выводит кадр по центру center; возвращает занятую область"""
+        frame = self.get(key)
+        x, y = center
+        return surface.blit(frame, (int(x) - frame.get_width() // 2, int(y) - frame.get_height() // 2))
+
+    def render(self, color, expression, phase, view):
+        if self.art:
+            return self.render_art(color, expression, phase, view)
+        return self.render_vector(color, expression, phase)
+
+    def phase_time(self, phase):
+        """Время внутри периода атаки для шага фазы"""
+        return 0 if phase is None else phase * ATTACK_PERIOD / self.phases
+
+    def render_vector(self, color, expression, phase):
+        """Морти из кругов и дуг (как раньше рисовался каждый кадр)"""
+        r = self.radius
+        frame = pygame.Surface((r * 2, r * 2), pygame.SRCALPHA)
+        size = self.size
+        x = y = r
+        timer = self.phase_time(phase)
+        attacking = expression == "attacking"
+
+        size_mod = 5 * math.sin(timer * 0.2) if attacking else 0
+        pygame.draw.circle(frame, color, (x, y), int(size + size_mod))
+
+        eye_offset = 3 * math.sin(timer * 0.3) if attacking else 0
+        eye_size = max(3, size // 10)
+        pygame.draw.circle(frame, BLACK, (int(x - size // 3 + eye_offset), int(y - size // 4)), eye_size)
+        pygame.draw.circle(frame, BLACK, (int(x + size // 3 + eye_offset), int(y - size // 4)), eye_size)
+
+        mouth_y = y + size // 4
+        if attacking:
+            mouth_y += 3 * math.sin(timer * 0.4)
+
+        if expression in ("attacking", "healing"):
+            pygame.draw.arc(frame, BLACK, (x - size // 2, mouth_y - size // 8, size, size // 2),
+                            math.pi / 6, 5 * math.pi / 6, 3)
+        elif expression == "hurt":
+            pygame.draw.ellipse(frame, BLACK, (x - size // 3, mouth_y - size // 8, size // 1.5, size // 3))
+        else:
+            pygame.draw.line(frame, BLACK, (x - size // 2, mouth_y), (x + size // 2, mouth_y), 3)
+        return frame
+
+    def render_art(self, color, expression, phase, view):
+        """Картинка Морти, вписанная в круг Морти и подкрашенная цветом"""
+        image = self.art[view]
+        size = self.size
+        if expression == "attacking":
+            size += 5 * math.sin(self.phase_time(phase) * 0.2)
+        height = int(size * 2)
+        width = max(1, int(image.get_width() * height / image.get_height()))
+        frame = pygame.transform.smoothscale(image, (width, height))
+        # смешиваем цвет с белым, чтобы картинка не становилась слишком темной
+        tint = tuple((channel + 255) // 2 for channel in color)
+        frame.fill(tint, special_flags=pygame.BLEND_RGB_MULT)
+        return frame
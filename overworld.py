@@ -0,0 +1,690 @@
+import argparse
+import json
+import math
+import random
+import sys
+import time
+
+import numpy as np
+import pygame
+
+from game_loop import lerp
+from render_cache import SurfaceCache, get_font
+
+
+# Типы клеток сетки (как в grid-system.js); код в массиве клеток - индекс в кортеже
+CELL_TYPES = ("empty", "walkable", "blocked", "water", "danger", "special")
+EMPTY, WALKABLE, BLOCKED, WATER, DANGER, SPECIAL = range(len(CELL_TYPES))
+CELL_COLORS = {
+    "walkable": 0x00ff00,
+    "blocked": 0xff0000,
+    "water": 0x0000ff,
+    "danger": 0xffff00,
+    "special": 0xff00ff,
+}
+# покраска клетки ложится поверх земли с прозрачностью, как подсветка в grid-system.js
+GROUND_COLOR = (70, 70, 70)
+CELL_OPACITY = 0.3
+GRID_LINE_COLOR = (0x44, 0x44, 0x44)
+BACKGROUND = (20, 20, 20)
+
+# Объекты из object-configs.js: ширина и глубина в клетках, высота - для объема спрайта.
+# solid - объект занимает клетки и не пускает персонажа
+OBJECT_TYPES = {
+    "tree": {"name": "Дерево", "width": 2, "depth": 2, "height": 4, "color": 0x00ff00, "solid": True},
+    "rock": {"name": "Камень", "width": 1, "depth": 1, "height": 1, "color": 0x888888, "solid": True},
+    "Ric": {"name": "Дом", "width": 4, "depth": 4, "height": 3, "color": 0xffaa00, "solid": True},
+    "portal": {"name": "Портал", "width": 1, "depth": 1, "height": 3, "color": 0x00ffff, "solid": False},
+}
+# персонаж в экспорте редактора - это только стартовая клетка
+CHARACTER_TYPES = ("character", "Персонаж")
+# доля от генерируемых объектов
+OBJECT_MIX = {"tree": 0.55, "rock": 0.35, "Ric": 0.1}
+
+PORTAL_MODEL = "assets/scenes/models/Portal.gltf"
+
+# Направления ходьбы (character-walk.js): имя -> (dx, dz, кадры атласа)
+DIRECTIONS = {
+    "up": (0, -1, "up"),
+    "down": (0, 1, "down"),
+    "left": (-1, 0, "side"),
+    "right": (1, 0, "right"),
+}
+DIRECTION_KEYS = {
+    pygame.K_UP: "up", pygame.K_w: "up",
+    pygame.K_DOWN: "down", pygame.K_s: "down",
+    pygame.K_LEFT: "left", pygame.K_a: "left",
+    pygame.K_RIGHT: "right", pygame.K_d: "right",
+}
+
+# на сколько клеток вверх (в долях клетки) спрайт поднимается на единицу высоты объекта
+LIFT_PER_HEIGHT = 0.3
+
+
+def hex_color(value):
+    return (value >> 16) & 0xff, (value >> 8) & 0xff, value & 0xff
+
+
+def shade(color, factor):
+    return tuple(min(255, int(channel * factor)) for channel in color)
+
+
+def cell_palette():
+    """Цвет клетки по коду типа: массив (типы, 3) для выборки сразу по всей видимой области"""
+    palette = np.empty((len(CELL_TYPES), 3), np.uint8)
+    for code, name in enumerate(CELL_TYPES):
+        if name in CELL_COLORS:
+            color = hex_color(CELL_COLORS[name])
+            palette[code] = [ground * (1 - CELL_OPACITY) + channel * CELL_OPACITY
+                             for ground, channel in zip(GROUND_COLOR, color)]
+        else:
+            palette[code] = GROUND_COLOR
+    return palette
+
+
+class WorldObject:
+    """Объект на сетке: левая верхняя клетка и размер в клетках"""
+
+    __slots__ = ("kind", "x", "z", "width", "depth", "height", "solid")
+
+    def __init__(self, kind, x, z):
+        config = OBJECT_TYPES[kind]
+        self.kind = kind
+        self.x = x
+        self.z = z
+        self.width = config["width"]
+        self.depth = config["depth"]
+        self.height = config["height"]
+        self.solid = config["solid"]
+
+    def overlaps(self, x, z, width, depth):
+        return (self.x < x + width and x < self.x + self.width and
+                self.z < z + depth and z < self.z + self.depth)
+
+    def to_dict(self):
+        return {"type": self.kind, "cellX": self.x, "cellZ": self.z,
+                "width": self.width, "depth": self.depth, "height": self.height}
+
+
+class SpatialHash:
+    """Равномерная сетка корзин по bucket_size клеток
+
+    Объект лежит во всех корзинах, которые задевает его прямоугольник, поэтому
+    поиск по области смотрит только корзины этой области, а не все объекты карты.
+    """
+
+    def __init__(self, bucket_size=8):
+        self.bucket_size = bucket_size
+        self.buckets = {}
+        self.count = 0
+
+    def bucket_range(self, x, z, width, depth):
+        size = self.bucket_size
+        return (range(x // size, (x + width - 1) // size + 1),
+                range(z // size, (z + depth - 1) // size + 1))
+
+    def insert(self, obj):
+        columns, rows = self.bucket_range(obj.x, obj.z, obj.width, obj.depth)
+        for bx in columns:
+            for bz in rows:
+                self.buckets.setdefault((bx, bz), []).append(obj)
+        self.count += 1
+
+    def remove(self, obj):
+        columns, rows = self.bucket_range(obj.x, obj.z, obj.width, obj.depth)
+        for bx in columns:
+            for bz in rows:
+                bucket = self.buckets[(bx, bz)]
+                bucket.remove(obj)
+                if not bucket:
+                    del self.buckets[(bx, bz)]
+        self.count -= 1
+
+    def move(self, obj, x, z):
+        """Переносит объект; корзины меняются, только если он пересек их границу"""
+        before = self.bucket_range(obj.x, obj.z, obj.width, obj.depth)
+        if before == self.bucket_range(x, z, obj.width, obj.depth):
+            obj.x, obj.z = x, z
+            return
+        self.remove(obj)
+        obj.x, obj.z = x, z
+        self.insert(obj)
+
+    def query(self, x, z, width=1, depth=1):
+        """Объекты, пересекающие область; каждый один раз, даже если лежит в нескольких корзинах"""
+        found = {}
+        columns, rows = self.bucket_range(x, z, width, depth)
+        buckets = self.buckets
+        for bx in columns:
+            for bz in rows:
+                bucket = buckets.get((bx, bz))
+                if bucket is None:
+                    continue
+                for obj in bucket:
+                    if id(obj) not in found and obj.overlaps(x, z, width, depth):
+                        found[id(obj)] = obj
+        return list(found.values())
+
+    def __iter__(self):
+        seen = set()
+        for bucket in self.buckets.values():
+            for obj in bucket:
+                if id(obj) not in seen:
+                    seen.add(id(obj))
+                    yield obj
+
+    def __len__(self):
+        return self.count
+
+
+class GridWorld:
+    """Клетки карты (numpy, код типа на клетку) и объекты в пространственном хэше"""
+
+    def __init__(self, width, height, bucket_size=8):
+        self.width = width
+        self.height = height
+        self.tiles = np.zeros((width, height), np.uint8)
+        self.objects = SpatialHash(bucket_size)
+        self.start = None
+
+    def in_bounds(self, x, z):
+        return 0 <= x < self.width and 0 <= z < self.height
+
+    def paint(self, x, z, cell_type):
+        self.tiles[x, z] = CELL_TYPES.index(cell_type)
+
+    def cell_type(self, x, z):
+        if not self.in_bounds(x, z):
+            return "empty"
+        return CELL_TYPES[self.tiles[x, z]]
+
+    def object_at(self, x, z):
+        found = self.objects.query(x, z)
+        return found[0] if found else None
+
+    def is_area_free(self, x, z, width, depth):
+        if x < 0 or z < 0 or x + width > self.width or z + depth > self.height:
+            return False
+        return not self.objects.query(x, z, width, depth)
+
+    def place(self, kind, x, z):
+        if kind not in OBJECT_TYPES:
+            raise ValueError(f"Неизвестный тип объекта: {kind}")
+        obj = WorldObject(kind, x, z)
+        if not self.is_area_free(x, z, obj.width, obj.depth):
+            raise ValueError(f"Область занята другим объектом: {kind} в ({x}, {z})")
+        self.objects.insert(obj)
+        return obj
+
+    def remove(self, obj):
+        self.objects.remove(obj)
+
+    def can_move_to(self, x, z):
+        """Как canMoveToCell: зеленая клетка или красная (портал), не занятая твердым объектом"""
+        if not self.in_bounds(x, z) or self.tiles[x, z] not in (WALKABLE, BLOCKED):
+            return False
+        return not any(obj.solid for obj in self.objects.query(x, z))
+
+    def is_portal(self, x, z):
+        return self.in_bounds(x, z) and self.tiles[x, z] == BLOCKED
+
+    def start_cell(self):
+        """Стартовая клетка персонажа; без нее - первая проходимая клетка карты"""
+        if self.start is not None:
+            return self.start
+        for x, z in zip(*np.nonzero(self.tiles == WALKABLE)):
+            if self.can_move_to(x, z):
+                return int(x), int(z)
+        raise ValueError("На карте нет проходимых клеток")
+
+    def to_dict(self):
+        """Формат экспорта grid-system.js (cells) вместе с объектами object-ui-export.js"""
+        cells = []
+        for x, z in zip(*np.nonzero(self.tiles)):
+            name = CELL_TYPES[self.tiles[x, z]]
+            cells.append({"x": int(x), "z": int(z), "color": CELL_COLORS[name], "type": name})
+        objects = [obj.to_dict() for obj in self.objects]
+        if self.start is not None:
+            objects.append({"type": "character", "cellX": self.start[0], "cellZ": self.start[1]})
+        return {"gridSize": max(self.width, self.height), "width": self.width, "height": self.height,
+                "cellSize": 1.0, "cells": cells, "objects": objects}
+
+    @classmethod
+    def from_dict(cls, data, bucket_size=8):
+        size = data.get("gridSize", 20)
+        world = cls(data.get("width", size), data.get("height", size), bucket_size)
+        for cell in data.get("cells", []):
+            if cell["type"] not in CELL_TYPES:
+                raise ValueError(f"Неизвестный тип клетки: {cell['type']}")
+            if world.in_bounds(cell["x"], cell["z"]):
+                world.paint(cell["x"], cell["z"], cell["type"])
+        # экспорт из редактора пишет в type отображаемое имя ("Дерево")
+        names = {config["name"]: kind for kind, config in OBJECT_TYPES.items()}
+        for item in data.get("objects", []):
+            if item["type"] in CHARACTER_TYPES:
+                world.start = (item["cellX"], item["cellZ"])
+                continue
+            kind = names.get(item["type"], item["type"])
+            world.place(kind, item["cellX"], item["cellZ"])
+        return world
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path, bucket_size=8):
+        with open(path, encoding="utf-8") as f:
+            return cls.from_dict(json.load(f), bucket_size)
+
+
+def blob_mask(width, height, rng, count, radius):
+    """Маска из count случайных кругов радиусом до radius клеток"""
+    mask = np.zeros((width, height), bool)
+    for _ in range(count):
+        cx, cz, r = rng.randrange(width), rng.randrange(height), rng.randint(2, radius)
+        # круг закрашивается только в своем квадрате, а не по всей карте
+        x0, z0 = max(0, cx - r), max(0, cz - r)
+        xs, zs = np.ogrid[x0:min(width, cx + r + 1), z0:min(height, cz + r + 1)]
+        mask[x0:x0 + xs.shape[0], z0:z0 + zs.shape[1]] |= (xs - cx) ** 2 + (zs - cz) ** 2 <= r * r
+    return mask
+
+
+def generate(width=256, height=256, objects=5000, seed=None, portals=12):
+    """Случайная карта: трава, озера, опасные участки, порталы и objects объектов
+
+    Стартовая клетка - центр карты, она и клетки вокруг остаются свободными.
+    """
+    rng = random.Random(seed)
+    world = GridWorld(width, height)
+    world.tiles[:] = WALKABLE
+    area = width * height
+    world.tiles[blob_mask(width, height, rng, max(1, area // 2000), 9)] = WATER
+    world.tiles[blob_mask(width, height, rng, max(1, area // 6000), 4)] = DANGER
+    world.tiles[[0, -1], :] = EMPTY
+    world.tiles[:, [0, -1]] = EMPTY
+
+    start = world.start = (width // 2, height // 2)
+    world.tiles[start[0] - 2:start[0] + 3, start[1] - 2:start[1] + 3] = WALKABLE
+    # заглушка на старте, чтобы объекты не встали вплотную к персонажу
+    keep_out = world.place("Ric", start[0] - 2, start[1] - 2)
+
+    for _ in range(portals):
+        x, z = rng.randrange(1, width - 1), rng.randrange(1, height - 1)
+        if world.is_area_free(x, z, 1, 1):
+            world.tiles[x, z] = BLOCKED
+            world.place("portal", x, z)
+
+    kinds = list(OBJECT_MIX)
+    weights = list(OBJECT_MIX.values())
+    placed = 0
+    for _ in range(objects * 4):
+        if placed >= objects:
+            break
+        kind = rng.choices(kinds, weights)[0]
+        config = OBJECT_TYPES[kind]
+        x = rng.randrange(1, width - config["width"])
+        z = rng.randrange(1, height - config["depth"])
+        footprint = world.tiles[x:x + config["width"], z:z + config["depth"]]
+        if (footprint == WALKABLE).all() and world.is_area_free(x, z, config["width"], config["depth"]):
+            world.place(kind, x, z)
+            placed += 1
+    world.remove(keep_out)
+    return world
+
+
+def render_tiles(tiles, tile, palette, grid_lines=True):
+    """Поверхность клеток: цвета по типам одной выборкой numpy и масштаб до пикселей"""
+    width, height = tiles.shape
+    surface = pygame.transform.scale(pygame.surfarray.make_surface(palette[tiles]), (width * tile, height * tile))
+    if grid_lines:
+        for x in range(0, width * tile, tile):
+            surface.fill(GRID_LINE_COLOR, (x, 0, 1, height * tile))
+        for z in range(0, height * tile, tile):
+            surface.fill(GRID_LINE_COLOR, (0, z, width * tile, 1))
+    return surface
+
+
+class ChunkLayer:
+    """Клетки потокового мира (map_chunks.ChunkedWorld): готовая поверхность на каждый чанк
+
+    Чанки вокруг экрана (prefetch чанков запаса) грузятся в фоне, только что
+    пришедшие сразу пререндерятся - не больше prerender за кадр. Поверхности
+    лежат в LRU с лимитом по памяти, поэтому память не растет с размером карты.
+    """
+
+    def __init__(self, world, tile, palette, grid_lines=True, prefetch=1, prerender=2, max_mb=48):
+        self.world = world
+        self.tile = tile
+        self.palette = palette
+        self.grid_lines = grid_lines
+        self.prefetch = prefetch
+        self.prerender = prerender
+        self.surfaces = SurfaceCache(1024, max_mb * 1024 * 1024)
+
+    def chunk_range(self, cells, margin=0):
+        """Чанки, покрывающие клетки (x0, z0, x1, z1), плюс margin чанков с каждой стороны"""
+        x0, z0, x1, z1 = cells
+        size = self.world.chunk_size
+        return (max(0, x0 // size - margin), max(0, z0 // size - margin),
+                min(self.world.chunks_x, (x1 - 1) // size + 1 + margin),
+                min(self.world.chunks_z, (z1 - 1) // size + 1 + margin))
+
+    def surface(self, chunk):
+        return self.surfaces.get((chunk.cx, chunk.cz), lambda: render_tiles(
+            chunk.tiles, self.tile, self.palette, self.grid_lines).convert())
+
+    def stream(self, cells):
+        """Забирает загруженные в фоне чанки, пререндерит ближние и заказывает чанки вокруг экрана"""
+        ring = self.chunk_range(cells, self.prefetch)
+        budget = self.prerender
+        for chunk in self.world.poll():
+            if budget and ring[0] <= chunk.cx < ring[2] and ring[1] <= chunk.cz < ring[3]:
+                self.surface(chunk)
+                budget -= 1
+        self.world.prefetch(*ring)
+
+    def draw(self, screen, camera, cells):
+        left, top = camera
+        step = self.world.chunk_size * self.tile
+        cx0, cz0, cx1, cz1 = self.chunk_range(cells)
+        for cx in range(cx0, cx1):
+            for cz in range(cz0, cz1):
+                screen.blit(self.surface(self.world.chunk(cx, cz)), (cx * step - left, cz * step - top))
+
+
+class ObjectSprites:
+    """Спрайты объектов под размер клетки: рисуются один раз на (тип, размер)"""
+
+    def __init__(self, portal_model=PORTAL_MODEL):
+        self.portal_model = portal_model
+        self.sprites = {}
+
+    def lift(self, obj, tile):
+        """На сколько пикселей спрайт выступает вверх за свои клетки"""
+        return int(obj.height * tile * LIFT_PER_HEIGHT)
+
+    def get(self, obj, tile):
+        key = (obj.kind, tile)
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            sprite = self.render(obj, tile)
+            self.sprites[key] = sprite
+        return sprite
+
+    def render(self, obj, tile):
+        width, depth = obj.width * tile, obj.depth * tile
+        lift = self.lift(obj, tile)
+        if obj.kind == "portal":
+            sprite = self.render_portal((width, depth + lift))
+            if sprite is not None:
+                return sprite
+        sprite = pygame.Surface((width, depth + lift), pygame.SRCALPHA)
+        color = hex_color(OBJECT_TYPES[obj.kind]["color"])
+        if obj.kind == "tree":
+            trunk = pygame.Rect(0, 0, max(2, width // 6), lift)
+            trunk.midbottom = (width // 2, depth + lift - depth // 4)
+            sprite.fill((110, 70, 30), trunk)
+            pygame.draw.circle(sprite, shade(color, 0.55), (width // 2, (depth + lift) // 2), width // 2)
+            pygame.draw.circle(sprite, shade(color, 0.75), (width // 2 - width // 10, (depth + lift) // 2 - width // 10),
+                               width // 3)
+        elif obj.kind == "rock":
+            body = pygame.Rect(1, lift, width - 2, depth - 1)
+            pygame.draw.ellipse(sprite, shade(color, 0.7), body)
+            pygame.draw.ellipse(sprite, color, body.inflate(-2, -depth // 3).move(0, -depth // 6))
+        else:
+            # коробка: крыша сверху, передняя стена более темная
+            roof = pygame.Rect(0, 0, width, depth)
+            wall = pygame.Rect(0, depth, width, lift)
+            sprite.fill(shade(color, 0.6), wall)
+            sprite.fill(color, roof)
+            pygame.draw.rect(sprite, shade(color, 0.4), roof, 2)
+            pygame.draw.rect(sprite, shade(color, 0.4), wall, 2)
+        return sprite
+
+    def render_portal(self, size):
+        """Портал - проекция модели Portal.gltf; без модели рисуется обычной коробкой"""
+        try:
+            import gltf_loader
+            gltf = gltf_loader.load(self.portal_model)
+        except (OSError, ValueError, KeyError):
+            return None
+        try:
+            return gltf_loader.project(gltf, pitch=20).render(size, margin=0)
+        finally:
+            gltf.close()
+
+
+class Walker:
+    """Персонаж на сетке (character-walk.js): шаг на соседнюю клетку с плавным перемещением
+
+    Пока держится клавиша направления, персонаж идет дальше; кадры берутся из
+    анимаций атласа up/down/side/right.
+    """
+
+    def __init__(self, world, x, z, animations, speed=3.0, frame_duration=200):
+        self.world = world
+        self.x = x
+        self.z = z
+        self.animations = animations
+        self.speed = speed  # клеток в секунду
+        self.frame_duration = frame_duration
+        self.direction = "down"
+        self.target = None
+        self.progress = 0
+        self.frame = 0
+        self.frame_time = 0
+        self.position = (float(x), float(z))
+        self.prev_position = self.position
+
+    @property
+    def moving(self):
+        return self.target is not None
+
+    def try_move(self, direction):
+        if self.moving:
+            return False
+        dx, dz, _ = DIRECTIONS[direction]
+        self.direction = direction
+        if not self.world.can_move_to(self.x + dx, self.z + dz):
+            return False
+        self.target = (self.x + dx, self.z + dz)
+        self.progress = 0
+        self.frame = 0
+        self.frame_time = 0
+        return True
+
+    def update(self, dt):
+        """Шаг логики; возвращает True, когда персонаж дошел до новой клетки"""
+        self.prev_position = self.position
+        if not self.moving:
+            return False
+        self.progress += self.speed * dt / 1000
+        self.frame_time += dt
+        if self.frame_time >= self.frame_duration:
+            self.frame_time -= self.frame_duration
+            self.frame += 1
+        if self.progress >= 1:
+            self.x, self.z = self.target
+            self.target = None
+            self.position = (float(self.x), float(self.z))
+            return True
+        tx, tz = self.target
+        self.position = (lerp(self.x, tx, self.progress), lerp(self.z, tz, self.progress))
+        return False
+
+    def interpolated(self, alpha):
+        return (lerp(self.prev_position[0], self.position[0], alpha),
+                lerp(self.prev_position[1], self.position[1], alpha))
+
+    def image(self):
+        frames = self.animations[DIRECTIONS[self.direction][2]]
+        return frames[self.frame % len(frames)] if self.moving else frames[0]
+
+
+class OverworldScene:
+    """Карта с объектами и персонажем
+
+    Каждый кадр рисуются только видимые клетки и объекты: клетки - одним blit
+    из поверхности видимой области (пересобирается, когда камера уходит за ее
+    запас) или, у потокового мира, по чанкам через ChunkLayer; объекты - из
+    пространственного хэша по прямоугольнику экрана.
+    Шаг на красную клетку возвращает из update() "portal".
+    """
+
+    LEGEND = "Стрелки/WASD - ходьба, ESC - меню"
+
+    def __init__(self, screen, world, atlas, tile_size=40, tile_margin=4, grid_lines=True,
+                 sprites=None):
+        self.screen = screen
+        self.world = world
+        self.tile = tile_size
+        self.tile_margin = tile_margin
+        self.grid_lines = grid_lines
+        self.sprites = sprites or ObjectSprites()
+        self.palette = cell_palette()
+        # у map_chunks.ChunkedWorld клетки грузятся и рисуются по чанкам
+        self.chunks = ChunkLayer(world, tile_size, self.palette, grid_lines) if hasattr(world, "chunk_size") else None
+
+        height = int(tile_size * 1.4)
+        animations = {}
+        for _, _, prefix in DIRECTIONS.values():
+            animations[prefix] = [pygame.transform.smoothscale(
+                frame, (max(1, frame.get_width() * height // frame.get_height()), height))
+                for frame in atlas.animation(prefix)]
+        self.walker = Walker(world, *world.start_cell(), animations)
+
+        self.held = []
+        self.camera = (0, 0)
+        self.walker_position = self.walker.position
+        self.tiles_surface = None
+        self.tiles_range = None
+        self.visible_objects = 0
+        # объекты, торчащие вверх, могут быть видны, даже если их клетки ниже экрана
+        self.max_lift = max(math.ceil(config["height"] * LIFT_PER_HEIGHT) for config in OBJECT_TYPES.values())
+
+    def handle_event(self, event):
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_ESCAPE:
+                return "back_to_menu"
+            direction = DIRECTION_KEYS.get(event.key)
+            if direction and direction not in self.held:
+                self.held.append(direction)
+        elif event.type == pygame.KEYUP:
+            direction = DIRECTION_KEYS.get(event.key)
+            if direction in self.held:
+                self.held.remove(direction)
+        return None
+
+    def suspend(self):
+        self.held.clear()
+
+    def update(self, dt):
+        walker = self.walker
+        if not walker.moving and self.held:
+            # последняя нажатая клавиша главнее
+            walker.try_move(self.held[-1])
+        if walker.update(dt) and self.world.is_portal(walker.x, walker.z):
+            return "portal"
+        return None
+
+    def interpolate(self, alpha):
+        self.walker_position = self.walker.interpolated(alpha)
+
+    def update_camera(self):
+        """Камера держит персонажа по центру, но не выходит за края карты"""
+        tile = self.tile
+        screen_width, screen_height = self.screen.get_size()
+        x, z = self.walker_position
+        camera = []
+        for center, view, cells in ((x, screen_width, self.world.width), (z, screen_height, self.world.height)):
+            pixels = cells * tile
+            if pixels <= view:
+                camera.append(-(view - pixels) // 2)
+            else:
+                camera.append(int(min(max((center + 0.5) * tile - view / 2, 0), pixels - view)))
+        self.camera = tuple(camera)
+
+    def visible_cells(self):
+        """Видимые клетки: (x0, z0, x1, z1), правая и нижняя границы не входят"""
+        tile = self.tile
+        left, top = self.camera
+        width, height = self.screen.get_size()
+        return (max(0, left // tile), max(0, top // tile),
+                min(self.world.width, (left + width) // tile + 1),
+                min(self.world.height, (top + height) // tile + 1))
+
+    def build_tiles(self, x0, z0, x1, z1):
+        return render_tiles(self.world.tiles[x0:x1, z0:z1], self.tile, self.palette, self.grid_lines).convert()
+
+    def draw_tiles(self):
+        if self.chunks is not None:
+            cells = self.visible_cells()
+            self.chunks.stream(cells)
+            self.chunks.draw(self.screen, self.camera, cells)
+            return
+        x0, z0, x1, z1 = self.visible_cells()
+        cached = self.tiles_range
+        if cached is None or not (cached[0] <= x0 and cached[1] <= z0 and x1 <= cached[2] and z1 <= cached[3]):
+            margin = self.tile_margin
+            cached = (max(0, x0 - margin), max(0, z0 - margin),
+                      min(self.world.width, x1 + margin), min(self.world.height, z1 + margin))
+            self.tiles_surface = self.build_tiles(*cached)
+            self.tiles_range = cached
+        left, top = self.camera
+        self.screen.blit(self.tiles_surface, (cached[0] * self.tile - left, cached[1] * self.tile - top))
+
+    def draw(self):
+        self.update_camera()
+        screen = self.screen
+        tile = self.tile
+        left, top = self.camera
+        map_rect = pygame.Rect(-left, -top, self.world.width * tile, self.world.height * tile)
+        if not map_rect.contains(screen.get_rect()):
+            screen.fill(BACKGROUND)
+        self.draw_tiles()
+
+        x0, z0, x1, z1 = self.visible_cells()
+        objects = self.world.objects.query(x0, z0, x1 - x0, z1 - z0 + self.max_lift)
+        self.visible_objects = len(objects)
+
+        # порядок художника: чем ниже нижний край объекта, тем позже он рисуется
+        walker_x, walker_z = self.walker_position
+        drawables = [(obj.z + obj.depth, 0, index) for index, obj in enumerate(objects)]
+        drawables.append((walker_z + 1, 1, -1))
+        drawables.sort()
+        sprites = self.sprites
+        for _, _, index in drawables:
+            if index < 0:
+                image = self.walker.image()
+                rect = image.get_rect(midbottom=(int((walker_x + 0.5) * tile) - left,
+                                                 int((walker_z + 0.9) * tile) - top))
+                screen.blit(image, rect)
+                continue
+            obj = objects[index]
+            screen.blit(sprites.get(obj, tile),
+                        (obj.x * tile - left, obj.z * tile - sprites.lift(obj, tile) - top))
+
+        font = get_font("arial", 16)
+        screen.blit(font.render(self.LEGEND, True, (255, 255, 255)), (10, 10))
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Генерация карты для overworld (JSON в формате grid-system.js)")
+    parser.add_argument("out", help="куда записать карту")
+    parser.add_argument("--size", type=int, default=256, help="сторона карты в клетках")
+    parser.add_argument("--objects", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    world = generate(args.size, args.size, args.objects, args.seed)
+    elapsed = time.perf_counter() - start
+    world.save(args.out)
+    print(f"{args.out}: {args.size}x{args.size}, объектов {len(world.objects)} за {elapsed:.2f} с")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+import csv
+import functools
+import json
+import time
+from collections import deque
+
+import pygame
+
+from render_cache import get_font
+
+
+class Section:
+    """Таймер одного участка кадра; переиспользуется, чтобы не создавать объекты каждый кадр"""
+
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.add(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class NullSection:
+    """Пустой таймер для выключенного профайлера"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SECTION = NullSection()
+
+
+class FrameProfiler:
+    """Время кадра и его участков за последние history кадров
+
+    Выключенный профайлер отдает пустые таймеры, так что обертки вокруг
+    участков почти ничего не стоят.
+    """
+
+    def __init__(self, enabled=False, history=600, overlay_every=30):
+        self.enabled = enabled
+        self.history = history
+        self.overlay = False
+        # оверлей пересчитывает сводку раз в overlay_every кадров, а не каждый кадр
+        self.overlay_every = overlay_every
+        self.overlay_summary = None
+        self.overlay_frame = 0
+        self.sections = {}
+        self.current = {}
+        self.frames = deque(maxlen=history)
+        self.frame_start = None
+        self.frame_count = 0
+
+    def section(self, name):
+        if not self.enabled:
+            return NULL_SECTION
+        section = self.sections.get(name)
+        if section is None:
+            section = Section(self, name)
+            self.sections[name] = section
+        return section
+
+    def add(self, name, seconds):
+        self.current[name] = self.current.get(name, 0) + seconds
+
+    def begin_frame(self):
+        if self.enabled:
+            self.frame_start = time.perf_counter()
+            self.current = {}
+
+    def end_frame(self):
+        if not self.enabled or self.frame_start is None:
+            return
+        frame = time.perf_counter() - self.frame_start
+        self.frames.append((frame, self.current))
+        self.frame_count += 1
+        self.frame_start = None
+
+    def toggle(self):
+        """Включает профайлер вместе с оверлеем или выключает оверлей"""
+        self.overlay = not self.overlay
+        if self.overlay:
+            self.enabled = True
+
+    def instrument(self, obj, prefix="draw_", group=None):
+        """Оборачивает методы объекта с именем на prefix в таймеры (только для этого экземпляра)"""
+        group = group or type(obj).__name__
+        for name in dir(type(obj)):
+            if name.startswith(prefix) and callable(getattr(type(obj), name)):
+                setattr(obj, name, self.timed(getattr(obj, name), f"{group}.{name}"))
+        return obj
+
+    def timed(self, func, name):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.section(name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    def percentile(self, ordered, p):
+        """Процентиль уже отсортированного списка"""
+        if not ordered:
+            return 0.0
+        index = min(len(ordered) - 1, max(0, int(round(p / 100 * (len(ordered) - 1)))))
+        return ordered[index]
+
+    def summary(self):
+        """p50/p95/p99 времени кадра и среднее по участкам, в миллисекундах"""
+        frames = sorted(frame for frame, _ in self.frames)
+        result = {
+            "frames": len(frames),
+            "frame_ms": {f"p{p}": self.percentile(frames, p) * 1000 for p in (50, 95, 99)},
+            "sections_ms": {},
+        }
+        if frames:
+            result["frame_ms"]["max"] = frames[-1] * 1000
+            totals = {}
+            for _, sections in self.frames:
+                for name, seconds in sections.items():
+                    totals[name] = totals.get(name, 0) + seconds
+            result["sections_ms"] = {name: total / len(frames) * 1000
+                                     for name, total in sorted(totals.items(), key=lambda item: -item[1])}
+        return result
+
+    def draw(self, surface, lines=12):
+        """Оверлей с процентилями кадра и самыми дорогими участками"""
+        if not self.overlay:
+            return None
+        if self.overlay_summary is None or self.frame_count - self.overlay_frame >= self.overlay_every:
+            self.overlay_summary = self.summary()
+            self.overlay_frame = self.frame_count
+        summary = self.overlay_summary
+        frame = summary["frame_ms"]
+        text = [f"кадр p50 {frame['p50']:.2f}  p95 {frame['p95']:.2f}  p99 {frame['p99']:.2f} мс"]
+        for name, ms in list(summary["sections_ms"].items())[:lines]:
+            text.append(f"{name:<32} {ms:6.2f}")
+
+        font = get_font("consolas", 16)
+        line_height = font.text_size("0")[1]
+        width = max(font.text_size(line)[0] for line in text) + 16
+        panel = pygame.Rect(8, 8, width, line_height * len(text) + 12)
+        surface.fill((0, 0, 0), panel)
+        pygame.draw.rect(surface, (0, 255, 0), panel, 1)
+        for i, line in enumerate(text):
+            surface.blit(font.render(line, True, (0, 255, 0)), (panel.x + 8, panel.y + 6 + i * line_height))
+        return panel
+
+    def dump(self, path):
+        """Пишет покадровую таблицу (CSV) и сводку (JSON); возвращает пути файлов"""
+        names = sorted({name for _, sections in self.frames for name in sections})
+        with open(path + ".csv", "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["frame_ms"] + names)
+            for frame, sections in self.frames:
+                writer.writerow([round(frame * 1000, 4)] + [round(sections.get(name, 0) * 1000, 4) for name in names])
+        with open(path + ".json", "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, indent=1, ensure_ascii=False)
+        return path + ".csv", path + ".json"
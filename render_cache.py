@@ -0,0 +1,233 @@
+import math
+from collections import OrderedDict
+
+import pygame
+
+
+def surface_bytes(value):
+    """Примерный размер поверхности (или кортежа с поверхностью первой) в байтах"""
+    surface = value[0] if isinstance(value, tuple) else value
+    return surface.get_width() * surface.get_height() * surface.get_bytesize()
+
+
+class SurfaceCache:
+    """LRU-кэш готовых поверхностей с лимитом по количеству и по памяти"""
+
+    def __init__(self, max_entries=256, max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, builder):
+        """Возвращает значение по ключу, при промахе строит его через builder()"""
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        entry = builder()
+        self.entries[key] = entry
+        if self.max_bytes is not None:
+            self.total_bytes += surface_bytes(entry)
+        self.evict()
+        return entry
+
+    def evict(self):
+        """Выбрасывает самые старые записи, пока не уложимся в лимиты"""
+        while len(self.entries) > 1 and (
+                len(self.entries) > self.max_entries or
+                (self.max_bytes is not None and self.total_bytes > self.max_bytes)):
+            _, entry = self.entries.popitem(last=False)
+            if self.max_bytes is not None:
+                self.total_bytes -= surface_bytes(entry)
+
+    def is_full(self):
+        if len(self.entries) >= self.max_entries:
+            return True
+        return self.max_bytes is not None and self.total_bytes >= self.max_bytes
+
+    def clear(self):
+        self.entries.clear()
+        self.total_bytes = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class FrameCache:
+    """Кэш кадров пульсации/вращения с квантованием фазы и угла
+
+    С pulses_per_turn фаза пульсации задается углом (целое число пульсаций за
+    оборот): кадр определяется одним углом, и полный цикл - angle_steps кадров.
+    По умолчанию (max_frames=None) кэш вмещает весь цикл.
+    """
+
+    def __init__(self, image, pulse_steps=8, angle_step=0, max_frames=None, max_bytes=None, clip_rect=None,
+                 detail=1.0, pulses_per_turn=0):
+        self.image = image
+        self.pulse_steps = max(1, pulse_steps)
+        self.angle_step = angle_step
+        self.angle_steps = max(1, int(round(360 / angle_step))) if angle_step else 1
+        self.pulses_per_turn = pulses_per_turn
+        # все, что за пределами видимой области, в кэш не попадает
+        self.clip_rect = clip_rect
+        # доля разрешения, в которой кадр хранится; растягивается при выдаче в общий буфер
+        self.detail = detail
+        self.target = None
+        self.frames = SurfaceCache(max_frames or self.cycle_frames(), max_bytes)
+        # картинка в масштабе последней фазы: фаза меняется реже угла
+        self.source_key = None
+        self.source = None
+
+    def cycle_frames(self):
+        """Сколько разных кадров за полный цикл анимации"""
+        if self.pulses_per_turn:
+            return self.angle_steps
+        return self.pulse_steps * self.angle_steps
+
+    def phase_key(self, phase):
+        """Номер шага для фазы пульсации 0..1"""
+        return int(round(phase * self.pulse_steps)) % self.pulse_steps
+
+    def angle_key(self, angle):
+        """Номер шага для угла поворота"""
+        if not self.angle_step:
+            return 0
+        return int(round((angle % 360) / self.angle_step)) % self.angle_steps
+
+    def key(self, phase, angle):
+        angle_step = self.angle_key(angle)
+        if self.pulses_per_turn:
+            phase = angle_step * self.pulses_per_turn / self.angle_steps
+        return self.phase_key(phase), angle_step
+
+    def get(self, center, scale_for_phase, phase, angle=0):
+        """Возвращает (поверхность, rect) для фазы пульсации и угла
+
+        При detail < 1 поверхность - общий буфер кэша: его надо вывести до следующего get.
+        """
+        key = self.key(phase, angle)
+        frame, rect = self.frames.get(key, lambda: self.build(center, scale_for_phase, *key))
+        if self.detail == 1:
+            return frame, rect
+        return self.upscale(frame, rect)
+
+    def upscale(self, frame, rect):
+        """Растягивает кадр пониженного разрешения до экранного в переиспользуемый буфер"""
+        detail = self.detail
+        size = (round(rect.w / detail), round(rect.h / detail))
+        target = self.target
+        if target is None or target.get_width() < size[0] or target.get_height() < size[1]:
+            width = max(size[0], target.get_width() if target else 0)
+            height = max(size[1], target.get_height() if target else 0)
+            target = self.target = pygame.Surface((width, height), frame.get_flags(), frame)
+        surface = target.subsurface((0, 0) + size)
+        pygame.transform.scale(frame, size, surface)
+        return surface, pygame.Rect(round(rect.x / detail), round(rect.y / detail), *size)
+
+    def scaled_source(self, center, scale, phase_step):
+        """Картинка в масштабе фазы, обрезанная до квадрата вокруг круга, который
+        при любом повороте закрывает видимую область"""
+        key = (phase_step, center)
+        if self.source_key != key:
+            image = self.image
+            if self.clip_rect is not None:
+                clip = self.clip_rect
+                radius = max(math.hypot(x - center[0], y - center[1])
+                             for x in (clip.left, clip.right) for y in (clip.top, clip.bottom))
+                side = int(2 * radius / scale) + 2
+                crop = pygame.Rect(0, 0, side, side)
+                crop.center = image.get_rect().center
+                image = image.subsurface(crop.clip(image.get_rect()))
+            size = (max(1, int(image.get_width() * scale * self.detail)),
+                    max(1, int(image.get_height() * scale * self.detail)))
+            self.source = pygame.transform.scale(image, size)
+            self.source_key = key
+        return self.source
+
+    def build(self, center, scale_for_phase, phase_step, angle_step):
+        """Строит кадр: масштаб -> поворот -> обрезка по видимой области и прозрачным полям
+
+        Кадр и rect - в масштабе detail.
+        """
+        scale = scale_for_phase(phase_step / self.pulse_steps)
+        frame = self.scaled_source(center, scale, phase_step)
+
+        angle = angle_step * self.angle_step
+        if angle:
+            frame = pygame.transform.rotate(frame, angle)
+
+        detail = self.detail
+        rect = frame.get_rect(center=(center[0] * detail, center[1] * detail))
+        # углы после поворота прозрачные: хранится только то, что видно
+        visible = frame.get_bounding_rect().move(rect.topleft)
+        if self.clip_rect is not None:
+            clip = self.clip_rect
+            # на пиксель шире: после растяжения край не должен остаться открытым
+            clip = pygame.Rect(int(clip.x * detail), int(clip.y * detail),
+                               math.ceil(clip.w * detail) + 1, math.ceil(clip.h * detail) + 1)
+            visible = visible.clip(clip)
+        if visible != rect:
+            frame = frame.subsurface(visible.move(-rect.x, -rect.y)).copy()
+        return frame, visible
+
+    def prebake(self, center, scale_for_phase):
+        """Заранее строит все кадры цикла, пока они помещаются в лимиты кэша"""
+        phases = [0] if self.pulses_per_turn else range(self.pulse_steps)
+        for phase_step in phases:
+            for angle_step in range(self.angle_steps):
+                if self.frames.is_full():
+                    return
+                key = self.key(phase_step / self.pulse_steps, angle_step * self.angle_step)
+                self.frames.get(key, lambda: self.build(center, scale_for_phase, *key))
+
+
+class CachedFont:
+    """Шрифт, который отдает готовые надписи из общего кэша текста"""
+
+    def __init__(self, registry, name, size, bold=False):
+        self.registry = registry
+        self.name = name
+        self.size = size
+        self.bold = bold
+        self.font = pygame.font.SysFont(name, size, bold=bold)
+
+    def render(self, text, antialias, color):
+        key = (self.name, self.size, self.bold, text, tuple(color), antialias)
+        return self.registry.texts.get(key, lambda: self.font.render(text, antialias, color))
+
+    def text_size(self, text):
+        return self.font.size(text)
+
+
+class FontRegistry:
+    """Центральный реестр шрифтов: SysFont ищется один раз на (имя, размер, жирность)"""
+
+    def __init__(self, max_texts=512):
+        self.fonts = {}
+        self.texts = SurfaceCache(max_texts)
+
+    def get(self, name, size, bold=False):
+        key = (name, size, bold)
+        font = self.fonts.get(key)
+        if font is None:
+            font = CachedFont(self, name, size, bold)
+            self.fonts[key] = font
+        return font
+
+    def clear(self):
+        self.fonts.clear()
+        self.texts.clear()
+
+
+fonts = FontRegistry()
+
+
+def get_font(name, size, bold=False):
+    """Возвращает кэширующий шрифт из общего реестра"""
+    return fonts.get(name, size, bold)
@@ -0,0 +1,444 @@
+import argparse
+import functools
+import os
+import struct
+import sys
+import time
+
+from battle_engine import TYPE_CODES, TYPE_NAMES, BattleEngine
+from battle_policies import POLICIES
+
+
+MAGIC = b"MRPL"
+VERSION = 1
+
+# Событие - один байт: младшие 6 бит - код, старшие - флаги раунда.
+# Код раунда: игрок * число_действий + враг; дальше служебные коды.
+NEW_BATTLE = 62
+MATCHUP = 63  # за ним: тип игрока, тип врага (по байту), уровень врага (u16)
+CODE_MASK = 0x3F
+ENEMY_RNG = 0x40  # выбор врага брал числа из ГСЧ: при проигрывании его надо повторить
+PLAYER_RNG = 0x80  # то же для выбора игрока (боты)
+
+
+def policy_name(policy):
+    """Имя политики из POLICIES; "" - таблица весов врага или человек"""
+    for name, known in POLICIES.items():
+        if known is policy:
+            return name
+    return ""
+
+
+class Round:
+    __slots__ = ("player", "enemy", "player_rng", "enemy_rng")
+
+    def __init__(self, player, enemy, player_rng=False, enemy_rng=False):
+        self.player = player
+        self.enemy = enemy
+        self.player_rng = player_rng
+        self.enemy_rng = enemy_rng
+
+
+class Replay:
+    """Запись боя: сид ГСЧ движка и поток действий по раундам
+
+    Правила боя детерминированы при известном сиде, поэтому хранить нужно
+    только выборы сторон - по байту на раунд. Выборы, которые сами брали
+    числа из ГСЧ (таблица весов, случайные политики), при проигрывании
+    повторяются политикой, остальные подставляются из записи.
+    """
+
+    def __init__(self, seed, actions, enemy_policy="", player_policy=""):
+        if len(actions) ** 2 > NEW_BATTLE:
+            raise ValueError(f"слишком много действий для формата записи: {len(actions)}")
+        self.seed = seed
+        self.actions = list(actions)
+        self.codes = {action: code for code, action in enumerate(self.actions)}
+        self.enemy_policy = enemy_policy
+        self.player_policy = player_policy
+        self.data = bytearray()
+        self.rounds = 0
+        self.battles = 0
+
+    def add_round(self, player, enemy, player_rng=False, enemy_rng=False):
+        code = self.codes[player] * len(self.actions) + self.codes[enemy]
+        self.data.append(code | (PLAYER_RNG if player_rng else 0) | (ENEMY_RNG if enemy_rng else 0))
+        self.rounds += 1
+
+    def add_new_battle(self):
+        self.data.append(NEW_BATTLE)
+        self.battles += 1
+
+    def add_matchup(self, player_type, enemy_type, enemy_level):
+        self.data.append(MATCHUP)
+        self.data += struct.pack("<BBH", TYPE_CODES[player_type], TYPE_CODES[enemy_type], enemy_level)
+        self.battles += 1
+
+    def events(self):
+        """События записи: Round, ("new_battle",) или ("matchup", тип игрока, тип врага, уровень)"""
+        data = self.data
+        count = len(self.actions)
+        i = 0
+        while i < len(data):
+            byte = data[i]
+            code = byte & CODE_MASK
+            i += 1
+            if code == NEW_BATTLE:
+                yield ("new_battle",)
+            elif code == MATCHUP:
+                player_type, enemy_type, level = struct.unpack_from("<BBH", data, i)
+                i += 4
+                yield ("matchup", TYPE_NAMES[player_type], TYPE_NAMES[enemy_type], level)
+            elif code < count * count:
+                yield Round(self.actions[code // count], self.actions[code % count],
+                            bool(byte & PLAYER_RNG), bool(byte & ENEMY_RNG))
+            else:
+                raise ValueError(f"неизвестное событие записи: {byte} (байт {i - 1})")
+
+    def to_bytes(self):
+        header = bytearray(MAGIC)
+        header += struct.pack("<Bq", VERSION, self.seed)
+        header.append(len(self.actions))
+        for text in self.actions + [self.enemy_policy, self.player_policy]:
+            encoded = text.encode("utf-8")
+            header.append(len(encoded))
+            header += encoded
+        return bytes(header) + bytes(self.data)
+
+    @classmethod
+    def from_bytes(cls, data):
+        if data[:4] != MAGIC:
+            raise ValueError("это не запись боя")
+        version, seed = struct.unpack_from("<Bq", data, 4)
+        if version != VERSION:
+            raise ValueError(f"неподдерживаемая версия записи: {version}")
+        i = 13
+        texts = []
+        count = data[i]
+        i += 1
+        for _ in range(count + 2):
+            length = data[i]
+            texts.append(data[i + 1:i + 1 + length].decode("utf-8"))
+            i += 1 + length
+        replay = cls(seed, texts[:count], texts[count], texts[count + 1])
+        replay.data = bytearray(data[i:])
+        for event in replay.events():
+            if isinstance(event, Round):
+                replay.rounds += 1
+            else:
+                replay.battles += 1
+        return replay
+
+    def save(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+
+class ReplayRecorder:
+    """Пишет бой движка в Replay
+
+    Как profiler.instrument, подменяет методы только у этого экземпляра
+    движка. Брал ли выбор числа из ГСЧ, видно по состоянию ГСЧ до и после.
+    """
+
+    def __init__(self, engine, player_policy=""):
+        if engine.seed is None:
+            raise ValueError("для записи боя движку нужен явный сид")
+        self.engine = engine
+        self.replay = Replay(engine.seed, list(engine.attacks), policy_name(engine.enemy_policy), player_policy)
+        self.rng_state = engine.rng.getstate()
+        self.player_choice = None
+        self.player_rng = False
+        self.enemy_rng = False
+        for name in ("player_action", "decide_enemy_action", "enemy_choose", "start_new_battle", "set_matchup"):
+            setattr(engine, name, functools.partial(getattr(self, name), getattr(engine, name)))
+
+    def rng_used(self, state):
+        return self.engine.rng.getstate() != state
+
+    def player_action(self, original, action_type):
+        player_rng = self.rng_used(self.rng_state)
+        accepted = original(action_type)
+        if accepted:
+            self.player_choice = action_type
+            self.player_rng = player_rng
+            self.rng_state = self.engine.rng.getstate()
+        return accepted
+
+    def decide_enemy_action(self, original):
+        state = self.engine.rng.getstate()
+        action_type = original()
+        self.enemy_rng = self.enemy_rng or self.rng_used(state)
+        return action_type
+
+    def enemy_choose(self, original, action_type=None):
+        # ход врага, выбранный снаружи (play_round), тоже мог взять числа из ГСЧ
+        self.enemy_rng = self.rng_used(self.rng_state)
+        choice = original(action_type)
+        self.replay.add_round(self.player_choice, choice, self.player_rng, self.enemy_rng)
+        self.rng_state = self.engine.rng.getstate()
+        return choice
+
+    def start_new_battle(self, original):
+        original()
+        self.replay.add_new_battle()
+        self.rng_state = self.engine.rng.getstate()
+
+    def set_matchup(self, original, player_type, enemy_type, enemy_level=1):
+        original(player_type, enemy_type, enemy_level)
+        self.replay.add_matchup(player_type, enemy_type, enemy_level)
+        self.rng_state = self.engine.rng.getstate()
+
+
+class ReplayPlayer:
+    """Повторяет запись на движке и проверяет, что выборы совпадают с записанными"""
+
+    def __init__(self, replay, engine=None):
+        self.replay = replay
+        self.engine = engine or BattleEngine(replay.seed)
+        if list(self.engine.attacks) != replay.actions:
+            raise ValueError("действия движка не совпадают с записью")
+        self.engine.enemy_policy = POLICIES.get(replay.enemy_policy)
+        self.player_policy = POLICIES.get(replay.player_policy)
+        self.events = replay.events()
+        self.rounds = 0
+        self.winners = {"player": 0, "enemy": 0}
+
+    def desync(self, what, expected, actual):
+        raise ValueError(f"рассинхронизация в раунде {self.rounds + 1}: {what} {actual}, в записи {expected}")
+
+    def player_turn(self, event):
+        """Выбор игрока (повторяется политикой, если она брала числа из ГСЧ)"""
+        if event.player_rng:
+            if self.player_policy is None:
+                raise ValueError(f"для проигрывания нужна политика игрока {self.replay.player_policy!r}")
+            action_type = self.player_policy(self.engine, True)
+            if action_type != event.player:
+                self.desync("игрок выбрал", event.player, action_type)
+        return event.player
+
+    def enemy_turn(self, event):
+        """Ход врага и расчет раунда"""
+        choice = self.engine.enemy_choose(None if event.enemy_rng else event.enemy)
+        if choice != event.enemy:
+            self.desync("враг выбрал", event.enemy, choice)
+        self.rounds += 1
+        return choice
+
+    def apply(self, event):
+        """Применяет одно событие целиком, без пауз"""
+        engine = self.engine
+        if isinstance(event, Round):
+            if not engine.player_action(self.player_turn(event)):
+                self.desync("игрок не смог выбрать", event.player, None)
+            self.enemy_turn(event)
+            winner = engine.apply_damage()
+            if winner is None:
+                engine.reset_round()
+            else:
+                self.winners[winner] += 1
+        elif event[0] == "new_battle":
+            engine.start_new_battle()
+        else:
+            engine.set_matchup(*event[1:])
+
+    def run(self):
+        """Проигрывает запись до конца; возвращает движок в конечном состоянии"""
+        for event in self.events:
+            self.apply(event)
+        return self.engine
+
+
+class ReplayViewer:
+    """Сцена проигрывания записи на MortyBattle с регулируемой скоростью
+
+    Раунд идет по фазам как в обычном бою: выбор игрока, ход врага, показ
+    результата. Стрелки вверх/вниз меняют скорость, пробел - пауза.
+    """
+
+    SPEEDS = [0.25, 0.5, 1, 2, 4, 8, 16, 64]
+
+    def __init__(self, battle, replay, speed=1):
+        self.battle = battle
+        self.player = ReplayPlayer(replay, battle.engine)
+        self.speed = speed
+        self.paused = False
+        self.event = None
+        self.phase = "next"
+        self.wait = 0
+        self.finished = False
+
+    def handle_event(self, event):
+        import pygame
+
+        if event.type == pygame.QUIT:
+            return "quit"
+        if event.type != pygame.KEYDOWN:
+            return None
+        if event.key == pygame.K_ESCAPE:
+            return "back_to_menu"
+        if event.key == pygame.K_SPACE:
+            self.paused = not self.paused
+        elif event.key in (pygame.K_UP, pygame.K_DOWN):
+            faster = [speed for speed in self.SPEEDS if speed > self.speed]
+            slower = [speed for speed in self.SPEEDS if speed < self.speed]
+            if event.key == pygame.K_UP and faster:
+                self.speed = faster[0]
+            elif event.key == pygame.K_DOWN and slower:
+                self.speed = slower[-1]
+            self.battle.show_message(f"Скорость x{self.speed:g}", 1000)
+        return None
+
+    def update(self, dt):
+        if self.paused:
+            return
+        dt *= self.speed
+        self.battle.update(dt)
+        self.wait -= dt
+        while self.wait <= 0 and not self.finished:
+            self.advance()
+
+    def advance(self):
+        """Следующая фаза записи; wait - сколько ее показывать"""
+        battle = self.battle
+        if self.phase == "next":
+            self.event = next(self.player.events, None)
+            if self.event is None:
+                self.finished = True
+                battle.show_message(f"Запись закончилась: {self.player.rounds} раундов", 10 ** 9)
+                return
+            if isinstance(self.event, Round):
+                battle.player_action(self.player.player_turn(self.event))
+                if battle.game_state != "enemy_turn":
+                    self.player.desync("игрок не смог выбрать", self.event.player, None)
+                # ход врага делает запись, а не таймер сцены
+                battle.enemy_choice_timer = float("inf")
+                self.phase = "enemy"
+                self.wait = battle.enemy_choice_delay
+            else:
+                if self.event[0] == "new_battle":
+                    battle.start_new_battle()
+                else:
+                    battle.engine.set_matchup(*self.event[1:])
+                    battle.reset_round()
+                self.wait = 1500
+        elif self.phase == "enemy":
+            self.player.enemy_turn(self.event)
+            battle.combat_animation = True
+            battle.combat_timer = 0
+            self.phase = "result"
+            self.wait = 1500
+        else:
+            battle.apply_damage()
+            if battle.game_state != "game_over":
+                battle.reset_round()
+            self.phase = "next"
+            self.wait = 500
+
+    def interpolate(self, alpha):
+        pass
+
+    def invalidate(self):
+        self.battle.invalidate()
+
+    def draw(self):
+        return self.battle.draw()
+
+
+def record_bots(seed, rounds, player_policy, enemy_policy=""):
+    """Запись боев двух политик длиной rounds раундов (новый бой после каждого окончания)"""
+    engine = BattleEngine(seed)
+    engine.enemy_policy = POLICIES.get(enemy_policy)
+    recorder = ReplayRecorder(engine, player_policy)
+    policy = POLICIES[player_policy]
+    for _ in range(rounds):
+        if engine.play_round(policy(engine, True)) is not None:
+            engine.start_new_battle()
+    return recorder.replay
+
+
+def summary(engine):
+    return (f"побед подряд {engine.wins_count}, уровень врага {engine.enemy_level}, "
+            f"HP {engine.player_morty.hp}/{engine.player_morty.max_hp} против "
+            f"{engine.enemy_morty.hp}/{engine.enemy_morty.max_hp}")
+
+
+def show(replay, speed):
+    import pygame
+    from battle_scene import MortyBattle
+
+    pygame.init()
+    screen = pygame.display.set_mode((1200, 675))
+    pygame.display.set_caption("Запись боя")
+    viewer = ReplayViewer(MortyBattle(screen, seed=replay.seed), replay, speed)
+    clock = pygame.time.Clock()
+    viewer.invalidate()
+    while True:
+        dt = clock.tick(60)
+        for event in pygame.event.get():
+            if viewer.handle_event(event) in ("quit", "back_to_menu"):
+                pygame.quit()
+                return viewer.player.engine
+        viewer.update(dt)
+        rects = viewer.draw()
+        if rects is None:
+            pygame.display.flip()
+        elif rects:
+            pygame.display.update(rects)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Записи боев: проверка, проигрывание, запись ботов")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub.add_parser("run", help="пересчитать запись без окна")
+    run_parser.add_argument("path")
+    run_parser.add_argument("--repeat", type=int, default=1, help="сколько раз прогнать (для замера скорости)")
+
+    show_parser = sub.add_parser("show", help="показать запись в окне")
+    show_parser.add_argument("path")
+    show_parser.add_argument("--speed", type=float, default=1)
+
+    record_parser = sub.add_parser("record", help="записать бои ботов")
+    record_parser.add_argument("path")
+    record_parser.add_argument("--seed", type=int, default=0)
+    record_parser.add_argument("--rounds", type=int, default=10000)
+    record_parser.add_argument("--player", default="random", choices=sorted(POLICIES))
+    record_parser.add_argument("--enemy", default="", help="политика врага, по умолчанию таблица весов")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        replay = record_bots(args.seed, args.rounds, args.player, args.enemy)
+        replay.save(args.path)
+        print(f"{args.path}: {replay.rounds} раундов, {replay.battles} новых боев, "
+              f"{os.path.getsize(args.path)} байт")
+        return 0
+
+    replay = Replay.load(args.path)
+    if args.command == "show":
+        show(replay, args.speed)
+        return 0
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        player = ReplayPlayer(replay)
+        engine = player.run()
+    elapsed = time.perf_counter() - start
+    rounds = player.rounds * args.repeat
+    print(f"сид {replay.seed}, раундов {player.rounds}, новых боев {replay.battles}, "
+          f"победы {player.winners['player']}, поражения {player.winners['enemy']}")
+    print(summary(engine))
+    print(f"{rounds / elapsed:.0f} раундов/с")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,225 @@
+import pygame
+
+
+class SurfacePool:
+    """Поверхности для оверлеев и снимков сцен: создаются один раз и переиспользуются"""
+
+    def __init__(self):
+        self.surfaces = {}
+
+    def get(self, name, size, fill=None):
+        """Поверхность под именем name; пересоздается только при смене размера"""
+        key = (name, tuple(size))
+        surface = self.surfaces.get(key)
+        if surface is None:
+            surface = pygame.Surface(size).convert()
+            if fill is not None:
+                surface.fill(fill)
+            self.surfaces[key] = surface
+        return surface
+
+    def clear(self):
+        self.surfaces.clear()
+
+
+class FadeTransition:
+    """Затемнение в черный, смена сцены в самой темной точке, проявление"""
+
+    def __init__(self, manager, action, duration=530, color=(0, 0, 0)):
+        self.manager = manager
+        self.action = action
+        self.half = duration
+        self.color = color
+        self.elapsed = 0
+        self.alpha = 0
+        self.switched = False
+
+    def update(self, dt):
+        """Возвращает True, когда переход закончился"""
+        self.elapsed += dt
+        if not self.switched:
+            self.alpha = min(255, int(255 * self.elapsed / self.half))
+            if self.alpha >= 255:
+                self.switched = True
+                self.elapsed = 0
+                self.action()
+            return False
+        self.alpha = max(0, 255 - int(255 * self.elapsed / self.half))
+        return self.alpha <= 0
+
+    def draw(self, screen):
+        if self.alpha <= 0:
+            return
+        overlay = self.manager.pool.get("fade", screen.get_size(), self.color)
+        overlay.set_alpha(self.alpha)
+        screen.blit(overlay, (0, 0))
+
+
+class CrossfadeTransition:
+    """Плавная смена сцен по снимкам: старая сцена растворяется поверх новой"""
+
+    def __init__(self, manager, action, duration=530):
+        self.manager = manager
+        self.duration = duration
+        self.elapsed = 0
+        screen = manager.screen
+
+        # снимок старой сцены - то, что сейчас на экране
+        self.source = manager.pool.get("crossfade_from", screen.get_size())
+        self.source.blit(screen, (0, 0))
+
+        action()
+        # снимок новой сцены: рисуем ее один раз целиком и запоминаем
+        self.target = manager.pool.get("crossfade_to", screen.get_size())
+        manager.draw_scene(full=True)
+        self.target.blit(screen, (0, 0))
+        self.alpha = 255
+
+    def update(self, dt):
+        self.elapsed += dt
+        self.alpha = max(0, 255 - int(255 * self.elapsed / self.duration))
+        return self.alpha <= 0
+
+    def draw(self, screen):
+        screen.blit(self.target, (0, 0))
+        self.source.set_alpha(self.alpha)
+        screen.blit(self.source, (0, 0))
+
+
+TRANSITIONS = {
+    "fade": FadeTransition,
+    "crossfade": CrossfadeTransition,
+}
+
+
+class SceneManager:
+    """Стек сцен с переходами
+
+    Сцены создаются фабриками при первом входе и дальше живут, пока их не
+    выбросят явно (forget): уход со сцены ее только приостанавливает, поэтому
+    повторный вход мгновенный. Сцена - любой объект с handle_event/update/draw;
+    interpolate, invalidate, suspend и resume необязательны. draw() сцены
+    возвращает список измененных областей или None, если перерисован весь экран.
+    Результат handle_event или update из routes запускает переход.
+    """
+
+    def __init__(self, screen, factories, routes=None, transition="fade"):
+        self.screen = screen
+        self.factories = factories
+        self.routes = routes or {}
+        self.transition_type = transition
+        self.instances = {}
+        self.stack = []
+        self.pool = SurfacePool()
+        self.transition = None
+        self.screen_dirty = True
+
+    @property
+    def current_name(self):
+        return self.stack[-1] if self.stack else None
+
+    @property
+    def current(self):
+        return self.instances.get(self.current_name)
+
+    def scene(self, name):
+        """Экземпляр сцены; создается при первом обращении"""
+        scene = self.instances.get(name)
+        if scene is None:
+            scene = self.factories[name]()
+            self.instances[name] = scene
+        return scene
+
+    def forget(self, name):
+        """Выбрасывает сохраненный экземпляр; следующий вход создаст сцену заново"""
+        if name not in self.stack:
+            self.instances.pop(name, None)
+
+    def call(self, scene, method):
+        handler = getattr(scene, method, None)
+        if handler is not None:
+            handler()
+
+    def activate(self, names):
+        """Меняет стек без перехода: приостанавливает ушедшую сцену, будит новую"""
+        previous = self.current
+        self.stack = names
+        current = self.scene(self.current_name) if names else None
+        if previous is not current:
+            if previous is not None:
+                self.call(previous, "suspend")
+            if current is not None:
+                self.call(current, "resume")
+        self.screen_dirty = True
+
+    def start(self, name):
+        self.activate([name])
+
+    def switch(self, name, transition=None):
+        """Заменяет верхнюю сцену; без фабрики (как у настроек) сцена остается прежней"""
+        if name not in self.factories:
+            self.run_transition(lambda: None, transition)
+        else:
+            self.run_transition(lambda: self.activate(self.stack[:-1] + [name]), transition)
+
+    def push(self, name, transition=None):
+        self.run_transition(lambda: self.activate(self.stack + [name]), transition)
+
+    def pop(self, transition=None):
+        if len(self.stack) > 1:
+            self.run_transition(lambda: self.activate(self.stack[:-1]), transition)
+
+    def run_transition(self, action, transition=None):
+        if self.transition is not None:
+            return
+        transition = transition or self.transition_type
+        if transition is None:
+            action()
+            return
+        self.transition = TRANSITIONS[transition](self, action)
+
+    def handle_event(self, event):
+        """Передает событие текущей сцене; ее результат из routes запускает переход"""
+        scene = self.current
+        if scene is None:
+            return None
+        result = scene.handle_event(event)
+        if result in self.routes:
+            self.switch(self.routes[result])
+        return result
+
+    def update(self, dt):
+        scene = self.current
+        if scene is not None:
+            result = scene.update(dt)
+            if result in self.routes:
+                self.switch(self.routes[result])
+        if self.transition is not None and self.transition.update(dt):
+            self.transition = None
+            self.screen_dirty = True
+
+    def interpolate(self, alpha):
+        scene = self.current
+        if scene is not None and hasattr(scene, "interpolate"):
+            scene.interpolate(alpha)
+
+    def draw_scene(self, full=False):
+        scene = self.current
+        if scene is None:
+            return None
+        if full or self.screen_dirty:
+            self.call(scene, "invalidate")
+        return scene.draw()
+
+    def draw(self):
+        """Рисует кадр; возвращает измененные области или None, если обновлять надо весь экран"""
+        if isinstance(self.transition, CrossfadeTransition):
+            # пока идет смешивание снимков, сама сцена не рисуется
+            rects = None
+        else:
+            rects = self.draw_scene()
+        if self.transition is not None:
+            self.transition.draw(self.screen)
+            rects = None
+        self.screen_dirty = rects is None
+        return rects
@@ -0,0 +1,21 @@
+from battle_ai import ExpectimaxPolicy
+from battle_engine import BattleEngine
+
+
+def test_search_resumes_from_last_finished_depth():
+    engine = BattleEngine(5)
+    engine.player_action("rock")
+    policy = ExpectimaxPolicy(depth=3)
+
+    # без времени считается только первая глубина, но ход есть всегда
+    first = policy.think(engine, False, budget_ms=0)
+    assert first in engine.available_actions(False)
+    assert policy.pending[1] == 1
+
+    # следующие порции продолжают тот же поиск до полной глубины
+    for _ in range(1000):
+        policy.think(engine, False, budget_ms=2)
+        if policy.pending[1] == 3:
+            break
+    assert policy.pending[1] == 3
+    assert policy.choose(engine, False) == policy.pending[2]
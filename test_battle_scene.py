@@ -0,0 +1,33 @@
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+from battle_scene import MortyBattle
+from profiler import FrameProfiler
+
+
+def test_profiler_times_every_draw_method():
+    pygame.init()
+    screen = pygame.display.set_mode((1280, 720))
+    profiler = FrameProfiler(enabled=True)
+    battle = profiler.instrument(MortyBattle(screen, seed=0), group="battle")
+
+    # итог раунда с сообщением: на экране все виджеты сразу
+    battle.handle_event(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_1))
+    for _ in range(200):
+        if battle.game_state == "round_result":
+            break
+        battle.update(20)
+    assert battle.game_state == "round_result"
+    battle.show_message("Проверка", 1000)
+
+    battle.renderer.invalidate()
+    profiler.begin_frame()
+    battle.draw()
+    profiler.end_frame()
+
+    _, sections = profiler.frames[-1]
+    expected = {f"battle.{name}" for name in dir(MortyBattle) if name.startswith("draw_")}
+    assert expected <= set(sections), sorted(expected - set(sections))
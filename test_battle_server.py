@@ -0,0 +1,66 @@
+import random
+
+from battle_protocol import ACTIONS, DRAW, NO_WINNER, ROUND, WINNER_ME, RoundInfo
+from battle_server import Match
+
+
+class FakeConnection:
+    """Соединение без сети: запоминает последний итог раунда"""
+
+    def __init__(self):
+        self.match = None
+        self.seat = 0
+        self.last = None
+
+    def send(self, message_type, payload=b""):
+        if message_type == ROUND:
+            self.last = RoundInfo.unpack(payload)
+
+
+def play_match(seed):
+    """Один бой случайными допустимыми ходами; возвращает победившее место или None"""
+    rng = random.Random(seed)
+    players = [FakeConnection(), FakeConnection()]
+    match = Match(players, seed)
+    match.new_battle()
+    while True:
+        for seat in (0, 1):
+            cooldowns = match.cooldowns(seat)
+            action = rng.choice([action for action in ACTIONS if cooldowns.get(action, 0) <= 0])
+            assert match.choose(seat, action) is None
+        result = players[0].last.winner
+        if result != NO_WINNER:
+            if result == DRAW:
+                return None
+            return 0 if result == WINNER_ME else 1
+
+
+def test_seats_are_symmetric():
+    wins = [0, 0]
+    for seed in range(4000):
+        winner = play_match(seed)
+        if winner is not None:
+            wins[winner] += 1
+    share = wins[0] / sum(wins)
+    assert 0.46 < share < 0.54, wins
+
+
+def test_both_seats_start_equal():
+    players = [FakeConnection(), FakeConnection()]
+    match = Match(players, 1)
+    match.new_battle()
+    info = [match.match_info(seat) for seat in (0, 1)]
+    assert info[0].my_max_hp == info[1].my_max_hp
+    assert info[0].my_level == info[1].my_level
+
+
+def test_round_is_mirrored_for_seats():
+    players = [FakeConnection(), FakeConnection()]
+    match = Match(players, 2)
+    match.new_battle()
+    match.choose(0, "rock")
+    match.choose(1, "defense")
+    mine, theirs = players[0].last, players[1].last
+    assert (mine.my_action, mine.opp_action) == (theirs.opp_action, theirs.my_action)
+    assert (mine.my_damage, mine.opp_damage) == (theirs.opp_damage, theirs.my_damage)
+    assert theirs.my_defending and not mine.my_defending
@@ -0,0 +1,213 @@
+import argparse
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from battle_engine import MORTY_TYPES, BattleEngine
+from battle_policies import POLICIES
+
+
+# Ограничение на длину боя, чтобы два лечащихся Морти не играли вечно
+MAX_ROUNDS = 200
+# Ограничение на длину серии побед в режиме прогрессии
+MAX_STREAK = 100
+
+
+def make_engine(seed, enemy_policy):
+    engine = BattleEngine(seed)
+    engine.enemy_policy = POLICIES[enemy_policy] if enemy_policy else None
+    return engine
+
+
+def play_battle(engine, policy, max_rounds=MAX_ROUNDS):
+    """Играет бой до конца, возвращает (победитель, число раундов)"""
+    for rounds in range(1, max_rounds + 1):
+        winner = engine.play_round(policy(engine, True))
+        if winner:
+            return winner, rounds
+    return None, max_rounds
+
+
+def run_matchup_shard(shard):
+    """Пачка боев одной пары типов на одном уровне врага"""
+    policy_name, player_type, enemy_type, level, games, seed, enemy_policy = shard
+    engine = make_engine(seed, enemy_policy)
+    policy = POLICIES[policy_name]
+
+    wins = losses = unfinished = total_rounds = 0
+    for _ in range(games):
+        engine.set_matchup(player_type, enemy_type, level)
+        winner, rounds = play_battle(engine, policy)
+        total_rounds += rounds
+        if winner == "player":
+            wins += 1
+        elif winner == "enemy":
+            losses += 1
+        else:
+            unfinished += 1
+
+    key = (policy_name, player_type, enemy_type, level)
+    return key, (games, wins, losses, unfinished, total_rounds)
+
+
+def run_progression_shard(shard):
+    """Серии боев через start_new_battle до первого поражения"""
+    policy_name, runs, seed, enemy_policy = shard
+    engine = make_engine(seed, enemy_policy)
+    policy = POLICIES[policy_name]
+
+    levels = {}
+    streaks = {}
+    for _ in range(runs):
+        # новая серия: проигравший игрок начинает с первого уровня
+        engine.player_morty.hp = 0
+        engine.start_new_battle()
+
+        streak = 0
+        while streak < MAX_STREAK:
+            level = engine.enemy_level
+            winner, _ = play_battle(engine, policy)
+            stats = levels.setdefault(level, [0, 0])
+            stats[0] += 1
+            if winner != "player":
+                break
+            stats[1] += 1
+            streak += 1
+            engine.start_new_battle()
+        streaks[streak] = streaks.get(streak, 0) + 1
+
+    return policy_name, levels, streaks
+
+
+def split_games(games, chunk):
+    while games > 0:
+        yield min(chunk, games)
+        games -= chunk
+
+
+def matchup_shards(policies, levels, games, chunk, seed, enemy_policy):
+    index = 0
+    for policy_name in policies:
+        for player_type in MORTY_TYPES:
+            for enemy_type in MORTY_TYPES:
+                for level in levels:
+                    for count in split_games(games, chunk):
+                        yield (policy_name, player_type, enemy_type, level, count, seed + index, enemy_policy)
+                        index += 1
+
+
+def progression_shards(policies, runs, chunk, seed, enemy_policy):
+    # сиды не пересекаются с сидами матчей
+    index = 1_000_000
+    for policy_name in policies:
+        for count in split_games(runs, chunk):
+            yield policy_name, count, seed + index, enemy_policy
+            index += 1
+
+
+def run_tournament(policies, levels, games, runs=0, workers=None, chunk=500, seed=0, enemy_policy=None):
+    """Раскидывает бои по пулу процессов и возвращает таблицы результатов по столбцам"""
+    matchups = {}
+    progression = {}
+    streaks = {}
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        shards = list(matchup_shards(policies, levels, games, chunk, seed, enemy_policy))
+        for key, counts in pool.map(run_matchup_shard, shards, chunksize=max(1, len(shards) // 64)):
+            total = matchups.setdefault(key, [0] * len(counts))
+            for i, value in enumerate(counts):
+                total[i] += value
+
+        if runs:
+            shards = list(progression_shards(policies, runs, chunk, seed, enemy_policy))
+            for policy_name, levels_stats, streak_counts in pool.map(run_progression_shard, shards):
+                for level, (battles, wins) in levels_stats.items():
+                    total = progression.setdefault((policy_name, level), [0, 0])
+                    total[0] += battles
+                    total[1] += wins
+                for streak, count in streak_counts.items():
+                    key = (policy_name, streak)
+                    streaks[key] = streaks.get(key, 0) + count
+
+    tables = {
+        "matchups": to_columns(
+            ["policy", "player_type", "enemy_type", "enemy_level",
+             "battles", "player_wins", "enemy_wins", "unfinished", "rounds"], matchups),
+        "progression": to_columns(["policy", "enemy_level", "battles", "player_wins"], progression),
+        "streaks": to_columns(["policy", "streak", "runs"], {key: [value] for key, value in streaks.items()}),
+    }
+    tables["matchups"]["win_rate"] = [wins / battles if battles else 0.0 for wins, battles in
+                                      zip(tables["matchups"]["player_wins"], tables["matchups"]["battles"])]
+    tables["progression"]["win_rate"] = [wins / battles if battles else 0.0 for wins, battles in
+                                         zip(tables["progression"]["player_wins"], tables["progression"]["battles"])]
+    return tables
+
+
+def to_columns(names, rows):
+    """Словарь {ключ: значения} -> таблица по столбцам"""
+    columns = {name: [] for name in names}
+    for key in sorted(rows):
+        for name, value in zip(names, list(key) + list(rows[key])):
+            columns[name].append(value)
+    return columns
+
+
+def write_table(path, columns, file_format="csv"):
+    """Пишет таблицу в CSV или Parquet (если установлен pyarrow)"""
+    if file_format == "parquet":
+        import pyarrow
+        import pyarrow.parquet
+
+        pyarrow.parquet.write_table(pyarrow.table(columns), path + ".parquet")
+        return path + ".parquet"
+
+    names = list(columns)
+    with open(path + ".csv", "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(names)
+        writer.writerows(zip(*(columns[name] for name in names)))
+    return path + ".csv"
+
+
+def parse_levels(text):
+    """"1-5" или "1,3,7" -> список уровней"""
+    levels = []
+    for part in text.split(","):
+        if "-" in part:
+            start, end = part.split("-")
+            levels.extend(range(int(start), int(end) + 1))
+        else:
+            levels.append(int(part))
+    return levels
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Турнир политик игрока по всем парам типов Морти")
+    parser.add_argument("--policies", default=",".join(POLICIES))
+    parser.add_argument("--enemy-policy", default=None, choices=list(POLICIES),
+                        help="политика врага, по умолчанию таблица весов enemy_choose")
+    parser.add_argument("--levels", default="1-5")
+    parser.add_argument("--games", type=int, default=1000, help="боев на пару типов и уровень")
+    parser.add_argument("--runs", type=int, default=1000, help="серий побед на политику")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="tournament_results")
+    parser.add_argument("--format", default="csv", choices=["csv", "parquet"])
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    tables = run_tournament(args.policies.split(","), parse_levels(args.levels), args.games, args.runs,
+                            args.workers, args.chunk, args.seed, args.enemy_policy)
+    elapsed = time.perf_counter() - start
+
+    os.makedirs(args.out, exist_ok=True)
+    for name, columns in tables.items():
+        print(write_table(os.path.join(args.out, name), columns, args.format))
+    battles = sum(tables["matchups"]["battles"]) + sum(tables["progression"]["battles"])
+    print(f"Боев: {battles}, время: {elapsed:.2f} с, {battles / elapsed:.0f} боев/с")
+
+
+if __name__ == "__main__":
+    main()